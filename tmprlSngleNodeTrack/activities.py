@@ -1,9 +1,14 @@
 import asyncio
+import contextlib
+import time
+from datetime import datetime, timezone
 from temporalio import activity
-import logging
-import json
-
-logger = logging.getLogger(__name__)
+from temporalio.exceptions import ApplicationError
+import config
+from activity_logging import logged_activity
+from node_policies import VALIDATION_ERROR
+from notifications import get_dispatcher
+from latency import simulate as simulate_latency
 
 # @activity.defn
 # async def test_node(args: dict) -> dict:
@@ -24,125 +29,160 @@ logger = logging.getLogger(__name__)
 #     logger.info(f"[test_node] Result: {json.dumps(result, indent=4)}")
 #     return result
 
+def invalid_input(message: str) -> ApplicationError:
+    """Error for inputs that can never succeed, so the run fails without retries."""
+    return ApplicationError(message, type=VALIDATION_ERROR, non_retryable=True)
+
+@contextlib.asynccontextmanager
+async def heartbeating(interval: float = config.ACTIVITY_HEARTBEAT_INTERVAL, details=None):
+    """
+    Heartbeat in the background while a long call runs, so a lost worker is
+    noticed early. details(), if given, returns the heartbeat details to send;
+    each heartbeat replaces the last one's, so progress must be resent.
+    """
+    async def beat():
+        while True:
+            activity.heartbeat(*(details() if details else ()))
+            await asyncio.sleep(interval)
+    task = asyncio.ensure_future(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+def attempt_deadline() -> float | None:
+    """
+    time.monotonic() value by which the current attempt must finish: the
+    earlier of its start-to-close and the activity's schedule-to-close end.
+    """
+    info = activity.info()
+    ends = []
+    if info.start_to_close_timeout:
+        ends.append(info.started_time + info.start_to_close_timeout)
+    if info.schedule_to_close_timeout:
+        ends.append(info.scheduled_time + info.schedule_to_close_timeout)
+    if not ends:
+        return None
+    return time.monotonic() + (min(ends) - datetime.now(timezone.utc)).total_seconds()
+
 @activity.defn
+@logged_activity
 async def start_call(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[start_call] Attempt: {attempt}")
     if inputs.get("force_fail"):
         raise Exception("Forced failure for retry test (start_call)")
     caller = inputs.get('caller')
     if not caller:
-        raise Exception("Caller ID is missing in start_call node input!")
+        raise invalid_input("Caller ID is missing in start_call node input!")
     activity.logger.info(f"Call started for {caller}")
-    logger.info(f"[start_call] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
+    await simulate_latency("start_call")
     context["caller_id"] = caller
-    result = {
+    return {
         "status": "started",
         "message": f"Call started for {caller}",
         "context": context
     }
-    logger.info(f"[start_call] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def end_call(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[end_call] Attempt: {attempt}")
     if inputs.get("force_fail"):
         raise Exception("Forced failure for retry test (end_call)")
     caller_id = context.get("caller_id")
     if not caller_id:
-        raise Exception("Caller ID is missing in end_call node input!")
+        raise invalid_input("Caller ID is missing in end_call node input!")
     activity.logger.info("Ending call.")
-    logger.info(f"[end_call] Start | context: {json.dumps(context, indent=4)}")
-    await asyncio.sleep(1)
-    result = {
+    await simulate_latency("end_call")
+    return {
         "status": "ended",
         "message": f"Call ended for {context.get('caller_id')}",
         "context": context
     }
-    logger.info(f"[end_call] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def email_sent(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[email_sent] Attempt: {attempt}")
     if inputs.get("force_fail"):
         raise Exception("Forced failure for retry test (email_sent)")
     recipient = inputs.get("recipient", "unknown@example.com")
     subject = inputs.get("title", "No Subject")
     description = inputs.get("description", "No Description")
     activity.logger.info(f"Sending email to {recipient} with subject: {subject}")
-    logger.info(f"[email_sent] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
-    result = {
+    await get_dispatcher().submit("email", {"recipient": recipient, "subject": subject, "description": description})
+    return {
         "status": "success",
         "message": f"Email sent to {recipient} with subject: {subject}",
         "context": context
     }
-    logger.info(f"[email_sent] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def sms_sent(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[sms_sent] Attempt: {attempt}")
     if inputs.get("force_fail"):
         raise Exception("Forced failure for retry test (sms_sent)")
     phone_number = inputs.get("phone_number")
     message = inputs.get("message")
     if not phone_number or not message:
-        raise Exception("phone_number and message are required for sms_sent activity!")
+        raise invalid_input("phone_number and message are required for sms_sent activity!")
     activity.logger.info(f"Sending SMS to {phone_number} with message: {message}")
-    logger.info(f"[sms_sent] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
-    result = {
+    await get_dispatcher().submit("sms", {"phone_number": phone_number, "message": message})
+    return {
         "status": "success",
         "message": f"SMS sent to {phone_number} with message: {message}",
         "context": context
     }
-    logger.info(f"[sms_sent] Result: {json.dumps(result, indent=4)}")
-    return result
 
 
 @activity.defn
+@logged_activity
 async def knowledge_base_call(args: dict) -> dict:
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    query = inputs.get("query", "No query provided")
+    query = inputs.get("query")
     if not query:
-        raise Exception("Query is missing in knowledge_base_call node input!")
+        raise invalid_input("Query is missing in knowledge_base_call node input!")
     activity.logger.info(f"Querying knowledge base with: {query}")
-    logger.info(f"[knowledge_base_call] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
-    from llm import query_document
-    response = await query_document(query)
+    from llm import query_document, DEADLINE_EXCEEDED, CIRCUIT_OPEN, KB_REJECTED
+    deadline = attempt_deadline()
+    # Streaming: the answer so far rides on heartbeat details, which the API relays over SSE
+    partial = []
+
+    def progress() -> tuple:
+        return ({"partial": "".join(partial), "chunks": len(partial)},) if partial else ()
+
+    def on_chunk(text: str):
+        partial.append(text)
+        activity.heartbeat(*progress())
+
+    async with heartbeating(details=progress):
+        await simulate_latency("knowledge_base_call")
+        response = await query_document(query, deadline=deadline, on_chunk=on_chunk if inputs.get("stream") else None)
+    if isinstance(response, dict) and response.get("status") == "error":
+        # Retrying cannot beat the deadline, an open breaker or a 4xx; 5xx and network errors retry
+        error_type = response.get("error_type")
+        raise ApplicationError(response.get("message", "Knowledge base call failed."),
+                               type=error_type or "KnowledgeBaseError",
+                               non_retryable=error_type in (DEADLINE_EXCEEDED, CIRCUIT_OPEN, KB_REJECTED))
     # context["last_result"] = response
-    result = {
+    return {
         "status": "success",
         "query": query,
         "result": response,
         "context": context
     }
-    logger.info(f"[knowledge_base_call] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def schedule_meeting(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[schedule_meeting] Attempt: {attempt}")
     if inputs.get("force_fail"):
         raise Exception("Forced failure for retry test (schedule_meeting)")
     email = inputs.get("email")
@@ -150,77 +190,59 @@ async def schedule_meeting(args: dict) -> dict:
     time_ = inputs.get("time")
     summary = inputs.get("summary")
     if not all([email, date, time_, summary]):
-        raise Exception("All fields (email, date, time, summary) are required for schedule_meeting activity!")
+        raise invalid_input("All fields (email, date, time, summary) are required for schedule_meeting activity!")
     activity.logger.info(f"Scheduling meeting for {email} on {date} at {time_} with summary: {summary}")
-    logger.info(f"[schedule_meeting] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
-    result = {
+    await simulate_latency("schedule_meeting")
+    return {
         "status": "success",
         "message": f"Meeting scheduled for {email} on {date} at {time_} with summary: {summary}",
         "context": context
     }
-    logger.info(f"[schedule_meeting] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def waiting_for_response(args: dict) -> dict:
-    attempt = activity.info().attempt
     context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[waiting_for_response] Attempt: {attempt}")
     key = inputs.get("key")
     wait_seconds = int(inputs.get("wait_seconds", 5))
     if not key:
-        raise Exception("A 'key' input is required for waiting_for_response activity!")
+        raise invalid_input("A 'key' input is required for waiting_for_response activity!")
     activity.logger.info(f"Waiting for response with key: {key} for {wait_seconds} seconds")
-    logger.info(f"[waiting_for_response] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(wait_seconds)
-    result = {
+    async with heartbeating():
+        await asyncio.sleep(wait_seconds)
+    return {
         "status": "success",
         "message": f"Waited for response with key: {key} for {wait_seconds} seconds.",
         "context": context
     }
-    logger.info(f"[waiting_for_response] Result: {json.dumps(result, indent=4)}")
-    return result
 
 @activity.defn
+@logged_activity
 async def api_connectivity(args: dict) -> dict:
-    attempt = activity.info().attempt
-    context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[api_connectivity] Attempt: {attempt}")
     api_response = inputs.get("api_response")
     if api_response is None:
-        raise Exception("An 'api_response' input is required for api_connectivity activity!")
-    activity.logger.info(f"API Connectivity node received response: {api_response}")
-    logger.info(f"[api_connectivity] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
+        raise invalid_input("An 'api_response' input is required for api_connectivity activity!")
+    await simulate_latency("api_connectivity")
     return {"response": api_response}
 
 @activity.defn
+@logged_activity
 async def http_connectivity(args: dict) -> dict:
-    attempt = activity.info().attempt
-    context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[http_connectivity] Attempt: {attempt}")
     http_response = inputs.get("http_response")
     if http_response is None:
-        raise Exception("A 'http_response' input is required for http_connectivity activity!")
-    activity.logger.info(f"HTTP Connectivity node received response: {http_response}")
-    logger.info(f"[http_connectivity] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
+        raise invalid_input("A 'http_response' input is required for http_connectivity activity!")
+    await simulate_latency("http_connectivity")
     return {"response": http_response}
 
 @activity.defn
+@logged_activity
 async def webhook_connectivity(args: dict) -> dict:
-    attempt = activity.info().attempt
-    context = args.get("context", {})
     inputs = args.get("inputs", {})
-    logger.info(f"[webhook_connectivity] Attempt: {attempt}")
     webhook_response = inputs.get("webhook_response")
     if webhook_response is None:
-        raise Exception("A 'webhook_response' input is required for webhook_connectivity activity!")
-    activity.logger.info(f"Webhook Connectivity node received response: {webhook_response}")
-    logger.info(f"[webhook_connectivity] Start | context: {json.dumps(context, indent=4)}, inputs: {json.dumps(inputs, indent=4)}")
-    await asyncio.sleep(1)
+        raise invalid_input("A 'webhook_response' input is required for webhook_connectivity activity!")
+    await simulate_latency("webhook_connectivity")
     return {"response": webhook_response}
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Shared logging for activities: one decorator emits start/result/failure records
+as single-line JSON. Payloads are clipped before serialization and only
+serialized when a record is actually emitted, and records can be sampled per
+activity type.
+"""
+import functools
+import json
+import logging
+import random
+import time
+from temporalio import activity
+
+import config
+
+logger = logging.getLogger("activities")
+
+
+def _clip(value, depth: int = 0):
+    """Bound a payload's size so logging cost does not grow with it."""
+    if isinstance(value, str):
+        if len(value) > config.ACTIVITY_LOG_MAX_STRING:
+            return value[:config.ACTIVITY_LOG_MAX_STRING] + f"...(+{len(value) - config.ACTIVITY_LOG_MAX_STRING} chars)"
+        return value
+    if isinstance(value, dict):
+        if depth >= config.ACTIVITY_LOG_MAX_DEPTH:
+            return f"<dict with {len(value)} keys>"
+        clipped = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= config.ACTIVITY_LOG_MAX_ITEMS:
+                clipped["..."] = f"+{len(value) - i} keys"
+                break
+            clipped[str(k)] = _clip(v, depth + 1)
+        return clipped
+    if isinstance(value, (list, tuple)):
+        if depth >= config.ACTIVITY_LOG_MAX_DEPTH:
+            return f"<list with {len(value)} items>"
+        clipped = [_clip(v, depth + 1) for v in value[:config.ACTIVITY_LOG_MAX_ITEMS]]
+        if len(value) > config.ACTIVITY_LOG_MAX_ITEMS:
+            clipped.append(f"...(+{len(value) - config.ACTIVITY_LOG_MAX_ITEMS} items)")
+        return clipped
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return _clip(str(value), depth)
+
+
+class LazyRecord:
+    """Log argument that is clipped and serialized only if the record is emitted."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(_clip(self.fields), separators=(",", ":"), default=str)
+
+
+def _sample_rate(name: str) -> float:
+    return config.ACTIVITY_LOG_SAMPLE_RATES.get(name, config.ACTIVITY_LOG_SAMPLE_RATE)
+
+
+def logged_activity(fn):
+    """
+    Wrap an activity so attempt, start and result are logged by one place.
+    Apply it under @activity.defn. Failures are always logged; start/result
+    records are subject to the per-activity sample rate. Dict results are
+    stamped with the attempt that produced them.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(args: dict) -> dict:
+        info = activity.info()
+        rate = _sample_rate(name)
+        sampled = logger.isEnabledFor(logging.INFO) and (rate >= 1 or random.random() < rate)
+        if sampled:
+            logger.info("%s", LazyRecord(
+                event="start", activity=name, attempt=info.attempt, workflow_id=info.workflow_id,
+                context=args.get("context", {}), inputs=args.get("inputs", {}),
+            ))
+        started = time.perf_counter()
+        try:
+            result = await fn(args)
+        except Exception as e:
+            logger.warning("%s", LazyRecord(
+                event="failed", activity=name, attempt=info.attempt, workflow_id=info.workflow_id,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3), error=f"{type(e).__name__}: {e}",
+            ))
+            raise
+        if isinstance(result, dict):
+            result = {**result, "attempt": info.attempt}
+        if sampled:
+            logger.info("%s", LazyRecord(
+                event="result", activity=name, attempt=info.attempt, workflow_id=info.workflow_id,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3), result=result,
+            ))
+        return result
+
+    return wrapper
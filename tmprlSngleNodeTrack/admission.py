@@ -0,0 +1,189 @@
+"""
+Admission control for the API: token buckets per node type and per caller
+(the X-Caller-Id tenant/caller identity), and a cap on runs in flight per task
+queue. Requests over a limit are rejected right away with a retry hint
+instead of queueing without bound.
+
+Sync runs hold an in-flight slot until they return. Async runs hold one until
+a status poll sees them finish, or until their lease runs out.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import config
+import node_schemas
+import task_queues
+from metrics import registry
+
+decisions = registry.counter(
+    "admission_decisions_total", "Admission decisions by node type, outcome and reason.",
+    ("node_type", "outcome", "reason"))
+in_flight_gauge = registry.gauge("admission_in_flight", "Admitted runs in flight per task queue.", ("task_queue",))
+
+MAX_CALLER_BUCKETS = 10000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def refund(self):
+        self._tokens = min(self.burst, self._tokens + 1)
+
+
+@dataclass(frozen=True)
+class Decision:
+    admitted: bool
+    reason: str = "ok"
+    retry_after: float = 0.0
+    task_queue: str | None = None
+
+
+def queue_for_node_type(node_type: str) -> str:
+    """The task queue a run of this node type loads; flows and local activities load the workflow queue."""
+    schema = node_schemas.resolve(node_type)
+    if schema is None or task_queues.runs_as_local_activity(schema.node_type):
+        return config.TASK_QUEUE
+    return task_queues.queue_for_activity(schema.activity)
+
+
+class AdmissionController:
+    def __init__(self, node_type_rates: dict = config.ADMISSION_NODE_TYPE_RATES,
+                 caller_rate: float = config.ADMISSION_CALLER_RATE,
+                 caller_burst: float = config.ADMISSION_CALLER_BURST,
+                 in_flight_limits: dict = config.ADMISSION_IN_FLIGHT_LIMITS,
+                 async_lease: float = config.ADMISSION_ASYNC_LEASE,
+                 clock=time.monotonic):
+        # node type -> (rate per second, burst); "*" applies to types without their own entry
+        self.node_type_rates = node_type_rates
+        self.caller_rate = caller_rate
+        self.caller_burst = caller_burst
+        self.in_flight_limits = in_flight_limits
+        self.async_lease = async_lease
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._node_type_buckets: dict[str, TokenBucket] = {}
+        self._caller_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._in_flight: dict[str, int] = {}
+        self._leases: dict[str, tuple[str, float]] = {}  # workflow ID -> (task queue, expires at)
+        self._counts: dict[str, int] = {}  # "admitted" or "rejected/<reason>" -> requests
+
+    def _node_type_bucket(self, node_type: str) -> TokenBucket | None:
+        limit = self.node_type_rates.get(node_type) or self.node_type_rates.get("*")
+        if not limit:
+            return None
+        bucket = self._node_type_buckets.get(node_type)
+        if bucket is None:
+            bucket = self._node_type_buckets[node_type] = TokenBucket(*limit, clock=self._clock)
+        return bucket
+
+    def _caller_bucket(self, caller: str | None) -> TokenBucket | None:
+        if not caller or self.caller_rate <= 0:
+            return None
+        bucket = self._caller_buckets.get(caller)
+        if bucket is None:
+            bucket = self._caller_buckets[caller] = TokenBucket(self.caller_rate, self.caller_burst, self._clock)
+            if len(self._caller_buckets) > MAX_CALLER_BUCKETS:
+                self._caller_buckets.popitem(last=False)
+        else:
+            self._caller_buckets.move_to_end(caller)
+        return bucket
+
+    def _add_in_flight(self, task_queue: str, delta: int):
+        self._in_flight[task_queue] = max(0, self._in_flight.get(task_queue, 0) + delta)
+        in_flight_gauge.set(self._in_flight[task_queue], task_queue=task_queue)
+
+    def _expire_leases(self):
+        now = self._clock()
+        for workflow_id, (queue, expires) in list(self._leases.items()):
+            if expires <= now:
+                del self._leases[workflow_id]
+                self._add_in_flight(queue, -1)
+
+    def admit(self, node_type: str, caller: str | None, task_queue: str) -> Decision:
+        with self._lock:
+            self._expire_leases()
+            limit = self.in_flight_limits.get(task_queue)
+            if limit and self._in_flight.get(task_queue, 0) >= limit:
+                decision = Decision(False, "in_flight", config.ADMISSION_IN_FLIGHT_RETRY_AFTER)
+            else:
+                decision = self._take_tokens(node_type, caller)
+            if decision.admitted:
+                self._add_in_flight(task_queue, 1)
+                decision = Decision(True, task_queue=task_queue)
+            count_key = "admitted" if decision.admitted else f"rejected/{decision.reason}"
+            self._counts[count_key] = self._counts.get(count_key, 0) + 1
+        decisions.inc(node_type=node_type, outcome="admitted" if decision.admitted else "rejected",
+                      reason=decision.reason)
+        return decision
+
+    def _take_tokens(self, node_type: str, caller: str | None) -> Decision:
+        caller_bucket = self._caller_bucket(caller)
+        if caller_bucket is not None:
+            wait = caller_bucket.try_acquire()
+            if wait:
+                return Decision(False, "caller_rate", wait)
+        type_bucket = self._node_type_bucket(node_type)
+        if type_bucket is not None:
+            wait = type_bucket.try_acquire()
+            if wait:
+                # The caller's token was not used after all
+                if caller_bucket is not None:
+                    caller_bucket.refund()
+                return Decision(False, "node_type_rate", wait)
+        return Decision(True)
+
+    def release(self, task_queue: str):
+        """End a sync run's slot."""
+        with self._lock:
+            self._add_in_flight(task_queue, -1)
+
+    def lease(self, workflow_id: str, task_queue: str):
+        """Turn a slot into a lease held by an async run until it finishes or the lease expires."""
+        with self._lock:
+            previous = self._leases.pop(workflow_id, None)
+            if previous is not None:
+                # Re-attaching to a run that already holds a lease: keep one slot for it
+                self._add_in_flight(previous[0], -1)
+            self._leases[workflow_id] = (task_queue, self._clock() + self.async_lease)
+
+    def release_lease(self, workflow_id: str):
+        with self._lock:
+            lease = self._leases.pop(workflow_id, None)
+            if lease is not None:
+                self._add_in_flight(lease[0], -1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire_leases()
+            return {
+                "in_flight": dict(self._in_flight),
+                "in_flight_limits": dict(self.in_flight_limits),
+                "async_leases": len(self._leases),
+                "node_type_rates": {t: {"rate": r, "burst": b} for t, (r, b) in self.node_type_rates.items()},
+                "caller_rate": {"rate": self.caller_rate, "burst": self.caller_burst},
+                "tracked_callers": len(self._caller_buckets),
+                "decisions": dict(self._counts),
+            }
+
+
+admission = AdmissionController()
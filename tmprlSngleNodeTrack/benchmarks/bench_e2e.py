@@ -0,0 +1,271 @@
+"""
+End-to-end load and latency benchmark for node runs.
+
+Starts a Temporal stand-in (the dev server, the time-skipping test server, or
+an existing server), the worker and a local KB stub in-process, then drives
+each node type through POST /run_single_node and/or SingleNodeWorkflow
+directly at the given concurrency. Activity sleeps are replaced with the
+chosen latency model. Prints throughput, p50/p95/p99 latency and a per-stage
+breakdown (workflow task wait, activity schedule-to-start, activity
+execution, workflow end-to-end, client/API overhead) as JSON.
+
+Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_e2e --env local --requests 200 --concurrency 20 \\
+        --latency-model fixed:0.05 --output bench_output.json
+
+--mode session sends the same steps as updates to one CallSessionWorkflow per
+concurrent caller (POST /calls/{session}/nodes), so after each session's
+first step a node costs one update round trip instead of a workflow start.
+
+Add --no-local-activities and compare the apiConnectivity/http/webhook rows
+(latency and history_events_mean) to see what the local-activity path saves.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from temporalio.api.enums.v1 import EventType
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+
+import config
+import latency
+import notifications
+from benchmarks.kb_stub import KBStubServer
+from client_pool import temporal_pool
+from flow_registry import flow_registry
+from workflow import SingleNodeWorkflow, activity_map
+
+BENCH_FLOW_ID = "bench"
+
+# Inputs that pass each activity's checks. endCall needs a caller_id in context
+# and waitingforResponse needs a delivered response, so neither runs by default.
+NODE_INPUTS = {
+    "startCall": {"caller": "8789977380"},
+    "endCall": {"title": "End Call"},
+    "emailSent": {"recipient": "bench@example.com", "title": "Benchmark"},
+    "smsSent": {"phone_number": "5550000000", "message": "Benchmark"},
+    "knowledgeBaseCall": {"query": "benchmark question"},
+    "scheduleMeeting": {"email": "bench@example.com", "date": "2025-07-02", "time": "10:00", "summary": "Benchmark"},
+    "waitingforResponse": {"key": "bench", "wait_seconds": 1},
+    "apiConnectivity": {"api_response": {"status": "ok"}},
+    "http": {"http_response": {"status": "ok"}},
+    "webhook": {"webhook_response": {"status": "ok"}},
+}
+DEFAULT_NODE_TYPES = [t for t in activity_map if t not in ("endCall", "waitingforResponse")]
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 3)
+
+    return {"p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def _event_seconds(event) -> float:
+    return event.event_time.ToNanoseconds() / 1e9
+
+
+async def _stages(client: Client, workflow_id: str, client_latency: float) -> tuple[dict, int]:
+    """Split one run's latency into stages using its workflow history; also returns its event count."""
+    history = await client.get_workflow_handle(workflow_id).fetch_history()
+    first = {}
+    for event in history.events:
+        first.setdefault(event.event_type, _event_seconds(event))
+    stages = {}
+
+    def span(name, start, end):
+        if start in first and end in first:
+            stages[name] = first[end] - first[start]
+
+    span("workflow_task_wait", EventType.EVENT_TYPE_WORKFLOW_TASK_SCHEDULED, EventType.EVENT_TYPE_WORKFLOW_TASK_STARTED)
+    span("activity_schedule_to_start", EventType.EVENT_TYPE_ACTIVITY_TASK_SCHEDULED, EventType.EVENT_TYPE_ACTIVITY_TASK_STARTED)
+    span("activity_execution", EventType.EVENT_TYPE_ACTIVITY_TASK_STARTED, EventType.EVENT_TYPE_ACTIVITY_TASK_COMPLETED)
+    span("workflow_end_to_end", EventType.EVENT_TYPE_WORKFLOW_EXECUTION_STARTED, EventType.EVENT_TYPE_WORKFLOW_EXECUTION_COMPLETED)
+    if "workflow_end_to_end" in stages:
+        stages["client_overhead"] = max(0.0, client_latency - stages["workflow_end_to_end"])
+    return stages, len(history.events)
+
+
+def _inputs(node_type: str, seq: int) -> dict:
+    # A unique field per request keeps idempotency keys, memoized results and KB cache entries distinct
+    inputs = {**NODE_INPUTS[node_type], "bench_seq": seq}
+    if node_type == "knowledgeBaseCall":
+        inputs["query"] = f"{inputs['query']} {seq}"
+    return inputs
+
+
+async def _drive(call, requests: int, concurrency: int) -> tuple[list, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(seq: int):
+        async with semaphore:
+            started = time.perf_counter()
+            workflow_id, ok = await call(seq)
+            samples.append((workflow_id, time.perf_counter() - started, ok))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(seq) for seq in range(requests)))
+    return samples, time.perf_counter() - started
+
+
+async def bench_node_type(client: Client, http: httpx.AsyncClient, node_type: str, mode: str, args) -> dict:
+    node_id = f"bench_{node_type}"
+    run_tag = uuid.uuid4().hex[:8]
+
+    async def via_api(seq):
+        key = f"{run_tag}-{seq}"
+        response = await http.post(
+            "/run_single_node",
+            json={"flow_id": BENCH_FLOW_ID, "node_id": node_id, "inputs": _inputs(node_type, seq)},
+            headers={"Idempotency-Key": key},
+        )
+        return f"single-node-workflow-{node_id}-{key}", response.status_code == 200
+
+    async def via_session(seq):
+        # One long-lived session per concurrency lane, like a caller stepping through a live call
+        response = await http.post(
+            f"/calls/{run_tag}-{seq % args.concurrency}/nodes",
+            json={"flow_id": BENCH_FLOW_ID, "node_id": node_id, "inputs": _inputs(node_type, seq)},
+        )
+        return None, response.status_code == 200
+
+    async def via_workflow(seq):
+        workflow_id = f"bench-{node_id}-{run_tag}-{seq}"
+        node = flow_registry.get(BENCH_FLOW_ID).node_with_inputs(node_id, _inputs(node_type, seq))
+        try:
+            result = await client.execute_workflow(SingleNodeWorkflow, node, id=workflow_id, task_queue=config.TASK_QUEUE)
+            return workflow_id, result.get("status") == "success"
+        except Exception:
+            return workflow_id, False
+
+    call = {"api": via_api, "workflow": via_workflow, "session": via_session}[mode]
+    samples, elapsed = await _drive(call, args.requests, args.concurrency)
+    ok = [s for s in samples if s[2]]
+
+    stage_values: dict[str, list] = {}
+    event_counts = []
+    # Session steps share a workflow, so there is no per-step history to split
+    for workflow_id, client_latency, _ in ([] if mode == "session" else ok[:args.history_sample]):
+        try:
+            stages, event_count = await _stages(client, workflow_id, client_latency)
+            event_counts.append(event_count)
+            for name, value in stages.items():
+                stage_values.setdefault(name, []).append(value)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"No history for {workflow_id}: {e}")
+
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "latency": _percentiles([s[1] for s in ok]),
+        "stages": {name: _percentiles(values) for name, values in stage_values.items()},
+        "history_events_mean": round(sum(event_counts) / len(event_counts), 1) if event_counts else None,
+        "local_activity": node_type in config.LOCAL_ACTIVITY_NODE_TYPES,
+    }
+
+
+async def _start_environment(kind: str):
+    if kind == "local":
+        return await WorkflowEnvironment.start_local(namespace=config.TEMPORAL_NAMESPACE, ui=False)
+    if kind == "time-skipping":
+        return await WorkflowEnvironment.start_time_skipping()
+    return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env", choices=["local", "time-skipping", "existing"], default="local",
+                        help="Temporal stand-in; 'existing' uses TEMPORAL_ADDRESS")
+    parser.add_argument("--mode", choices=["api", "workflow", "session", "both"], default="both")
+    parser.add_argument("--node-types", default=",".join(DEFAULT_NODE_TYPES))
+    parser.add_argument("--requests", type=int, default=100, help="requests per node type and mode")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-model", default="fixed:0.05", help="activity latency model, see latency.py")
+    parser.add_argument("--kb-latency", default="fixed:0.05", help="latency model of the local KB stub")
+    parser.add_argument("--notify-latency", type=float, default=0.05, help="simulated email/SMS provider latency")
+    parser.add_argument("--history-sample", type=int, default=50, help="runs per node type used for stage breakdown")
+    parser.add_argument("--no-local-activities", action="store_true",
+                        help="run every node type as a regular activity, to compare with the local-activity fast path")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    args = parser.parse_args()
+    node_types = [t.strip() for t in args.node_types.split(",") if t.strip()]
+    unknown = [t for t in node_types if t not in NODE_INPUTS]
+    if unknown:
+        parser.error(f"unknown node types: {', '.join(unknown)}")
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.no_local_activities:
+        # Workflow code re-imports config in the sandbox, so the environment has to change too
+        os.environ["LOCAL_ACTIVITY_NODE_TYPES"] = ""
+        config.LOCAL_ACTIVITY_NODE_TYPES = set()
+    latency.set_model(args.latency_model)
+    kb_stub = KBStubServer(latency=args.kb_latency).start()
+    config.KB_BASE_URL = kb_stub.url
+    notifications.dispatcher = notifications.BatchDispatcher(
+        notifications.SimulatedProviderBackend(latency=args.notify_latency))
+
+    env = await _start_environment(args.env)
+    if env is not None:
+        config.TEMPORAL_ADDRESS = env.client.service_client.config.target_host
+    temporal_pool.target_host = config.TEMPORAL_ADDRESS
+    client = await temporal_pool.get()
+
+    # Imported here so worker.py's logging setup does not override ours before parsing args
+    from worker import main as worker_main
+    from routs import router
+    worker_task = asyncio.create_task(worker_main(metrics_port=0))
+
+    flow_registry.publish(BENCH_FLOW_ID, {"nodes": [
+        {"uniqueId": f"bench_{t}", "type": t, "config": {"properties": NODE_INPUTS[t]}} for t in node_types
+    ]})
+    app = FastAPI()
+    app.include_router(router)
+    modes = ["api", "workflow"] if args.mode == "both" else [args.mode]
+
+    report = {
+        "env": args.env,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_model": args.latency_model,
+        "kb_latency": args.kb_latency,
+        "local_activities": sorted(config.LOCAL_ACTIVITY_NODE_TYPES),
+        "results": {},
+    }
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=None) as http:
+            for node_type in node_types:
+                for mode in modes:
+                    report["results"].setdefault(node_type, {})[mode] = await bench_node_type(
+                        client, http, node_type, mode, args)
+    finally:
+        worker_task.cancel()
+        await asyncio.gather(worker_task, return_exceptions=True)
+        kb_stub.stop()
+        if env is not None:
+            await env.shutdown()
+
+    output = json.dumps(report, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
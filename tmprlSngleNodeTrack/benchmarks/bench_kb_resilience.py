@@ -0,0 +1,107 @@
+"""
+Knowledge-base client behaviour against the fault-injecting stub, no Temporal
+server needed. Three scenarios, each run with and without the feature:
+    tail      a share of requests stall; hedging off vs. on (latency percentiles, extra requests)
+    outage    every request fails; breaker off vs. on (requests reaching the endpoint, time to fail)
+    deadline  every request stalls; no deadline vs. a deadline (time until the call gives up)
+Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_kb_resilience --calls 400 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import config
+import llm
+from benchmarks.kb_stub import KBStubServer
+from circuit_breaker import CircuitBreaker
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _reset(breaker_failures: int):
+    # Fresh per-process state so scenarios do not leak into each other
+    llm.kb_breaker = CircuitBreaker("knowledge_base", breaker_failures, config.KB_BREAKER_RESET)
+    llm.kb_latency = llm.LatencyWindow(config.KB_LATENCY_WINDOW, config.KB_HEDGE_MIN_SAMPLES)
+
+
+async def _measure(stub: KBStubServer, calls: int, concurrency: int, deadline: float | None = None) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    before = stub.requests
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await llm.query_document(
+                f"question {i}", deadline=None if deadline is None else time.monotonic() + deadline)
+            latencies.append(time.perf_counter() - started)
+            errors += response.get("status") == "error"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return {
+        "calls": calls,
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": errors,
+        "endpoint_requests": stub.requests - before,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", default="lognormal:0.02,0.3", help="stub latency model, see latency.py")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="share of stalled requests in the tail scenario")
+    parser.add_argument("--stall-seconds", type=float, default=1.0)
+    parser.add_argument("--deadline", type=float, default=0.5, help="per-call deadline in the deadline scenario")
+    args = parser.parse_args()
+
+    stub = KBStubServer(latency=args.latency).start()
+    config.KB_BASE_URL = stub.url
+    config.KB_CACHE_ENABLED = False
+    report = {}
+    try:
+        stub.set_faults(stall_rate=args.stall_rate, stall_seconds=args.stall_seconds)
+        for hedging in (False, True):
+            _reset(config.KB_BREAKER_FAILURES)
+            config.KB_HEDGE_ENABLED = hedging
+            # Warm the latency window so the hedge delay is the observed p95, not the fallback
+            stub.set_faults(stall_rate=0)
+            await _measure(stub, config.KB_HEDGE_MIN_SAMPLES * 2, args.concurrency)
+            stub.set_faults(stall_rate=args.stall_rate)
+            result = await _measure(stub, args.calls, args.concurrency)
+            result["hedge_delay_ms"] = round((llm._hedge_delay() or 0) * 1000, 2)
+            report[f"tail_hedging_{'on' if hedging else 'off'}"] = result
+        config.KB_HEDGE_ENABLED = False
+
+        stub.set_faults(stall_rate=0, error_rate=1)
+        for breaker_failures in (10 ** 9, config.KB_BREAKER_FAILURES):
+            _reset(breaker_failures)
+            result = await _measure(stub, args.calls, args.concurrency)
+            result["breaker"] = llm.kb_breaker.stats()["state"]
+            report[f"outage_breaker_{'off' if breaker_failures == 10 ** 9 else 'on'}"] = result
+
+        stub.set_faults(error_rate=0, stall_rate=1, stall_seconds=args.deadline * 4)
+        for deadline in (None, args.deadline):
+            _reset(10 ** 9)
+            report[f"deadline_{'none' if deadline is None else deadline}"] = await _measure(
+                stub, args.concurrency, args.concurrency, deadline)
+    finally:
+        await llm.on_shutdown()
+        stub.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Time to first byte of a knowledge-base answer, plain versus streamed (NDJSON),
+against the local KB stub; no Temporal server needed. Also checks that both
+return the same final response. Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_kb_streaming --calls 50 --latency fixed:0.5 --answer-words 40
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import config
+import llm
+from benchmarks.kb_stub import KBStubServer
+
+
+async def _measure(calls: int, concurrency: int, stream: bool) -> tuple[dict, list]:
+    semaphore = asyncio.Semaphore(concurrency)
+    first_bytes, totals, results = [], [], []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            first = []
+
+            def on_chunk(text: str):
+                if not first:
+                    first.append(time.perf_counter() - started)
+
+            results.append(await llm.query_document(f"question {i}", on_chunk=on_chunk if stream else None))
+            totals.append(time.perf_counter() - started)
+            # Without streaming, nothing is usable before the whole answer
+            first_bytes.append(first[0] if first else totals[-1])
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return {
+        "calls": calls,
+        "first_byte_p50_ms": round(statistics.median(first_bytes) * 1000, 2),
+        "first_byte_max_ms": round(max(first_bytes) * 1000, 2),
+        "total_p50_ms": round(statistics.median(totals) * 1000, 2),
+    }, results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="fixed:0.5", help="stub time for a whole answer, see latency.py")
+    parser.add_argument("--answer-words", type=int, default=40)
+    args = parser.parse_args()
+
+    stub = KBStubServer(latency=args.latency, answer_words=args.answer_words).start()
+    config.KB_BASE_URL = stub.url
+    config.KB_CACHE_ENABLED = False
+    try:
+        plain, plain_results = await _measure(args.calls, args.concurrency, stream=False)
+        streamed, streamed_results = await _measure(args.calls, args.concurrency, stream=True)
+    finally:
+        await llm.on_shutdown()
+        stub.stop()
+
+    key = lambda response: response.get("answer", "")
+    print(json.dumps({
+        "plain": plain,
+        "streamed": streamed,
+        "same_final_results": sorted(plain_results, key=key) == sorted(streamed_results, key=key),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
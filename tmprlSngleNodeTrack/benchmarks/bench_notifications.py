@@ -0,0 +1,67 @@
+"""
+Throughput of email/SMS sends one provider call at a time (the old activity
+behaviour) versus the micro-batching dispatcher, against the simulated
+provider. No Temporal server needed. Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_notifications --messages 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import config
+from notifications import BatchDispatcher, SimulatedProviderBackend
+
+
+async def _measure(send, messages: int, concurrency: int) -> dict:
+    # concurrency mirrors the worker's activity slots
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await send({"phone_number": f"555{i:07d}", "message": "Campaign update"})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - started
+    return {"messages": messages, "seconds": round(elapsed, 3), "messages_per_second": round(messages / elapsed, 2)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=config.NOTIFY_PROVIDER_LATENCY,
+                        help="simulated provider round trip in seconds")
+    parser.add_argument("--provider-concurrency", type=int, default=config.NOTIFY_PROVIDER_MAX_CONCURRENCY,
+                        help="provider calls allowed in flight at once")
+    parser.add_argument("--batch-size", type=int, default=config.NOTIFY_BATCH_SIZE)
+    parser.add_argument("--window", type=float, default=config.NOTIFY_BATCH_WINDOW)
+    args = parser.parse_args()
+
+    single_backend = SimulatedProviderBackend(args.latency, args.provider_concurrency)
+
+    async def one_at_a_time(message):
+        (result,) = await single_backend.send_batch("sms", [message])
+        return result
+
+    batch_backend = SimulatedProviderBackend(args.latency, args.provider_concurrency)
+    dispatcher = BatchDispatcher(batch_backend, max_batch_size=args.batch_size, max_wait=args.window)
+
+    async def batched(message):
+        return await dispatcher.submit("sms", message)
+
+    before = await _measure(one_at_a_time, args.messages, args.concurrency)
+    before["provider_calls"] = single_backend.calls
+    after = await _measure(batched, args.messages, args.concurrency)
+    after["provider_calls"] = batch_backend.calls
+    await dispatcher.close()
+    print(json.dumps({
+        "one_at_a_time": before,
+        "batched": after,
+        "speedup": round(after["messages_per_second"] / before["messages_per_second"], 2),
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
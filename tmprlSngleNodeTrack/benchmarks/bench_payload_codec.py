@@ -0,0 +1,92 @@
+"""
+Bytes sent to Temporal (and kept in workflow history) per activity round trip
+as node payloads grow, with the default JSON converter versus the compressing
+claim-check codec. A round trip is the activity input (node inputs plus
+context) and its result. No Temporal server needed. Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_payload_codec --sizes 1,16,128,1024,4096
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import random
+import tempfile
+import time
+
+from temporalio.converter import DataConverter
+
+import config
+from blob_store import FileBlobStore
+from payload_codec import CompressionClaimCheckCodec
+
+
+def _api_response(size_kb: int, seed: int) -> dict:
+    """A JSON API response of roughly size_kb KiB: repetitive records like real list endpoints."""
+    rng = random.Random(seed)
+    records, size = [], 0
+    while size < size_kb * 1024:
+        record = {
+            "id": rng.randrange(10 ** 9),
+            "name": f"customer-{rng.randrange(10 ** 6)}",
+            "status": rng.choice(["active", "pending", "closed"]),
+            "balance": round(rng.uniform(0, 10000), 2),
+            "tags": rng.sample(["vip", "new", "churn-risk", "callback", "sms-opt-in"], 2),
+        }
+        records.append(record)
+        size += len(json.dumps(record))
+    return {"status": "ok", "items": records}
+
+
+def _round_trip(size_kb: int) -> tuple[dict, dict]:
+    response = _api_response(size_kb, seed=size_kb)
+    args = {
+        "inputs": {"api_response": response},
+        "context": {"caller_id": "8789977380", "responses": {}, "previous": response},
+    }
+    result = {"status": "success", "message": "API connectivity check passed", "context": args["context"]}
+    return args, result
+
+
+async def _measure(converter: DataConverter, values: list, repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encoded = await converter.encode(values)
+        decoded = await converter.decode(encoded, [dict] * len(values))
+    elapsed = time.perf_counter() - started
+    assert decoded == values
+    return {
+        "bytes_to_temporal": sum(p.ByteSize() for p in encoded),
+        "encode_decode_ms": round(elapsed / repeat * 1000, 3)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,16,128,1024,4096", help="api_response sizes in KiB")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compress-threshold", type=int, default=config.PAYLOAD_COMPRESS_THRESHOLD)
+    parser.add_argument("--claim-check-threshold", type=int, default=config.PAYLOAD_CLAIM_CHECK_THRESHOLD)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as blob_dir:
+        codec = CompressionClaimCheckCodec(
+            FileBlobStore(blob_dir),
+            compress_threshold=args.compress_threshold,
+            claim_check_threshold=args.claim_check_threshold,
+        )
+        converters = {
+            "default": DataConverter.default,
+            "codec": dataclasses.replace(DataConverter.default, payload_codec=codec),
+        }
+        report = []
+        for size_kb in (int(s) for s in args.sizes.split(",") if s.strip()):
+            values = list(_round_trip(size_kb))
+            row = {"payload_kb": size_kb}
+            for name, converter in converters.items():
+                row[name] = await _measure(converter, values, args.repeat)
+            report.append(row)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Requests-per-second of a Temporal round trip with a fresh client per request
+(the old route behaviour) versus the shared client pool.
+
+Needs a reachable Temporal server. Run from tmprlSngleNodeTrack/:
+    python -m benchmarks.bench_temporal_client --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from temporalio.api.workflowservice.v1 import GetSystemInfoRequest
+from temporalio.client import Client
+
+import config
+from client_pool import TemporalClientPool
+
+
+async def _per_request_connect() -> None:
+    client = await Client.connect(config.TEMPORAL_ADDRESS, namespace=config.TEMPORAL_NAMESPACE)
+    await client.workflow_service.get_system_info(GetSystemInfoRequest())
+
+
+def _pooled(pool: TemporalClientPool):
+    async def call() -> None:
+        client = await pool.get()
+        await client.workflow_service.get_system_info(GetSystemInfoRequest())
+    return call
+
+
+async def _measure(call, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "rps": round(requests / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=config.TEMPORAL_CLIENT_POOL_SIZE)
+    args = parser.parse_args()
+
+    pool = TemporalClientPool(size=args.pool_size)
+    await pool.get()  # connect outside the timed section, as app startup would
+    before = await _measure(_per_request_connect, args.requests, args.concurrency)
+    after = await _measure(_pooled(pool), args.requests, args.concurrency)
+    await pool.close()
+    print(json.dumps({
+        "connect_per_request": before,
+        "pooled_client": after,
+        "speedup": round(after["rps"] / before["rps"], 2),
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
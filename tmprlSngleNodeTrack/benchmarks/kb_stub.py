@@ -0,0 +1,154 @@
+"""
+Local stand-in for the knowledge-base /query/ endpoint, for tests and benchmarks.
+
+    python -m benchmarks.kb_stub --port 8765 --latency fixed:0.05
+then point the worker at it with KB_BASE_URL=http://127.0.0.1:8765
+
+Faults can be injected: --error-rate answers that share of requests with a
+503, and --stall-rate makes that share hang for --stall-seconds. Both, and
+the latency model, can be changed while it runs with
+    curl -X POST localhost:8765/_faults -d '{"error_rate": 1}'
+
+Requests with "stream": true and Accept: application/x-ndjson get the answer
+word by word as NDJSON, the latency spread evenly over the words, then a
+final {"result": ...} line with the same body a plain request gets.
+--answer-words pads answers to make streams longer.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency import parse_model
+
+
+class KBStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "zero",
+                 error_rate: float = 0.0, stall_rate: float = 0.0, stall_seconds: float = 30.0,
+                 answer_words: int = 0):
+        super().__init__((host, port), _Handler)
+        self.answer_words = answer_words
+        self.latency = parse_model(latency)
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.requests = 0
+        self.errors = 0
+        self.stalls = 0
+
+    def set_faults(self, latency: str | None = None, error_rate: float | None = None,
+                   stall_rate: float | None = None, stall_seconds: float | None = None):
+        if latency is not None:
+            self.latency = parse_model(latency)
+        if error_rate is not None:
+            self.error_rate = error_rate
+        if stall_rate is not None:
+            self.stall_rate = stall_rate
+        if stall_seconds is not None:
+            self.stall_seconds = stall_seconds
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "KBStubServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+        if self.path == "/_faults":
+            self.server.set_faults(**payload)
+            self._reply(200, {"error_rate": self.server.error_rate, "stall_rate": self.server.stall_rate,
+                              "stall_seconds": self.server.stall_seconds})
+            return
+        self.server.requests += 1
+        latency = self.server.latency()
+        if random.random() < self.server.stall_rate:
+            self.server.stalls += 1
+            time.sleep(self.server.stall_seconds)
+        elif random.random() < self.server.error_rate:
+            time.sleep(latency)
+            self.server.errors += 1
+            self._reply(503, {"status": "error", "message": "Injected fault"})
+            return
+        answer = f"Stub answer for: {payload.get('query', '')}" + "".join(
+            f" word{i}" for i in range(self.server.answer_words))
+        body = {"status": "success", "answer": answer, "folder_id": payload.get("folder_id")}
+        if payload.get("stream") and "application/x-ndjson" in self.headers.get("accept", ""):
+            self._stream(body, latency)
+            return
+        time.sleep(latency)
+        self._reply(200, body)
+
+    def _stream(self, body: dict, latency: float):
+        words = body["answer"].split(" ")
+        self.send_response(200)
+        self.send_header("content-type", "application/x-ndjson")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        lines = [{"delta": word if i == 0 else f" {word}"} for i, word in enumerate(words)] + [{"result": body}]
+        try:
+            for line in lines:
+                if "delta" in line:
+                    time.sleep(latency / len(words))
+                data = json.dumps(line).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _reply(self, code: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (deadline or hedge cancelled)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="zero", help="latency model, see latency.py")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="share of requests that hang")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--answer-words", type=int, default=0, help="extra words appended to every answer")
+    args = parser.parse_args()
+    server = KBStubServer(args.host, args.port, args.latency, args.error_rate, args.stall_rate, args.stall_seconds,
+                          args.answer_words)
+    print(f"KB stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Filesystem-backed content-addressed blob store used for claim-check payloads.
+Blobs are keyed by the SHA-256 of their bytes, so identical payloads are
+stored once and a key always refers to the same content.
+
+A periodic job deletes blobs that nobody wrote within the retention window;
+writing content that is already stored refreshes its age.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Left behind by a writer that died between mkstemp and the rename
+_TMP_PREFIX = ".tmp-"
+_TMP_MAX_AGE = 3600
+
+
+class BlobNotFoundError(KeyError):
+    pass
+
+
+class FileBlobStore:
+    """
+    Blobs live under root/<first two hex chars>/<digest>. Writes go to a
+    temporary file in the same directory and are renamed into place, so
+    readers never see a partial blob and concurrent writers of the same
+    content are harmless.
+    """
+
+    def __init__(self, root: str = config.BLOB_STORE_DIR):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid blob key: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # referenced again: restart its retention window
+            except FileNotFoundError:
+                pass  # pruned just now; write it again below
+            else:
+                return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=_TMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise BlobNotFoundError(digest) from None
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Blob {digest} is corrupt")
+        return data
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    # Retention
+
+    def _prune(self, older_than: float) -> int:
+        removed = 0
+        tmp_older_than = time.time() - _TMP_MAX_AGE
+        if not os.path.isdir(self.root):
+            return 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    cutoff = tmp_older_than if entry.name.startswith(_TMP_PREFIX) else older_than
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    async def prune(self, retention_seconds: float = config.BLOB_RETENTION_DAYS * 86400) -> int:
+        """Delete blobs not written within the retention window, and stale temporary files."""
+        removed = await asyncio.to_thread(self._prune, time.time() - retention_seconds)
+        if removed:
+            logger.info(f"Pruned {removed} blobs older than {retention_seconds / 86400:g} days")
+        return removed
+
+    async def retention_loop(self, interval: float = config.BLOB_RETENTION_INTERVAL):
+        if config.BLOB_RETENTION_DAYS <= 0:
+            return
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.warning(f"Blob store retention run failed: {e}")
+            await asyncio.sleep(interval)
+
+
+blob_store = FileBlobStore()
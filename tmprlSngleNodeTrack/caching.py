@@ -0,0 +1,119 @@
+"""
+Bounded TTL/LRU cache with in-flight request coalescing.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import registry
+
+cache_events = registry.counter(
+    "cache_events_total", "Cache lookups and maintenance events by cache and outcome.", ("cache", "event"))
+cache_size = registry.gauge("cache_entries", "Entries currently held by each cache.", ("cache",))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU cache bounded by entry count where every entry also expires after its TTL.
+    Safe to share between threads; each operation holds a short lock.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, clock=time.monotonic):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _count(self, event: str, amount: int = 1):
+        self._stats[event] = self._stats.get(event, 0) + amount
+        cache_events.inc(amount, cache=self.name, event=event)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= self._clock():
+                del self._entries[key]
+                self._count("expirations")
+                entry = _MISSING
+            if entry is _MISSING:
+                self._count("misses")
+                return default
+            self._entries.move_to_end(key)
+            self._count("hits")
+            return entry[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+            cache_size.set(len(self._entries), cache=self.name)
+
+    def invalidate(self, predicate=None) -> int:
+        """Drop every entry whose key matches predicate (all entries if None)."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                del self._entries[key]
+            self._count("invalidations", len(keys))
+            cache_size.set(len(self._entries), cache=self.name)
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "size": len(self._entries), "maxsize": self.maxsize,
+                    "ttl": self.ttl, **self._stats}
+
+
+class CoalescingCache(TTLCache):
+    """
+    TTLCache whose loads are shared: concurrent misses for one key await a
+    single loader call instead of each going upstream.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, clock=time.monotonic):
+        super().__init__(name, maxsize, ttl, clock)
+        self._in_flight: dict = {}
+        # Bumped by invalidate() so loads started before it are not stored
+        self._generation = 0
+
+    async def get_or_load(self, key, loader, cacheable=lambda value: True, coalesce: bool = True):
+        """With coalesce off the cache is still read and filled, but the load is this caller's own."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not coalesce:
+            return await self._store(key, loader, cacheable)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._count("coalesced")
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._load(key, loader, cacheable))
+        self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _store(self, key, loader, cacheable):
+        generation = self._generation
+        value = await loader()
+        if cacheable(value) and generation == self._generation:
+            self.set(key, value)
+        return value
+
+    async def _load(self, key, loader, cacheable):
+        try:
+            return await self._store(key, loader, cacheable)
+        finally:
+            self._in_flight.pop(key, None)
+
+    def invalidate(self, predicate=None) -> int:
+        self._generation += 1
+        return super().invalidate(predicate)
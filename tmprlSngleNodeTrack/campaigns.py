@@ -0,0 +1,615 @@
+"""
+Bulk campaigns: one flow run per contact of an uploaded contact list.
+
+The upload (NDJSON or CSV) is read as a stream and spooled into SQLite in
+batches, so a list of any size never sits in memory. A runner then starts a
+FlowWorkflow per contact with at most `concurrency` of them in flight, and
+takes an admission slot on the workflow task queue before each start, so the
+queue is fed no faster than the workers drain it.
+
+A contact's workflow ID is derived from the campaign and the contact's row,
+and starts reject IDs already used, so a campaign resumed after a crash
+re-attaches to the runs it had in flight instead of repeating them.
+
+Contact records: an NDJSON line is {"inputs": {node_id: {...}}, "context": {...}}
+or just the inputs mapping. A CSV header names its columns "<node_id>.<input>"
+or "context.<key>"; empty cells are left out, "true"/"false" become booleans,
+and fields may not span lines.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from temporalio.client import WorkflowFailureError
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import CancelledError, WorkflowAlreadyStartedError
+from temporalio.service import RPCError, RPCStatusCode
+
+import config
+import execution_store
+from admission import TokenBucket, admission
+from client_pool import temporal_pool
+from execution_store import RunInfo
+from flow_graph import plan_flow
+from flow_registry import FlowVersion
+from metrics import registry
+from workflow import FlowWorkflow
+
+logger = logging.getLogger(__name__)
+
+contacts_total = registry.counter(
+    "campaign_contacts_total", "Campaign contacts finished, by outcome.", ("outcome",))
+in_flight_gauge = registry.gauge("campaign_in_flight", "Campaign workflows currently in flight.")
+
+# Campaign states; runners only exist for "running" campaigns
+SPOOLING, READY, RUNNING, PAUSED, COMPLETED, CANCELLED, FAILED = (
+    "spooling", "ready", "running", "paused", "completed", "cancelled", "failed")
+# Contact states; "pending" and "running" rows are what a runner still has to do
+CONTACT_STATES = ("pending", "running", "success", "failed", "error", "invalid", "cancelled")
+
+THROUGHPUT_WINDOW = 60.0
+MAX_PAGE_SIZE = 1000
+_RUNNER_PAGE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    flow_id TEXT NOT NULL,
+    flow_version INTEGER NOT NULL,
+    flow_data TEXT NOT NULL,
+    start_node TEXT,
+    end_node TEXT,
+    concurrency INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS campaign_contacts (
+    campaign_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    status TEXT NOT NULL,
+    workflow_id TEXT,
+    started_at REAL,
+    finished_at REAL,
+    message TEXT,
+    PRIMARY KEY (campaign_id, seq)
+);
+CREATE INDEX IF NOT EXISTS campaign_contacts_status ON campaign_contacts (campaign_id, status, seq);
+CREATE INDEX IF NOT EXISTS campaign_contacts_finished ON campaign_contacts (campaign_id, finished_at);
+"""
+
+
+def upload_format(content_type: str | None) -> str | None:
+    """"csv" or "ndjson" for a supported upload content type, None otherwise."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return "ndjson"
+    return None
+
+
+async def _lines(stream):
+    """Split a byte stream into text lines without holding more than one partial line."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _csv_value(cell: str):
+    lowered = cell.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    return cell
+
+
+async def _records(stream, fmt: str):
+    """
+    Yield each contact as (record, error). A record that cannot be parsed
+    comes back as its raw text with the error; a bad CSV header raises
+    ValueError since no row after it could be read.
+    """
+    columns = None
+    async for line in _lines(stream):
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line, "Each line must be a JSON object."
+            elif "inputs" in record or "context" in record:
+                yield {"inputs": record.get("inputs") or {}, "context": record.get("context") or {}}, None
+            else:
+                yield {"inputs": record, "context": {}}, None
+            continue
+        cells = next(csv.reader([line]))
+        if columns is None:
+            columns = [tuple(c.strip().split(".", 1)) for c in cells]
+            bad = [c for c, parts in zip(cells, columns) if len(parts) != 2 or not all(parts)]
+            if bad:
+                raise ValueError(f"CSV columns must be named '<node_id>.<input>' or 'context.<key>': {', '.join(bad)}")
+            continue
+        if len(cells) != len(columns):
+            yield line, f"Expected {len(columns)} fields, got {len(cells)}."
+            continue
+        record = {"inputs": {}, "context": {}}
+        for (scope, name), cell in zip(columns, cells):
+            if cell == "":
+                continue
+            if scope == "context":
+                record["context"][name] = cell
+            else:
+                record["inputs"].setdefault(scope, {})[name] = _csv_value(cell)
+        yield record, None
+
+
+def flow_arg(flow: FlowVersion, record: dict, order: list, start: str | None, end: str | None) -> tuple[dict | None, list[str]]:
+    """The FlowWorkflow argument for one contact, checked the same way /run_flow checks a request."""
+    inputs, context = record.get("inputs"), record.get("context")
+    if not isinstance(inputs, dict) or not all(isinstance(v, dict) for v in inputs.values()):
+        return None, ["'inputs' must map node IDs to objects"]
+    if not isinstance(context, dict):
+        return None, ["'context' must be an object"]
+    unknown = [node_id for node_id in inputs if flow.get_node(node_id) is None]
+    if unknown:
+        return None, [f"Inputs given for unknown node(s): {', '.join(unknown)}"]
+    validated = {node_id: flow.validated_node(node_id, inputs.get(node_id, {})) for node_id in flow.nodes_by_id}
+    errors = [f"{node_id}: {error}" for node_id in order for error in validated[node_id][1]]
+    if errors:
+        return None, errors
+    return {
+        "nodes": [node for node, _ in validated.values()],
+        "edges": flow.edges,
+        "start": start,
+        "end": end,
+        "context": context,
+    }, []
+
+
+class CampaignStore:
+    """SQLite tables for campaigns and their contacts; every method blocks, so callers use asyncio.to_thread."""
+
+    def __init__(self, path: str = config.CAMPAIGN_STORE_PATH):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._db_lock:
+            if self._db is None:
+                if self.path != ":memory:":
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.row_factory = sqlite3.Row
+                db.execute("PRAGMA journal_mode = WAL")
+                db.execute("PRAGMA synchronous = NORMAL")
+                db.executescript(_SCHEMA)
+                self._db = db
+            return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        db = self._connect()
+        with self._db_lock, db:
+            return db.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict]:
+        db = self._connect()
+        with self._db_lock:
+            return [dict(row) for row in db.execute(sql, params).fetchall()]
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def create(self, campaign_id: str, flow: FlowVersion, start_node: str | None, end_node: str | None,
+               concurrency: int):
+        self._execute(
+            "INSERT INTO campaigns (id, flow_id, flow_version, flow_data, start_node, end_node, concurrency, status,"
+            " created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (campaign_id, flow.flow_id, flow.version, json.dumps(flow.data), start_node, end_node, concurrency,
+             SPOOLING, time.time()))
+
+    def add_contacts(self, campaign_id: str, rows: list[tuple]):
+        """Insert (seq, record JSON, status, message) rows and count them into the campaign total."""
+        db = self._connect()
+        with self._db_lock, db:
+            db.executemany(
+                "INSERT INTO campaign_contacts (campaign_id, seq, record, status, message, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(campaign_id, seq, record, state, message, None if state == "pending" else time.time())
+                 for seq, record, state, message in rows])
+            db.execute("UPDATE campaigns SET total = total + ? WHERE id = ?", (len(rows), campaign_id))
+
+    def set_status(self, campaign_id: str, status: str, error: str | None = None, clear_error: bool = False) -> int:
+        now = time.time()
+        return self._execute(
+            f"UPDATE campaigns SET status = ?, error = {'?' if clear_error else 'COALESCE(?, error)'},"
+            " started_at = CASE WHEN ? = 'running' THEN COALESCE(started_at, ?) ELSE started_at END,"
+            " finished_at = CASE WHEN ? IN ('completed', 'cancelled', 'failed') THEN ? ELSE NULL END"
+            " WHERE id = ?",
+            (status, error, status, now, status, now, campaign_id))
+
+    def get(self, campaign_id: str) -> dict | None:
+        rows = self._query("SELECT * FROM campaigns WHERE id = ?", (campaign_id,))
+        return rows[0] if rows else None
+
+    def list_campaigns(self, statuses: tuple = ()) -> list[dict]:
+        sql = "SELECT id, flow_id, flow_version, status, total, concurrency, created_at, finished_at FROM campaigns"
+        if statuses:
+            sql += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+        return self._query(sql + " ORDER BY created_at DESC", tuple(statuses))
+
+    def counts(self, campaign_id: str, since: float) -> tuple[dict, int]:
+        """Contacts per status, and how many finished since the given time."""
+        counts = {state: 0 for state in CONTACT_STATES}
+        for row in self._query("SELECT status, COUNT(*) AS n FROM campaign_contacts WHERE campaign_id = ?"
+                               " GROUP BY status", (campaign_id,)):
+            counts[row["status"]] = row["n"]
+        recent = self._query("SELECT COUNT(*) AS n FROM campaign_contacts WHERE campaign_id = ? AND finished_at >= ?"
+                             " AND status != 'invalid'", (campaign_id, since))[0]["n"]
+        return counts, recent
+
+    def unfinished(self, campaign_id: str, after_seq: int, limit: int) -> list[dict]:
+        """Pending and running contacts after a row, in upload order (keyset pagination)."""
+        return self._query(
+            "SELECT seq, record, status FROM campaign_contacts WHERE campaign_id = ? AND seq > ?"
+            " AND status IN ('pending', 'running') ORDER BY seq LIMIT ?", (campaign_id, after_seq, limit))
+
+    def running_workflows(self, campaign_id: str) -> list[str]:
+        return [row["workflow_id"] for row in self._query(
+            "SELECT workflow_id FROM campaign_contacts WHERE campaign_id = ? AND status = 'running'", (campaign_id,))]
+
+    def mark_running(self, campaign_id: str, seq: int, workflow_id: str):
+        self._execute("UPDATE campaign_contacts SET status = 'running', workflow_id = ?, started_at = ?"
+                      " WHERE campaign_id = ? AND seq = ?", (workflow_id, time.time(), campaign_id, seq))
+
+    def finish(self, campaign_id: str, seq: int, status: str, message: str | None):
+        self._execute("UPDATE campaign_contacts SET status = ?, message = ?, finished_at = ?"
+                      " WHERE campaign_id = ? AND seq = ?", (status, message, time.time(), campaign_id, seq))
+
+    def cancel_contacts(self, campaign_id: str, statuses: tuple) -> int:
+        return self._execute(
+            f"UPDATE campaign_contacts SET status = 'cancelled', finished_at = ?, message = 'Campaign cancelled.'"
+            f" WHERE campaign_id = ? AND status IN ({', '.join('?' for _ in statuses)})",
+            (time.time(), campaign_id, *statuses))
+
+    def contacts(self, campaign_id: str, status: str | None, after_seq: int, limit: int) -> list[dict]:
+        sql = ("SELECT seq, status, workflow_id, started_at, finished_at, message, record FROM campaign_contacts"
+               " WHERE campaign_id = ? AND seq > ?")
+        params = [campaign_id, after_seq]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        rows = self._query(sql + " ORDER BY seq LIMIT ?", (*params, limit))
+        for row in rows:
+            try:
+                row["record"] = json.loads(row["record"])
+            except ValueError:
+                pass  # unparseable upload lines are kept as text
+        return rows
+
+
+class CampaignManager:
+    """Spools uploads and owns one runner task per running campaign in this process."""
+
+    def __init__(self, store: CampaignStore | None = None):
+        self.store = store or CampaignStore()
+        self._runners: dict[str, asyncio.Task] = {}
+        self._stopping: set[str] = set()
+        self._cancelled: set[str] = set()
+        self._in_flight = 0
+
+    async def create(self, flow: FlowVersion, stream, fmt: str, concurrency: int,
+                     start_node: str | None = None, end_node: str | None = None, start: bool = True) -> dict:
+        """
+        Spool an upload into a new campaign and, with start set, begin running
+        it. Raises ValueError for a flow graph that cannot run; an upload that
+        breaks off or is unreadable leaves the campaign failed and raises
+        ValueError naming it.
+        """
+        nodes = list(flow.nodes_by_id.values())
+        try:
+            order = plan_flow(nodes, flow.edges, start_node, end_node)["order"]
+        except ValueError as e:
+            raise ValueError(f"Invalid flow graph: {e}") from None
+        campaign_id = uuid.uuid4().hex[:12]
+        await asyncio.to_thread(self.store.create, campaign_id, flow, start_node, end_node, concurrency)
+        batch, seq, invalid = [], 0, 0
+        try:
+            async for record, error in _records(stream, fmt):
+                seq += 1
+                if seq > config.CAMPAIGN_MAX_CONTACTS:
+                    raise ValueError(f"More than {config.CAMPAIGN_MAX_CONTACTS} contacts.")
+                if error is None:
+                    errors = flow_arg(flow, record, order, start_node, end_node)[1]
+                    error = "; ".join(errors) or None
+                raw = record if isinstance(record, str) else json.dumps(record, separators=(",", ":"))
+                batch.append((seq, raw, "pending" if error is None else "invalid", error))
+                invalid += error is not None
+                if len(batch) >= config.CAMPAIGN_SPOOL_BATCH:
+                    await asyncio.to_thread(self.store.add_contacts, campaign_id, batch)
+                    batch = []
+            if batch:
+                await asyncio.to_thread(self.store.add_contacts, campaign_id, batch)
+        except Exception as e:
+            message = str(e) if isinstance(e, ValueError) else f"Upload interrupted: {e}"
+            await asyncio.to_thread(self.store.set_status, campaign_id, FAILED, message)
+            raise ValueError(f"Campaign {campaign_id} failed: {message}") from None
+        contacts_total.inc(invalid, outcome="invalid")
+        await asyncio.to_thread(self.store.set_status, campaign_id, RUNNING if start else READY)
+        if start:
+            self._start_runner(campaign_id)
+        return await self.progress(campaign_id)
+
+    async def progress(self, campaign_id: str) -> dict | None:
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        now = time.time()
+        counts, recent = await asyncio.to_thread(self.store.counts, campaign_id, now - THROUGHPUT_WINDOW)
+        done = sum(n for state, n in counts.items() if state not in ("pending", "running", "invalid"))
+        elapsed = (campaign["finished_at"] or now) - campaign["started_at"] if campaign["started_at"] else 0.0
+        # Over a window shorter than the campaign's age when it has only just started
+        window = min(THROUGHPUT_WINDOW, elapsed) or None
+        recent_rate = recent / window if window else 0.0
+        remaining = counts["pending"] + counts["running"]
+        campaign.pop("flow_data")
+        return {
+            **campaign,
+            "active": campaign_id in self._runners,
+            "counts": counts,
+            "processed": done,
+            "throughput_per_second": round(done / elapsed, 3) if elapsed else 0.0,
+            "recent_throughput_per_second": round(recent_rate, 3),
+            "eta_seconds": round(remaining / recent_rate, 1) if recent_rate and campaign["status"] == RUNNING else None,
+        }
+
+    async def list_campaigns(self) -> list[dict]:
+        return [{**c, "active": c["id"] in self._runners} for c in await asyncio.to_thread(self.store.list_campaigns)]
+
+    async def contacts(self, campaign_id: str, status: str | None, after_seq: int, limit: int) -> list[dict]:
+        return await asyncio.to_thread(self.store.contacts, campaign_id, status, after_seq,
+                                       min(max(1, limit), MAX_PAGE_SIZE))
+
+    async def resume(self, campaign_id: str) -> dict | None:
+        """Run a ready or paused campaign, or restart the runner of one left running by a crash."""
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        if campaign["status"] not in (READY, PAUSED, RUNNING):
+            raise ValueError(f"Campaign {campaign_id} is {campaign['status']}.")
+        if campaign_id in self._stopping:
+            raise ValueError(f"Campaign {campaign_id} is still finishing its runs in flight; retry shortly.")
+        if campaign_id not in self._runners:
+            await asyncio.to_thread(self.store.set_status, campaign_id, RUNNING, clear_error=True)
+            self._start_runner(campaign_id)
+        return await self.progress(campaign_id)
+
+    async def pause(self, campaign_id: str) -> dict | None:
+        """Stop starting contacts; the runs in flight finish and are recorded."""
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        if campaign["status"] not in (READY, RUNNING):
+            raise ValueError(f"Campaign {campaign_id} is {campaign['status']}.")
+        await asyncio.to_thread(self.store.set_status, campaign_id, PAUSED)
+        if campaign_id in self._runners:
+            self._stopping.add(campaign_id)
+        return await self.progress(campaign_id)
+
+    async def cancel(self, campaign_id: str) -> dict | None:
+        """Stop starting contacts, drop the pending ones and cancel the workflows in flight."""
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        if campaign is None:
+            return None
+        if campaign["status"] in (COMPLETED, CANCELLED, FAILED):
+            raise ValueError(f"Campaign {campaign_id} is {campaign['status']}.")
+        active = campaign_id in self._runners
+        if active:
+            self._stopping.add(campaign_id)
+            self._cancelled.add(campaign_id)
+        await asyncio.to_thread(self.store.set_status, campaign_id, CANCELLED)
+        dropped = await asyncio.to_thread(self.store.cancel_contacts, campaign_id, ("pending",))
+        contacts_total.inc(dropped, outcome="cancelled")
+        workflow_ids = await asyncio.to_thread(self.store.running_workflows, campaign_id)
+        if workflow_ids:
+            try:
+                temporal_client = await temporal_pool.get()
+                results = await asyncio.gather(
+                    *(temporal_client.get_workflow_handle(workflow_id).cancel() for workflow_id in workflow_ids),
+                    return_exceptions=True)
+            except Exception as e:
+                results = [e]
+            failed = [r for r in results if isinstance(r, Exception)]
+            if failed:
+                logger.warning(f"Could not cancel {len(failed)} workflow(s) of campaign {campaign_id}: {failed[0]}")
+        if not active:
+            # No runner is waiting on these runs to record how they ended
+            await asyncio.to_thread(self.store.cancel_contacts, campaign_id, ("running",))
+        return await self.progress(campaign_id)
+
+    def _start_runner(self, campaign_id: str):
+        self._stopping.discard(campaign_id)
+        task = asyncio.ensure_future(self._run(campaign_id))
+        self._runners[campaign_id] = task
+
+        def finished(_):
+            self._runners.pop(campaign_id, None)
+            self._stopping.discard(campaign_id)
+            self._cancelled.discard(campaign_id)
+        task.add_done_callback(finished)
+
+    async def _pace(self, campaign_id: str, bucket: TokenBucket | None):
+        """Wait for the start rate and an admission slot on the workflow task queue."""
+        while campaign_id not in self._stopping:
+            wait = bucket.try_acquire() if bucket is not None else 0
+            if not wait:
+                decision = admission.admit("campaign", None, config.TASK_QUEUE)
+                if decision.admitted:
+                    return True
+                wait = decision.retry_after
+                if bucket is not None:
+                    bucket.refund()
+            await asyncio.sleep(wait)
+        return False
+
+    async def _run(self, campaign_id: str):
+        campaign = await asyncio.to_thread(self.store.get, campaign_id)
+        try:
+            flow = FlowVersion.build(campaign["flow_id"], campaign["flow_version"], json.loads(campaign["flow_data"]))
+            order = plan_flow(list(flow.nodes_by_id.values()), flow.edges,
+                              campaign["start_node"], campaign["end_node"])["order"]
+        except ValueError as e:
+            await asyncio.to_thread(self.store.set_status, campaign_id, FAILED, str(e))
+            return
+        run = RunInfo(flow.flow_id, flow.version, f"campaign:{campaign_id}",
+                      {node_id: flow.compiled[node_id].node_type for node_id in order})
+        window = asyncio.Semaphore(campaign["concurrency"])
+        bucket = TokenBucket(config.CAMPAIGN_START_RATE, config.CAMPAIGN_START_RATE) \
+            if config.CAMPAIGN_START_RATE > 0 else None
+        tasks: set[asyncio.Task] = set()
+        after_seq = 0
+        logger.info(f"Campaign {campaign_id} running with concurrency {campaign['concurrency']}")
+        try:
+            while campaign_id not in self._stopping:
+                rows = await asyncio.to_thread(self.store.unfinished, campaign_id, after_seq, _RUNNER_PAGE)
+                if not rows:
+                    break
+                for row in rows:
+                    await window.acquire()
+                    if not await self._pace(campaign_id, bucket):
+                        window.release()
+                        break
+                    after_seq = row["seq"]
+                    task = asyncio.ensure_future(self._run_contact(
+                        campaign_id, flow, order, campaign, run, row, window))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # Shutdown: the campaign stays "running" and resumes with the next process
+            for task in tasks:
+                task.cancel()
+            raise
+        if campaign_id not in self._stopping:
+            await asyncio.to_thread(self.store.set_status, campaign_id, COMPLETED)
+            logger.info(f"Campaign {campaign_id} completed")
+
+    async def _run_contact(self, campaign_id: str, flow: FlowVersion, order: list, campaign: dict,
+                           run: RunInfo, row: dict, window: asyncio.Semaphore):
+        workflow_id = f"campaign-{campaign_id}-{row['seq']}"
+        self._in_flight += 1
+        in_flight_gauge.set(self._in_flight)
+        started = time.perf_counter()
+        temporal_client = None
+        try:
+            arg, errors = flow_arg(flow, json.loads(row["record"]), order, campaign["start_node"], campaign["end_node"])
+            if errors:
+                outcome, message = "invalid", "; ".join(errors)
+            elif campaign_id in self._cancelled:
+                outcome, message = "cancelled", "Campaign cancelled."
+            else:
+                temporal_client = await temporal_pool.get()
+                # Recorded before the start, so a crash in between still re-attaches on resume
+                if row["status"] == "pending":
+                    await asyncio.to_thread(self.store.mark_running, campaign_id, row["seq"], workflow_id)
+                try:
+                    handle = await temporal_client.start_workflow(
+                        FlowWorkflow,
+                        arg,
+                        id=workflow_id,
+                        task_queue=config.TASK_QUEUE,
+                        id_reuse_policy=WorkflowIDReusePolicy.REJECT_DUPLICATE,
+                        id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+                    )
+                    if row["status"] == "pending":
+                        execution_store.record_started(run, workflow_id, "campaign", handle.result_run_id)
+                except WorkflowAlreadyStartedError as e:
+                    # It finished before a crash kept us from recording it; collect its result
+                    handle = temporal_client.get_workflow_handle(workflow_id, run_id=e.run_id)
+                if campaign_id in self._cancelled:
+                    # Cancelled while this start was on its way
+                    await handle.cancel()
+                try:
+                    result = await handle.result()
+                    outcome = result.get("status", "error")
+                    failed = [n for n, r in result.get("results", {}).items() if r.get("status") != "success"]
+                    message = result.get("message") or (f"Node(s) not successful: {', '.join(failed)}" if failed else None)
+                    execution_store.record_result(run, workflow_id, result, time.perf_counter() - started, "campaign",
+                                                 handle.result_run_id)
+                except WorkflowFailureError as e:
+                    outcome = "cancelled" if isinstance(e.cause, CancelledError) else "error"
+                    message = str(e.cause or e)
+                    execution_store.record_error(run, workflow_id, e, time.perf_counter() - started, "campaign",
+                                                 handle.result_run_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if temporal_client is not None:
+                temporal_pool.discard(temporal_client, e)
+            if temporal_client is None or (isinstance(e, RPCError) and e.status == RPCStatusCode.UNAVAILABLE):
+                # Temporal is unreachable: pause rather than burn through the list, the contact stays unfinished
+                outcome = None
+                if campaign_id not in self._stopping:
+                    self._stopping.add(campaign_id)
+                    logger.warning(f"Pausing campaign {campaign_id}: Temporal unavailable ({e})")
+                    await asyncio.to_thread(self.store.set_status, campaign_id, PAUSED, f"Temporal unavailable: {e}")
+            else:
+                outcome, message = "error", str(e)
+                execution_store.record_error(run, workflow_id, e, time.perf_counter() - started, "campaign")
+        finally:
+            self._in_flight -= 1
+            in_flight_gauge.set(self._in_flight)
+            admission.release(config.TASK_QUEUE)
+            window.release()
+        if outcome is None:
+            return
+        if outcome not in CONTACT_STATES:
+            outcome = "error"
+        contacts_total.inc(outcome=outcome)
+        await asyncio.to_thread(self.store.finish, campaign_id, row["seq"], outcome, execution_store.summarize(message))
+
+    async def resume_all(self):
+        """On startup: restart the runners of running campaigns and fail uploads that were cut off."""
+        for campaign in await asyncio.to_thread(self.store.list_campaigns, (SPOOLING, RUNNING)):
+            if campaign["status"] == SPOOLING:
+                await asyncio.to_thread(self.store.set_status, campaign["id"], FAILED, "Upload interrupted by a restart.")
+            elif campaign["id"] not in self._runners:
+                logger.info(f"Resuming campaign {campaign['id']}")
+                self._start_runner(campaign["id"])
+
+    async def close(self):
+        """Stop the runners without changing campaign states, so the next process resumes them."""
+        runners = list(self._runners.values())
+        for task in runners:
+            task.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+        self.store.close()
+
+
+campaigns = CampaignManager()
@@ -0,0 +1,106 @@
+"""
+Circuit breaker for calls to an external dependency.
+
+Closed: calls go through and consecutive failures are counted. After
+failure_threshold of them the breaker opens, and calls fail fast for
+reset_timeout seconds. It then goes half-open and lets a single probe call
+through. A success closes the breaker again; a failure re-opens it.
+"""
+import threading
+import time
+
+from metrics import registry
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = registry.gauge(
+    "circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ("breaker",))
+breaker_transitions = registry.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes by target state.", ("breaker", "state"))
+breaker_rejections = registry.counter(
+    "circuit_breaker_rejections_total", "Calls failed fast because the breaker was open.", ("breaker",))
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"successes": 0, "failures": 0, "rejections": 0, "opened": 0}
+        breaker_state.set(0, breaker=name)
+
+    def _transition(self, state: str):
+        self._state = state
+        breaker_state.set(_STATE_VALUES[state], breaker=self.name)
+        breaker_transitions.inc(breaker=self.name, state=state)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self._state == OPEN:
+                waited = self._clock() - self._opened_at
+                if waited < self.reset_timeout:
+                    self._reject(self.reset_timeout - waited)
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                # One probe at a time; everyone else keeps failing fast until it reports back
+                if self._probing:
+                    self._reject(self.reset_timeout)
+                self._probing = True
+
+    def _reject(self, retry_after: float):
+        self._stats["rejections"] += 1
+        breaker_rejections.inc(breaker=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._probing = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._stats["opened"] += 1
+                self._transition(OPEN)
+
+    def release(self):
+        """A call that went through ended without a verdict (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            stats = {"name": self.name, "state": state, "consecutive_failures": self._failures,
+                     "failure_threshold": self.failure_threshold, "reset_timeout": self.reset_timeout, **self._stats}
+            if state == OPEN:
+                stats["retry_after"] = round(max(0.0, self.reset_timeout - (self._clock() - self._opened_at)), 3)
+            return stats
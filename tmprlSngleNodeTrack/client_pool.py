@@ -0,0 +1,89 @@
+"""
+Long-lived Temporal clients shared by every API route.
+"""
+import asyncio
+import itertools
+import logging
+from temporalio.client import Client
+from temporalio.service import RPCError, RPCStatusCode
+
+import config
+import payload_codec
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class TemporalClientPool:
+    """
+    A small pool of Temporal clients created once and reused by every request.
+    start() connects every slot when the app starts; a slot that could not
+    connect then (or was dropped because the server reported the connection
+    as unavailable) reconnects on its next use. Slots are handed out round-robin.
+    """
+
+    def __init__(self, target_host: str = config.TEMPORAL_ADDRESS,
+                 namespace: str = config.TEMPORAL_NAMESPACE,
+                 size: int = config.TEMPORAL_CLIENT_POOL_SIZE,
+                 **connect_kwargs):
+        self.target_host = target_host
+        self.namespace = namespace
+        self.size = max(1, size)
+        self.connect_kwargs = connect_kwargs
+        self._clients: list[Client | None] = [None] * self.size
+        self._locks = [asyncio.Lock() for _ in range(self.size)]
+        self._next_slot = itertools.count()
+
+    async def _connect(self) -> Client:
+        # Clients bind to the runtime current when they connect; whoever connects first
+        # (a readiness probe, say) must not leave the SDK metrics on the default one
+        telemetry.install_runtime()
+        return await Client.connect(self.target_host, namespace=self.namespace, **self.connect_kwargs)
+
+    async def start(self, timeout: float = config.TEMPORAL_CLIENT_CONNECT_TIMEOUT):
+        """Connect every slot up front so requests do not pay for it; never raises."""
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._slot(slot), timeout) for slot in range(self.size)), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            logger.warning(f"{len(failed)}/{self.size} Temporal client slot(s) not connected at startup, "
+                           f"will connect on first use: {type(failed[0]).__name__}: {failed[0]}")
+
+    async def get(self) -> Client:
+        slot = next(self._next_slot) % self.size
+        client = self._clients[slot]
+        if client is not None:
+            return client
+        return await self._slot(slot)
+
+    async def _slot(self, slot: int) -> Client:
+        async with self._locks[slot]:
+            if self._clients[slot] is None:
+                self._clients[slot] = await self._connect()
+                logger.info(f"Connected Temporal client slot {slot} to {self.target_host}")
+            return self._clients[slot]
+
+    def discard(self, client: Client, error: BaseException | None = None):
+        """
+        Drop a client whose connection failed so its slot reconnects on next use.
+        With an error given, the client is only dropped when the error means the
+        server could not be reached.
+        """
+        if error is not None and not (isinstance(error, RPCError) and error.status == RPCStatusCode.UNAVAILABLE):
+            return
+        for slot, current in enumerate(self._clients):
+            if current is client:
+                self._clients[slot] = None
+                logger.warning(f"Temporal client slot {slot} dropped, will reconnect on next use")
+
+    async def close(self):
+        # Temporal clients have no explicit close; dropping the last reference
+        # releases the underlying gRPC connection.
+        self._clients = [None] * self.size
+
+
+temporal_pool = TemporalClientPool(data_converter=payload_codec.data_converter())
+
+
+async def get_temporal_client() -> Client:
+    return await temporal_pool.get()
@@ -0,0 +1,215 @@
+"""
+Runtime settings shared by the API, the worker and the helper scripts.
+Every value can be overridden through an environment variable of the same name.
+"""
+import json
+import os
+
+TEMPORAL_ADDRESS = os.getenv("TEMPORAL_ADDRESS", "localhost:7233")
+TEMPORAL_NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
+TASK_QUEUE = os.getenv("TASK_QUEUE", "call-flow-queue")
+
+# Number of long-lived Temporal clients the API keeps open and round-robins over
+TEMPORAL_CLIENT_POOL_SIZE = int(os.getenv("TEMPORAL_CLIENT_POOL_SIZE", "1"))
+# How long API startup waits to connect them; slots that miss it connect on first use
+TEMPORAL_CLIENT_CONNECT_TIMEOUT = float(os.getenv("TEMPORAL_CLIENT_CONNECT_TIMEOUT", "5"))
+
+# Number of uploaded versions kept per flow in the registry
+FLOW_HISTORY_LIMIT = int(os.getenv("FLOW_HISTORY_LIMIT", "5"))
+
+# Knowledge-base HTTP endpoint and the worker-wide connection pool used to reach it
+KB_BASE_URL = os.getenv("KB_BASE_URL", "http://13.235.73.252:8000")
+KB_QUERY_PATH = os.getenv("KB_QUERY_PATH", "/query/")
+KB_MAX_CONNECTIONS = int(os.getenv("KB_MAX_CONNECTIONS", "100"))
+KB_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("KB_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KB_KEEPALIVE_EXPIRY = float(os.getenv("KB_KEEPALIVE_EXPIRY", "30"))
+KB_HTTP2 = os.getenv("KB_HTTP2", "false").lower() in ("1", "true", "yes")
+KB_CONNECT_TIMEOUT = float(os.getenv("KB_CONNECT_TIMEOUT", "5"))
+KB_READ_TIMEOUT = float(os.getenv("KB_READ_TIMEOUT", "30"))
+KB_WRITE_TIMEOUT = float(os.getenv("KB_WRITE_TIMEOUT", "10"))
+KB_POOL_TIMEOUT = float(os.getenv("KB_POOL_TIMEOUT", "5"))
+
+# Knowledge-base response cache (per worker process)
+KB_CACHE_ENABLED = os.getenv("KB_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+KB_CACHE_MAX_ENTRIES = int(os.getenv("KB_CACHE_MAX_ENTRIES", "1024"))
+KB_CACHE_TTL = float(os.getenv("KB_CACHE_TTL", "300"))
+# Invalidations are appended to this file and replayed by every process on the host (at most
+# KB_CACHE_INVALIDATION_POLL seconds late), so /admin/kb_cache/invalidate reaches out-of-process workers
+KB_CACHE_INVALIDATION_LOG = os.getenv(
+    "KB_CACHE_INVALIDATION_LOG", os.path.expanduser("~/.cache/temporalnode/kb_invalidations.log"))
+KB_CACHE_INVALIDATION_POLL = float(os.getenv("KB_CACHE_INVALIDATION_POLL", "1"))
+
+# Knowledge-base resilience (per worker process): a call never outlives the activity's
+# deadline less KB_DEADLINE_MARGIN; the breaker opens after KB_BREAKER_FAILURES consecutive
+# failures and probes again after KB_BREAKER_RESET seconds. With hedging on, a second request
+# goes out once the first has taken longer than the recent p95 (KB_HEDGE_DELAY until
+# KB_HEDGE_MIN_SAMPLES latencies have been seen).
+KB_DEADLINE_MARGIN = float(os.getenv("KB_DEADLINE_MARGIN", "0.25"))
+KB_BREAKER_FAILURES = int(os.getenv("KB_BREAKER_FAILURES", "5"))
+KB_BREAKER_RESET = float(os.getenv("KB_BREAKER_RESET", "10"))
+KB_HEDGE_ENABLED = os.getenv("KB_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+KB_HEDGE_DELAY = float(os.getenv("KB_HEDGE_DELAY", "1"))
+KB_HEDGE_MIN_SAMPLES = int(os.getenv("KB_HEDGE_MIN_SAMPLES", "20"))
+KB_LATENCY_WINDOW = int(os.getenv("KB_LATENCY_WINDOW", "200"))
+
+# Activity logging: payload clipping and per-activity sampling.
+# ACTIVITY_LOG_SAMPLE_RATES takes overrides like "knowledge_base_call=0.1,http_connectivity=0"
+ACTIVITY_LOG_SAMPLE_RATE = float(os.getenv("ACTIVITY_LOG_SAMPLE_RATE", "1.0"))
+ACTIVITY_LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition("=") for item in os.getenv("ACTIVITY_LOG_SAMPLE_RATES", "").split(","))
+    if name.strip() and rate
+}
+ACTIVITY_LOG_MAX_STRING = int(os.getenv("ACTIVITY_LOG_MAX_STRING", "256"))
+ACTIVITY_LOG_MAX_ITEMS = int(os.getenv("ACTIVITY_LOG_MAX_ITEMS", "20"))
+ACTIVITY_LOG_MAX_DEPTH = int(os.getenv("ACTIVITY_LOG_MAX_DEPTH", "4"))
+
+# Email/SMS micro-batching: NOTIFY_BACKEND is "simulated" or "memory"
+NOTIFY_BACKEND = os.getenv("NOTIFY_BACKEND", "simulated")
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+NOTIFY_BATCH_WINDOW = float(os.getenv("NOTIFY_BATCH_WINDOW", "0.05"))
+NOTIFY_PROVIDER_LATENCY = float(os.getenv("NOTIFY_PROVIDER_LATENCY", "1.0"))
+NOTIFY_PROVIDER_MAX_CONCURRENCY = int(os.getenv("NOTIFY_PROVIDER_MAX_CONCURRENCY", "10"))
+
+# Per-latency-class activity task queues and worker concurrency limits
+FAST_TASK_QUEUE = os.getenv("FAST_TASK_QUEUE", f"{TASK_QUEUE}-fast")
+NOTIFY_TASK_QUEUE = os.getenv("NOTIFY_TASK_QUEUE", f"{TASK_QUEUE}-notify")
+SLOW_TASK_QUEUE = os.getenv("SLOW_TASK_QUEUE", f"{TASK_QUEUE}-slow")
+WORKER_MAX_ACTIVITIES_FAST = int(os.getenv("WORKER_MAX_ACTIVITIES_FAST", "200"))
+WORKER_MAX_ACTIVITIES_NOTIFY = int(os.getenv("WORKER_MAX_ACTIVITIES_NOTIFY", "200"))
+WORKER_MAX_ACTIVITIES_SLOW = int(os.getenv("WORKER_MAX_ACTIVITIES_SLOW", "20"))
+WORKER_MAX_WORKFLOW_TASKS = int(os.getenv("WORKER_MAX_WORKFLOW_TASKS", "100"))
+# Worker processes started by worker_pool.py (defaults to one per CPU core)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0")) or os.cpu_count() or 1
+
+# Longest Request-Timeout a caller may ask for on /run_single_node and /run_flow
+REQUEST_TIMEOUT_MAX = float(os.getenv("REQUEST_TIMEOUT_MAX", "3600"))
+
+# Async runs: longest long-poll on /runs/{id}, and SSE polling/keep-alive/stream limits
+RUN_LONG_POLL_MAX = float(os.getenv("RUN_LONG_POLL_MAX", "30"))
+RUN_EVENTS_POLL_INTERVAL = float(os.getenv("RUN_EVENTS_POLL_INTERVAL", "0.25"))
+RUN_EVENTS_KEEPALIVE = float(os.getenv("RUN_EVENTS_KEEPALIVE", "15"))
+RUN_EVENTS_MAX_SECONDS = float(os.getenv("RUN_EVENTS_MAX_SECONDS", "300"))
+
+# Call sessions (one CallSessionWorkflow per live call): steps before continue-as-new, and
+# how long a session may sit without steps before it closes itself
+CALL_SESSION_MAX_STEPS = int(os.getenv("CALL_SESSION_MAX_STEPS", "200"))
+CALL_SESSION_IDLE_TIMEOUT = float(os.getenv("CALL_SESSION_IDLE_TIMEOUT", "1800"))
+
+# Node types run as local activities inside the workflow task (no task-queue round trip or
+# activity history events). Every workflow worker must use the same set, or replays diverge.
+LOCAL_ACTIVITY_NODE_TYPES = {
+    t.strip() for t in os.getenv("LOCAL_ACTIVITY_NODE_TYPES", "apiConnectivity,http,webhook").split(",")
+    if t.strip()
+}
+LOCAL_ACTIVITY_TIMEOUT = float(os.getenv("LOCAL_ACTIVITY_TIMEOUT", "5"))
+
+# Per-node-type retry/timeout overrides as JSON (see node_policies.py), e.g.
+# NODE_POLICIES='{"knowledgeBaseCall": {"max_attempts": 5, "heartbeat": 5}}'
+NODE_POLICIES = json.loads(os.getenv("NODE_POLICIES", "{}"))
+# How often long-running activities heartbeat while they wait
+ACTIVITY_HEARTBEAT_INTERVAL = float(os.getenv("ACTIVITY_HEARTBEAT_INTERVAL", "2"))
+# Longest the SDK holds back a heartbeat before sending it; bounds how stale streamed KB text is
+HEARTBEAT_THROTTLE_INTERVAL = float(os.getenv("HEARTBEAT_THROTTLE_INTERVAL", "0.2"))
+
+# Idempotent runs: node types whose completed results may be replayed, and for how long
+MEMOIZE_NODE_TYPES = {
+    t.strip() for t in os.getenv("MEMOIZE_NODE_TYPES", "apiConnectivity,http,webhook,knowledgeBaseCall").split(",")
+    if t.strip()
+}
+NODE_RESULT_TTL = float(os.getenv("NODE_RESULT_TTL", "60"))
+NODE_RESULT_MAX_ENTRIES = int(os.getenv("NODE_RESULT_MAX_ENTRIES", "10000"))
+
+# Admission control (see admission.py). Token buckets as "rate:burst" per second, per node type
+# ("flow" for flow runs, "*" for every other type), e.g. "knowledgeBaseCall=20:40;*=200:400",
+# and per caller (X-Caller-Id); empty / 0 disables them. In-flight caps per task queue default
+# to a few times what the workers of that queue run concurrently.
+ADMISSION_NODE_TYPE_RATES = {
+    name.strip(): tuple(float(v) for v in spec.split(":", 1)) if ":" in spec else (float(spec), float(spec))
+    for name, _, spec in (item.partition("=") for item in os.getenv("ADMISSION_NODE_TYPE_RATES", "").split(";"))
+    if name.strip() and spec.strip() and float(spec.split(":")[0]) > 0
+}
+ADMISSION_CALLER_RATE = float(os.getenv("ADMISSION_CALLER_RATE", "0"))
+ADMISSION_CALLER_BURST = float(os.getenv("ADMISSION_CALLER_BURST", "20"))
+ADMISSION_IN_FLIGHT_LIMITS = {
+    TASK_QUEUE: WORKER_MAX_WORKFLOW_TASKS * 10,
+    FAST_TASK_QUEUE: WORKER_MAX_ACTIVITIES_FAST * 5,
+    NOTIFY_TASK_QUEUE: WORKER_MAX_ACTIVITIES_NOTIFY * 5,
+    SLOW_TASK_QUEUE: WORKER_MAX_ACTIVITIES_SLOW * 5,
+    **{
+        name.strip(): int(limit)
+        for name, _, limit in (item.partition("=") for item in os.getenv("ADMISSION_IN_FLIGHT_LIMITS", "").split(";"))
+        if name.strip() and limit.strip()
+    },
+}
+# Retry-After for in-flight rejections, and how long an async run holds its slot at most
+ADMISSION_IN_FLIGHT_RETRY_AFTER = float(os.getenv("ADMISSION_IN_FLIGHT_RETRY_AFTER", "1"))
+ADMISSION_ASYNC_LEASE = float(os.getenv("ADMISSION_ASYNC_LEASE", "60"))
+
+# Artificial activity latency (see latency.py for the model syntax).
+# ACTIVITY_LATENCY_MODELS takes per-activity overrides like "knowledge_base_call=lognormal:0.3,0.5;start_call=zero".
+# Activities of LOCAL_ACTIVITY_NODE_TYPES default to "zero": they run inside the workflow task,
+# so a simulated delay there would hold the task (and the workflow) for its whole length.
+ACTIVITY_LATENCY_MODEL = os.getenv("ACTIVITY_LATENCY_MODEL", "fixed:1")
+_NODE_TYPE_ACTIVITIES = {"apiConnectivity": "api_connectivity", "http": "http_connectivity",
+                         "webhook": "webhook_connectivity"}
+ACTIVITY_LATENCY_MODELS = {
+    _NODE_TYPE_ACTIVITIES[t]: "zero" for t in LOCAL_ACTIVITY_NODE_TYPES if t in _NODE_TYPE_ACTIVITIES
+} | {
+    name.strip(): spec.strip()
+    for name, _, spec in (item.partition("=") for item in os.getenv("ACTIVITY_LATENCY_MODELS", "").split(";"))
+    if name.strip() and spec.strip()
+}
+
+# Metrics: worker-side /metrics port (0 disables; worker_pool.py adds the process index)
+# and the buffer the Temporal SDK's own metrics are collected in between scrapes
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9464"))
+TEMPORAL_METRIC_BUFFER_SIZE = int(os.getenv("TEMPORAL_METRIC_BUFFER_SIZE", "10000"))
+TEMPORAL_METRIC_DRAIN_INTERVAL = float(os.getenv("TEMPORAL_METRIC_DRAIN_INTERVAL", "1"))
+
+# Payload codec: zlib-compress Temporal payloads above PAYLOAD_COMPRESS_THRESHOLD bytes and
+# move those above PAYLOAD_CLAIM_CHECK_THRESHOLD into the blob store, keeping only a reference.
+# BLOB_STORE_DIR must be shared by the API and every worker (e.g. a common volume).
+PAYLOAD_CODEC_ENABLED = os.getenv("PAYLOAD_CODEC_ENABLED", "true").lower() in ("1", "true", "yes")
+PAYLOAD_COMPRESS_THRESHOLD = int(os.getenv("PAYLOAD_COMPRESS_THRESHOLD", "2048"))
+PAYLOAD_CLAIM_CHECK_THRESHOLD = int(os.getenv("PAYLOAD_CLAIM_CHECK_THRESHOLD", "131072"))
+PAYLOAD_COMPRESS_LEVEL = int(os.getenv("PAYLOAD_COMPRESS_LEVEL", "6"))
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.expanduser("~/.cache/temporalnode/blobs"))
+# Blobs not written or re-referenced for BLOB_RETENTION_DAYS are deleted every BLOB_RETENTION_INTERVAL
+# seconds (0 keeps them forever). Keep it above the Temporal namespace's history retention,
+# or replaying an old history can hit a missing blob.
+BLOB_RETENTION_DAYS = float(os.getenv("BLOB_RETENTION_DAYS", "30"))
+BLOB_RETENTION_INTERVAL = float(os.getenv("BLOB_RETENTION_INTERVAL", "3600"))
+
+# Supervisor (supervisor.py): API bind address, whether to start `temporal server start-dev`
+# when TEMPORAL_ADDRESS is not reachable, in-process vs. separate worker processes, and probe limits
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+START_TEMPORAL_SERVER = os.getenv("START_TEMPORAL_SERVER", "auto").lower()  # auto, always or never
+SUPERVISOR_WORKER_PROCESSES = int(os.getenv("SUPERVISOR_WORKER_PROCESSES", "0"))  # 0 = run the worker in-process
+READINESS_PROBE_TIMEOUT = float(os.getenv("READINESS_PROBE_TIMEOUT", "2"))
+TEMPORAL_STARTUP_TIMEOUT = float(os.getenv("TEMPORAL_STARTUP_TIMEOUT", "60"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+
+# Execution history store (SQLite, write-behind) and its retention job
+EXECUTION_STORE_ENABLED = os.getenv("EXECUTION_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXECUTION_STORE_PATH = os.getenv("EXECUTION_STORE_PATH", os.path.expanduser("~/.cache/temporalnode/executions.db"))
+EXECUTION_STORE_BATCH_SIZE = int(os.getenv("EXECUTION_STORE_BATCH_SIZE", "200"))
+EXECUTION_STORE_FLUSH_INTERVAL = float(os.getenv("EXECUTION_STORE_FLUSH_INTERVAL", "0.5"))
+EXECUTION_STORE_QUEUE_SIZE = int(os.getenv("EXECUTION_STORE_QUEUE_SIZE", "10000"))
+EXECUTION_RETENTION_DAYS = float(os.getenv("EXECUTION_RETENTION_DAYS", "30"))
+EXECUTION_RETENTION_INTERVAL = float(os.getenv("EXECUTION_RETENTION_INTERVAL", "3600"))
+# Rows still 'running' after this many seconds are checked against Temporal on
+# each retention run, at most EXECUTION_RECONCILE_BATCH runs per pass
+EXECUTION_RECONCILE_AFTER = float(os.getenv("EXECUTION_RECONCILE_AFTER", "900"))
+EXECUTION_RECONCILE_BATCH = int(os.getenv("EXECUTION_RECONCILE_BATCH", "200"))
+
+# Bulk campaigns: uploaded contact lists spooled to SQLite and run through a flow, at most
+# CAMPAIGN_CONCURRENCY workflows in flight per campaign (capped at CAMPAIGN_MAX_CONCURRENCY).
+# CAMPAIGN_START_RATE caps workflow starts per second per campaign (0 = admission control only).
+CAMPAIGN_STORE_PATH = os.getenv("CAMPAIGN_STORE_PATH", os.path.expanduser("~/.cache/temporalnode/campaigns.db"))
+CAMPAIGN_CONCURRENCY = int(os.getenv("CAMPAIGN_CONCURRENCY", "50"))
+CAMPAIGN_MAX_CONCURRENCY = int(os.getenv("CAMPAIGN_MAX_CONCURRENCY", "1000"))
+CAMPAIGN_START_RATE = float(os.getenv("CAMPAIGN_START_RATE", "0"))
+CAMPAIGN_MAX_CONTACTS = int(os.getenv("CAMPAIGN_MAX_CONTACTS", "1000000"))
+CAMPAIGN_SPOOL_BATCH = int(os.getenv("CAMPAIGN_SPOOL_BATCH", "1000"))
@@ -0,0 +1,411 @@
+"""
+Embedded SQLite store of node runs: one row per (run ID, node ID) with the
+workflow ID, flow version, node type, caller, status, attempts, latency and a
+short result summary. Repeat runs under one workflow ID (same inputs, no
+Idempotency-Key) each get their own rows.
+
+The request path only enqueues rows; a background writer drains the queue in
+batches on a worker thread, so requests never wait on disk. A periodic job
+deletes rows past the retention window and returns the freed pages, and
+closes rows still marked 'running' whose run Temporal reports as finished
+(async runs nobody polled to the end).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from temporalio.service import RPCError, RPCStatusCode
+
+import config
+import run_status
+from client_pool import temporal_pool
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+writes = registry.counter(
+    "execution_store_writes_total", "Execution store row writes by outcome.", ("outcome",))
+queue_depth = registry.gauge("execution_store_queue_depth", "Rows waiting for the write-behind writer.")
+batch_sizes = registry.histogram(
+    "execution_store_batch_size", "Rows written per batch.", buckets=(1, 5, 10, 50, 100, 250, 500, 1000))
+
+SUMMARY_MAX_CHARS = 500
+MAX_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    workflow_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT,
+    flow_id TEXT,
+    flow_version INTEGER,
+    caller TEXT,
+    mode TEXT,
+    status TEXT NOT NULL,
+    error_type TEXT,
+    attempts INTEGER,
+    latency_ms REAL,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    summary TEXT,
+    UNIQUE (run_id, node_id)
+);
+CREATE INDEX IF NOT EXISTS node_runs_workflow ON node_runs (workflow_id, status);
+CREATE INDEX IF NOT EXISTS node_runs_node ON node_runs (node_id, started_at);
+CREATE INDEX IF NOT EXISTS node_runs_caller ON node_runs (caller, started_at);
+CREATE INDEX IF NOT EXISTS node_runs_started ON node_runs (started_at);
+"""
+
+_COLUMNS = ("run_id", "workflow_id", "node_id", "node_type", "flow_id", "flow_version", "caller", "mode", "status",
+            "error_type", "attempts", "latency_ms", "started_at", "updated_at", "summary")
+
+# Later writes for the same run fill in what they know and keep the rest
+_UPSERT = f"""
+INSERT INTO node_runs ({", ".join(_COLUMNS)}) VALUES ({", ".join("?" for _ in _COLUMNS)})
+ON CONFLICT (run_id, node_id) DO UPDATE SET
+    {", ".join(f"{c} = COALESCE(excluded.{c}, node_runs.{c})" for c in _COLUMNS[3:] if c != "started_at")}
+"""
+
+# Completion of a run started earlier (async mode): latency comes from its stored start time.
+# Without a run ID it closes whatever is still running under the workflow ID (one open run at most).
+_COMPLETE = """
+UPDATE node_runs SET status = ?, error_type = COALESCE(?, error_type), attempts = COALESCE(?, attempts),
+    summary = COALESCE(?, summary), updated_at = ?, latency_ms = (? - started_at) * 1000
+WHERE workflow_id = ? AND (? IS NULL OR run_id = ?) AND (? IS NULL OR node_id = ?) AND status = 'running'
+"""
+
+# Stores from before run IDs were keyed by (workflow_id, node_id); their rows keep a NULL run_id
+_MIGRATE_V1 = f"""
+INSERT INTO node_runs (id, {", ".join(_COLUMNS[1:])}) SELECT id, {", ".join(_COLUMNS[1:])} FROM node_runs_v1;
+DROP TABLE node_runs_v1;
+"""
+
+
+def summarize(value) -> str | None:
+    if value is None:
+        return None
+    text = value if isinstance(value, str) else json.dumps(value, default=str, separators=(",", ":"))
+    return text if len(text) <= SUMMARY_MAX_CHARS else text[:SUMMARY_MAX_CHARS] + "..."
+
+
+class ExecutionStore:
+    def __init__(self, path: str = config.EXECUTION_STORE_PATH,
+                 batch_size: int = config.EXECUTION_STORE_BATCH_SIZE,
+                 flush_interval: float = config.EXECUTION_STORE_FLUSH_INTERVAL,
+                 max_queue: int = config.EXECUTION_STORE_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._queue: asyncio.Queue | None = None
+        self._writer: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._db_lock:
+            if self._db is None:
+                if self.path != ":memory:":
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.row_factory = sqlite3.Row
+                # auto_vacuum only takes effect before the first table is created
+                db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                db.execute("PRAGMA journal_mode = WAL")
+                db.execute("PRAGMA synchronous = NORMAL")
+                columns = [r["name"] for r in db.execute("PRAGMA table_info(node_runs)")]
+                migrate = bool(columns) and "run_id" not in columns
+                if migrate:
+                    db.execute("ALTER TABLE node_runs RENAME TO node_runs_v1")
+                    for index in ("node_runs_node", "node_runs_caller", "node_runs_started"):
+                        db.execute(f"DROP INDEX IF EXISTS {index}")
+                db.executescript(_SCHEMA)
+                if migrate:
+                    db.executescript(f"BEGIN; {_MIGRATE_V1} COMMIT;")
+                self._db = db
+            return self._db
+
+    # Write path
+
+    def _ensure_writer(self):
+        if self._writer is None or self._writer.done():
+            self._queue = self._queue or asyncio.Queue(self.max_queue)
+            self._writer = asyncio.ensure_future(self._write_loop())
+
+    def _enqueue(self, op: tuple):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(op)
+        except asyncio.QueueFull:
+            writes.inc(outcome="dropped")
+            return
+        queue_depth.set(self._queue.qsize())
+
+    def record(self, workflow_id: str, node_id: str, status: str, run_id: str | None = None, **fields):
+        """
+        Queue an insert or update of one node run; never blocks. Writes with the
+        same run_id update one row; without one the write is a run of its own.
+        """
+        now = time.time()
+        row = {"run_id": run_id or uuid.uuid4().hex, "workflow_id": workflow_id, "node_id": node_id,
+               "status": status, "started_at": fields.pop("started_at", now), "updated_at": now, **fields}
+        self._enqueue(("upsert", tuple(row.get(c) for c in _COLUMNS)))
+
+    def complete(self, workflow_id: str, status: str, node_id: str | None = None, run_id: str | None = None,
+                 error_type: str | None = None, attempts: int | None = None, summary: str | None = None):
+        """
+        Queue the completion of rows recorded as 'running': those of run_id if
+        given, else the workflow's; all nodes if node_id is None.
+        """
+        now = time.time()
+        self._enqueue(("complete", (status, error_type, attempts, summary, now, now, workflow_id,
+                                    run_id, run_id, node_id, node_id)))
+
+    async def _write_loop(self):
+        # A None entry is the shutdown sentinel: write what was collected and stop
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            stop = batch[-1] is None
+            batch = [op for op in batch if op is not None]
+            queue_depth.set(self._queue.qsize())
+            if batch:
+                await self._write(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[tuple]):
+        db = self._connect()
+        with self._db_lock, db:
+            for kind, params in batch:
+                db.execute(_UPSERT if kind == "upsert" else _COMPLETE, params)
+
+    async def _write(self, batch: list[tuple]):
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            writes.inc(len(batch), outcome="written")
+            batch_sizes.observe(len(batch))
+        except Exception as e:
+            writes.inc(len(batch), outcome="failed")
+            logger.warning(f"Could not write {len(batch)} execution rows: {e}")
+
+    async def close(self):
+        """Write everything still queued, then close the database."""
+        if self._writer is not None and not self._writer.done():
+            await self._queue.put(None)
+            await self._writer
+        self._writer = None
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # Read path
+
+    def _query(self, filters: dict, limit: int, cursor: str | None) -> dict:
+        where, params = [], []
+        for column in ("node_id", "caller", "flow_id", "node_type", "status", "workflow_id", "run_id"):
+            if filters.get(column) is not None:
+                where.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("since") is not None:
+            where.append("started_at >= ?")
+            params.append(filters["since"])
+        if filters.get("until") is not None:
+            where.append("started_at < ?")
+            params.append(filters["until"])
+        if cursor:
+            # Keyset pagination: newest first, continuing below the last row returned
+            started_at, _, row_id = cursor.partition(":")
+            where.append("(started_at < ? OR (started_at = ? AND id < ?))")
+            params += [float(started_at), float(started_at), int(row_id)]
+        sql = "SELECT * FROM node_runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        db = self._connect()
+        with self._db_lock:
+            rows = [dict(r) for r in db.execute(sql, params)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['started_at']!r}:{rows[-1]['id']}"
+        return {"items": rows, "next_cursor": next_cursor}
+
+    async def query(self, limit: int = 100, cursor: str | None = None, **filters) -> dict:
+        """
+        Runs matching the filters (node_id, caller, flow_id, node_type, status,
+        workflow_id, run_id, since/until as epoch seconds), newest first. Pass the
+        returned next_cursor to get the following page.
+        """
+        return await asyncio.to_thread(self._query, filters, min(max(1, limit), MAX_PAGE_SIZE), cursor)
+
+    # Retention
+
+    def _prune(self, older_than: float) -> int:
+        db = self._connect()
+        with self._db_lock:
+            with db:
+                removed = db.execute("DELETE FROM node_runs WHERE started_at < ?", (older_than,)).rowcount
+            if removed:
+                db.execute("PRAGMA incremental_vacuum")
+                db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    async def prune(self, retention_seconds: float = config.EXECUTION_RETENTION_DAYS * 86400) -> int:
+        """Delete runs older than the retention window and compact the file."""
+        removed = await asyncio.to_thread(self._prune, time.time() - retention_seconds)
+        if removed:
+            logger.info(f"Pruned {removed} execution rows older than {retention_seconds / 86400:g} days")
+        return removed
+
+    def _stale_running(self, older_than: float, limit: int) -> list[tuple]:
+        db = self._connect()
+        with self._db_lock:
+            return [(r[0], r[1]) for r in db.execute(
+                "SELECT workflow_id, run_id FROM node_runs WHERE status = 'running' AND updated_at < ? "
+                "GROUP BY workflow_id, run_id ORDER BY MIN(updated_at) LIMIT ?", (older_than, limit))]
+
+    def complete_from_snapshot(self, workflow_id: str, snapshot: dict):
+        """Queue the completion of a run's rows from a run_status snapshot of the finished run."""
+        run_id = snapshot.get("run_id")
+        result = snapshot.get("result")
+        if not isinstance(result, dict):
+            self.complete(workflow_id, snapshot.get("status", "unknown"), run_id=run_id,
+                          summary=summarize(snapshot.get("error")))
+            return
+        node_results = result["results"] if isinstance(result.get("results"), dict) else {None: result}
+        for node_id, node_result in node_results.items():
+            self.complete(
+                workflow_id, node_result.get("status", "unknown"), node_id, run_id,
+                error_type=node_result.get("error_type"), attempts=node_result.get("attempts"),
+                summary=summarize(node_result.get("activity_result", node_result.get("message"))),
+            )
+
+    async def reconcile(self, stale_seconds: float = config.EXECUTION_RECONCILE_AFTER,
+                        limit: int = config.EXECUTION_RECONCILE_BATCH) -> int:
+        """
+        Ask Temporal about runs still 'running' here after stale_seconds and
+        close the rows of those that finished. Returns the number of runs closed.
+        """
+        runs = await asyncio.to_thread(self._stale_running, time.time() - stale_seconds, limit)
+        if not runs:
+            return 0
+        temporal_client = await temporal_pool.get()
+        closed = 0
+        for workflow_id, run_id in runs:
+            try:
+                snapshot = await run_status.describe_run(temporal_client.get_workflow_handle(workflow_id, run_id=run_id))
+            except RPCError as e:
+                if e.status != RPCStatusCode.NOT_FOUND:
+                    temporal_pool.discard(temporal_client, e)
+                    raise
+                # Past the namespace's own retention: its outcome is gone
+                snapshot = {"run_id": run_id, "status": "unknown", "error": "Run no longer known to Temporal."}
+            if snapshot["status"] != "running":
+                self.complete_from_snapshot(workflow_id, snapshot)
+                closed += 1
+        if closed:
+            logger.info(f"Closed {closed} execution rows left running by runs that already finished")
+        return closed
+
+    async def retention_loop(self, interval: float = config.EXECUTION_RETENTION_INTERVAL):
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.warning(f"Execution store retention run failed: {e}")
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.warning(f"Execution store reconcile run failed: {e}")
+            await asyncio.sleep(interval)
+
+
+execution_store = ExecutionStore()
+
+
+@dataclass(frozen=True)
+class RunInfo:
+    """What the API knows about a run before it starts: its flow version, caller and nodes (id -> type)."""
+    flow_id: str
+    flow_version: int
+    caller: str | None
+    nodes: dict
+
+    @property
+    def label(self) -> str:
+        """Metrics label: the node type of a single-node run, "flow" otherwise."""
+        return next(iter(self.nodes.values())) if len(self.nodes) == 1 else "flow"
+
+
+def _node_fields(run: RunInfo, node_id: str, mode: str) -> dict:
+    return {"node_type": run.nodes.get(node_id), "flow_id": run.flow_id, "flow_version": run.flow_version,
+            "caller": run.caller, "mode": mode}
+
+
+def _node_results(run: RunInfo, result: dict) -> dict:
+    if isinstance(result.get("results"), dict):
+        return result["results"]
+    return {node_id: result for node_id in run.nodes}
+
+
+# run_id is the Temporal run ID when the run started (for a session step, the step's own ID);
+# without one, the nodes of this call are recorded as a run of their own.
+
+def record_started(run: RunInfo, workflow_id: str, mode: str, run_id: str | None = None):
+    if not config.EXECUTION_STORE_ENABLED:
+        return
+    run_id = run_id or uuid.uuid4().hex
+    for node_id in run.nodes:
+        execution_store.record(workflow_id, node_id, "running", run_id, **_node_fields(run, node_id, mode))
+
+
+def record_result(run: RunInfo, workflow_id: str, result: dict, latency: float, mode: str = "sync",
+                  run_id: str | None = None):
+    if not config.EXECUTION_STORE_ENABLED:
+        return
+    run_id = run_id or uuid.uuid4().hex
+    for node_id, node_result in _node_results(run, result).items():
+        execution_store.record(
+            workflow_id, node_id, node_result.get("status", "unknown"), run_id,
+            error_type=node_result.get("error_type"),
+            attempts=node_result.get("attempts"),
+            latency_ms=node_result.get("latency_ms", latency * 1000),
+            summary=summarize(node_result.get("activity_result", node_result.get("message"))),
+            **_node_fields(run, node_id, mode),
+        )
+
+
+def record_error(run: RunInfo, workflow_id: str, error: Exception, latency: float, mode: str = "sync",
+                 run_id: str | None = None):
+    if not config.EXECUTION_STORE_ENABLED:
+        return
+    run_id = run_id or uuid.uuid4().hex
+    for node_id in run.nodes:
+        execution_store.record(workflow_id, node_id, "error", run_id, error_type=type(error).__name__,
+                               latency_ms=latency * 1000, summary=summarize(str(error)),
+                               **_node_fields(run, node_id, mode))
+
+
+def record_completion(workflow_id: str, snapshot: dict):
+    """Close the rows of an async run once a status poll sees it finished."""
+    if not config.EXECUTION_STORE_ENABLED or snapshot.get("status") == "running":
+        return
+    execution_store.complete_from_snapshot(workflow_id, snapshot)
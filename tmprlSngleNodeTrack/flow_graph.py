@@ -0,0 +1,81 @@
+"""
+Graph helpers for whole-flow execution. Pure functions so they can run both in
+the API (to validate a request) and inside workflow code.
+"""
+
+
+def _edge_ends(edge: dict) -> tuple[str, str]:
+    source, target = edge.get("source"), edge.get("target")
+    if not source or not target:
+        raise ValueError(f"Edge {edge} must have a 'source' and a 'target'.")
+    return source, target
+
+
+def _find_flagged(nodes: list, flag: str) -> str | None:
+    return next((n["uniqueId"] for n in nodes if n.get(flag)), None)
+
+
+def plan_flow(nodes: list, edges: list, start: str | None = None, end: str | None = None) -> dict:
+    """
+    Work out which nodes to run and in what order.
+
+    Only nodes reachable from the start node that can also reach the end node
+    are kept. Returns {"start", "end", "order", "predecessors"} where order is a
+    topological order and predecessors maps each kept node to its upstream
+    nodes in edge order. Raises ValueError for unknown nodes or cycles.
+    """
+    node_ids = [n["uniqueId"] for n in nodes]
+    known = set(node_ids)
+    start = start or _find_flagged(nodes, "isStart_node")
+    end = end or _find_flagged(nodes, "isEnd_node")
+    if not start:
+        raise ValueError("No start node given and no node has isStart_node set.")
+    for node_id in (start, end):
+        if node_id and node_id not in known:
+            raise ValueError(f"Node '{node_id}' is not part of the flow.")
+
+    successors = {node_id: [] for node_id in node_ids}
+    predecessors = {node_id: [] for node_id in node_ids}
+    for edge in edges:
+        source, target = _edge_ends(edge)
+        if source not in known or target not in known:
+            raise ValueError(f"Edge {source} -> {target} references an unknown node.")
+        successors[source].append(target)
+        predecessors[target].append(source)
+
+    def reachable(root: str, links: dict) -> set:
+        seen, stack = {root}, [root]
+        while stack:
+            for nxt in links[stack.pop()]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    keep = reachable(start, successors)
+    if end:
+        if end not in keep:
+            raise ValueError(f"End node '{end}' is not reachable from start node '{start}'.")
+        keep &= reachable(end, predecessors)
+
+    # Kahn's algorithm over the kept subgraph, in upload order for determinism
+    in_degree = {n: sum(1 for p in predecessors[n] if p in keep) for n in node_ids if n in keep}
+    ready = [n for n in node_ids if n in keep and in_degree[n] == 0]
+    order = []
+    while ready:
+        current = ready.pop(0)
+        order.append(current)
+        for nxt in successors[current]:
+            if nxt in in_degree:
+                in_degree[nxt] -= 1
+                if in_degree[nxt] == 0:
+                    ready.append(nxt)
+    if len(order) != len(keep):
+        raise ValueError("Flow graph contains a cycle.")
+
+    return {
+        "start": start,
+        "end": end,
+        "order": order,
+        "predecessors": {n: [p for p in predecessors[n] if p in keep] for n in order},
+    }
@@ -0,0 +1,147 @@
+"""
+In-memory registry of uploaded node flows, keyed by flow ID and version.
+"""
+import copy
+from dataclasses import dataclass, field
+
+import config
+from node_policies import policy_for
+from node_schemas import compile_node, validate_inputs
+
+DEFAULT_FLOW_ID = "default"
+
+
+@dataclass(frozen=True)
+class FlowVersion:
+    """
+    One immutable uploaded version of a flow with an index from uniqueId to node
+    and the compiled plan (resolved type and activity, inputs still required)
+    of every node. Stored nodes are private copies and must never be mutated;
+    use node_with_inputs() or validated_node() to get a per-request view.
+    """
+    flow_id: str
+    version: int
+    data: dict
+    nodes_by_id: dict = field(repr=False)
+    compiled: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(cls, flow_id: str, version: int, data: dict) -> "FlowVersion":
+        if not isinstance(data, dict):
+            raise ValueError("Flow must be a JSON object.")
+        data = copy.deepcopy(data)
+        nodes = data.get("nodes")
+        if not isinstance(nodes, list):
+            raise ValueError("Flow must contain a 'nodes' list.")
+        edges = data.get("edges")
+        if edges is not None and not (isinstance(edges, list) and all(isinstance(e, dict) for e in edges)):
+            raise ValueError("Flow 'edges' must be a list of objects.")
+        nodes_by_id, compiled = {}, {}
+        for node in nodes:
+            node_id = node.get("uniqueId") if isinstance(node, dict) else None
+            if not node_id or not isinstance(node_id, str):
+                raise ValueError("Every node must be an object with a string 'uniqueId'.")
+            if not isinstance(node.get("type"), str):
+                raise ValueError(f"Node '{node_id}' must have a string 'type'.")
+            if node.get("config") is not None and not isinstance(node["config"], dict):
+                raise ValueError(f"Node '{node_id}' config must be an object.")
+            if node_id in nodes_by_id:
+                raise ValueError(f"Duplicate node uniqueId '{node_id}'.")
+            compiled[node_id] = compile_node(node)
+            # Aliased types are stored under the name the workflow dispatches on
+            node["type"] = compiled[node_id].node_type
+            try:
+                policy_for(node)
+            except ValueError as e:
+                raise ValueError(f"Node '{node_id}': {e}") from None
+            nodes_by_id[node_id] = node
+        for edge in edges or []:
+            for end in ("source", "target"):
+                if edge.get(end) not in nodes_by_id:
+                    raise ValueError(f"Edge {edge.get('source')} -> {edge.get('target')} references an unknown node.")
+        return cls(flow_id, version, data, nodes_by_id, compiled)
+
+    @property
+    def edges(self) -> list:
+        return self.data.get("edges", [])
+
+    def get_node(self, node_id: str) -> dict | None:
+        return self.nodes_by_id.get(node_id)
+
+    def node_with_inputs(self, node_id: str, inputs: dict) -> dict | None:
+        """
+        Return the node with request inputs merged over its stored properties.
+        Only the dicts on the path to the properties are copied, so the stored
+        node is never touched and the copy stays cheap.
+        """
+        node = self.nodes_by_id.get(node_id)
+        if node is None:
+            return None
+        node_config = node.get("config") or {}
+        properties = {**node_config.get("properties", {}), **inputs}
+        return {**node, "config": {**node_config, "properties": properties}}
+
+    def validated_node(self, node_id: str, inputs: dict) -> tuple[dict | None, list[str]]:
+        """
+        node_with_inputs() checked against the node type's input schema.
+        Returns the node with defaults filled in and the list of input errors.
+        """
+        node = self.node_with_inputs(node_id, inputs)
+        if node is None:
+            return None, []
+        properties, errors = validate_inputs(self.compiled[node_id].schema, node["config"]["properties"])
+        return {**node, "config": {**node["config"], "properties": properties}}, errors
+
+    def missing_inputs(self) -> dict[str, list[str]]:
+        """Required inputs each node's stored config lacks, so every run must supply them."""
+        return {node_id: list(c.missing) for node_id, c in self.compiled.items() if c.missing}
+
+
+class FlowRegistry:
+    """
+    Holds the recent versions of every flow plus a pointer to the current one.
+    Publishing replaces the pointer in a single assignment, so requests that
+    already resolved a FlowVersion keep running against it undisturbed.
+    """
+
+    def __init__(self, history_limit: int = config.FLOW_HISTORY_LIMIT):
+        self.history_limit = max(1, history_limit)
+        self._versions: dict[str, dict[int, FlowVersion]] = {}
+        self._current: dict[str, FlowVersion] = {}
+        self._latest_version: dict[str, int] = {}
+
+    def publish(self, flow_id: str, data: dict, version: int | None = None) -> FlowVersion:
+        versions = self._versions.get(flow_id, {})
+        if version is None:
+            version = self._latest_version.get(flow_id, 0) + 1
+        elif version in versions:
+            raise ValueError(f"Version {version} of flow '{flow_id}' already exists.")
+        flow = FlowVersion.build(flow_id, version, data)
+
+        # Copy-on-write so readers iterating the old mapping are unaffected
+        versions = {**versions, version: flow}
+        while len(versions) > self.history_limit:
+            versions.pop(min(v for v in versions if v != version))
+        self._versions[flow_id] = versions
+        self._latest_version[flow_id] = max(version, self._latest_version.get(flow_id, 0))
+        self._current[flow_id] = flow
+        return flow
+
+    def get(self, flow_id: str = DEFAULT_FLOW_ID, version: int | None = None) -> FlowVersion | None:
+        if version is None:
+            return self._current.get(flow_id)
+        return self._versions.get(flow_id, {}).get(version)
+
+    def list_flows(self) -> list[dict]:
+        return [
+            {
+                "flow_id": flow_id,
+                "current_version": current.version,
+                "versions": sorted(self._versions.get(flow_id, {})),
+                "node_count": len(current.nodes_by_id),
+            }
+            for flow_id, current in self._current.items()
+        ]
+
+
+flow_registry = FlowRegistry()
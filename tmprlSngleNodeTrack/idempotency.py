@@ -0,0 +1,47 @@
+"""
+Idempotency keys for node runs and memoized results for node types that are
+safe to repeat.
+"""
+import hashlib
+import json
+
+import config
+from caching import TTLCache
+
+MAX_KEY_LENGTH = 200
+
+# Workflow ID -> successful response, only for MEMOIZE_NODE_TYPES
+node_results = TTLCache("node_results", config.NODE_RESULT_MAX_ENTRIES, config.NODE_RESULT_TTL)
+
+
+def derive_key(flow_id: str, version: int, node_id: str, inputs: dict) -> str:
+    """Stable key for one node run: same flow version, node and merged inputs give the same key."""
+    canonical = json.dumps(
+        {"flow_id": flow_id, "version": version, "node_id": node_id, "inputs": inputs},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def validate_key(key: str) -> str | None:
+    """Return an error message if a client-supplied key cannot be used in a workflow ID."""
+    if not key.strip():
+        return "Idempotency-Key must not be empty."
+    if len(key) > MAX_KEY_LENGTH:
+        return f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters."
+    return None
+
+
+def is_memoizable(node_type: str) -> bool:
+    return node_type in config.MEMOIZE_NODE_TYPES
+
+
+def worth_replaying(result: dict) -> bool:
+    """
+    Whether a node's response may be memoized: the run succeeded and the
+    activity's own payload is not an error response (a KB error dict, say).
+    """
+    if result.get("status") != "success":
+        return False
+    payload = result.get("activity_result")
+    return not (isinstance(payload, dict) and payload.get("status") == "error")
@@ -0,0 +1,55 @@
+"""
+Configurable stand-ins for the artificial delays in activities.
+
+A model spec is "<kind>:<params>":
+    fixed:1            always 1 second (the historical default)
+    uniform:0.1,0.5    uniformly between 0.1 and 0.5 seconds
+    normal:0.3,0.05    normal with mean 0.3 and stddev 0.05, floored at 0
+    lognormal:0.2,0.5  log-normal with median 0.2 and sigma 0.5
+    zero               no delay
+"""
+import asyncio
+import math
+import random
+
+import config
+
+
+def parse_model(spec: str):
+    """Turn a model spec into a zero-argument function returning seconds."""
+    kind, _, params = spec.strip().partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    if kind == "zero":
+        return lambda: 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency model '{spec}'")
+
+
+_default = parse_model(config.ACTIVITY_LATENCY_MODEL)
+_overrides = {name: parse_model(spec) for name, spec in config.ACTIVITY_LATENCY_MODELS.items()}
+
+
+def set_model(spec: str, activity_name: str | None = None):
+    """Replace the model for one activity, or the default for all of them."""
+    global _default
+    if activity_name is None:
+        _default = parse_model(spec)
+    else:
+        _overrides[activity_name] = parse_model(spec)
+
+
+def sample(activity_name: str) -> float:
+    return _overrides.get(activity_name, _default)()
+
+
+async def simulate(activity_name: str):
+    delay = sample(activity_name)
+    if delay > 0:
+        await asyncio.sleep(delay)
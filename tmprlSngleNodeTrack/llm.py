@@ -1,28 +1,440 @@
 """
 LLM and external service utilities (currently only query_document is used).
+
+Knowledge-base calls are bounded by the caller's deadline, fail fast through
+a circuit breaker while the endpoint is unhealthy, and can be hedged: if the
+first request is slower than the recent p95, a second identical one is sent
+and whichever answers first wins (the query is read-only, so this is safe).
+
+With on_chunk, the answer is requested as NDJSON ({"delta": ...} lines and a
+final {"result": ...} line) and each piece of text is handed over as it
+arrives; the returned response is the same as without streaming. Streams are
+not hedged.
 """
+import asyncio
+import importlib.util
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
 import httpx
 
-async def query_document(query: str, user_id: str = "cheatsheat5", folder_id: str = "langchainCllm") -> dict:
-    url = "http://13.235.73.252:8000/query/"
+import config
+from caching import CoalescingCache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+kb_requests = registry.counter(
+    "kb_http_requests_total", "Knowledge-base HTTP requests by connection use.", ("connection",))
+kb_pool_wait = registry.histogram(
+    "kb_http_pool_wait_seconds", "Time a knowledge-base request waited for a pooled connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+kb_in_flight = registry.gauge(
+    "kb_http_in_flight_requests", "Knowledge-base requests currently holding or waiting for a connection.")
+kb_pool_saturation = registry.gauge(
+    "kb_http_pool_saturation", "In-flight knowledge-base requests as a fraction of max pool connections.")
+kb_pool_timeouts = registry.counter(
+    "kb_http_pool_timeouts_total", "Knowledge-base requests that gave up waiting for a pooled connection.")
+kb_deadline_exceeded = registry.counter(
+    "kb_deadline_exceeded_total", "Knowledge-base calls cut short (or never sent) because the deadline ran out.")
+kb_hedges = registry.counter(
+    "kb_hedged_requests_total", "Hedged knowledge-base calls by the request that answered.", ("winner",))
+
+# Worker-wide client, created by on_startup() and closed by on_shutdown()
+async_client: httpx.AsyncClient | None = None
+
+# Answers keyed by (normalized query, user_id, folder_id)
+kb_cache = CoalescingCache("knowledge_base", config.KB_CACHE_MAX_ENTRIES, config.KB_CACHE_TTL)
+
+class InvalidationLog:
+    """
+    Folder invalidations shared by the processes on one host through an
+    append-only file: each process appends its own and, at most every
+    poll_interval seconds, replays the lines the others added since.
+    """
+    MAX_BYTES = 1 << 20
+
+    def __init__(self, path: str, poll_interval: float, cache: CoalescingCache):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        # A new process has an empty cache, so older entries need no replay
+        self._offset = self._size()
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def publish(self, folder_id: str):
+        line = json.dumps({"folder_id": folder_id, "at": time.time()}) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Readers notice the file shrank and replay it from the start, which is harmless
+            mode = "w" if self._size() > self.MAX_BYTES else "a"
+            with open(self.path, mode) as f:
+                f.write(line)
+
+    def poll(self):
+        now = time.monotonic()
+        if now - self._checked < self.poll_interval:
+            return
+        with self._lock:
+            self._checked = now
+            size = self._size()
+            if size == self._offset:
+                return
+            if size < self._offset:
+                self._offset = 0
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read(size - self._offset)
+            except OSError as e:
+                logger.warning(f"Could not read KB cache invalidations from {self.path}: {e}")
+                return
+            # Only whole lines; a line still being written is read next time
+            data = data[:data.rfind(b"\n") + 1]
+            self._offset += len(data)
+        for line in data.splitlines():
+            try:
+                folder_id = json.loads(line)["folder_id"]
+            except (ValueError, KeyError):
+                continue
+            self.cache.invalidate(lambda key: key[2] == folder_id)
+
+
+kb_invalidations = InvalidationLog(config.KB_CACHE_INVALIDATION_LOG, config.KB_CACHE_INVALIDATION_POLL, kb_cache)
+
+# error_type of KB error responses: cut short by the caller's deadline, refused by the open
+# breaker, or rejected by the endpoint (4xx). Other errors (5xx, network) carry no error_type.
+DEADLINE_EXCEEDED = "DeadlineExceeded"
+CIRCUIT_OPEN = "CircuitOpen"
+KB_REJECTED = "KnowledgeBaseRejected"
+
+kb_breaker = CircuitBreaker("knowledge_base", config.KB_BREAKER_FAILURES, config.KB_BREAKER_RESET)
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls, for the hedging delay."""
+
+    def __init__(self, size: int, min_samples: int):
+        self._samples = deque(maxlen=max(1, size))
+        self.min_samples = min_samples
+        self._p95: float | None = None
+        self._stale = 0
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._stale += 1
+
+    def p95(self) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        # Re-sorting a few hundred samples is cheap, but not worth doing on every call
+        if self._p95 is None or self._stale >= 10:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+            self._stale = 0
+        return self._p95
+
+
+kb_latency = LatencyWindow(config.KB_LATENCY_WINDOW, config.KB_HEDGE_MIN_SAMPLES)
+
+
+def _http2_enabled() -> bool:
+    if config.KB_HTTP2 and importlib.util.find_spec("h2") is None:
+        logger.warning("KB_HTTP2 is set but the 'h2' package is not installed, falling back to HTTP/1.1")
+        return False
+    return config.KB_HTTP2
+
+
+def create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=config.KB_BASE_URL,
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=config.KB_MAX_CONNECTIONS,
+            max_keepalive_connections=config.KB_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.KB_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=config.KB_CONNECT_TIMEOUT,
+            read=config.KB_READ_TIMEOUT,
+            write=config.KB_WRITE_TIMEOUT,
+            pool=config.KB_POOL_TIMEOUT,
+        ),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    # Falls back to a lazily created client when used outside the worker lifecycle
+    global async_client
+    if async_client is None or async_client.is_closed:
+        async_client = create_client()
+    return async_client
+
+
+class _PoolTrace:
+    """
+    httpcore trace hook for one request: notes whether a new TCP connection was
+    opened and how long the request waited before it could send its headers.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.new_connection = False
+        self.recorded = False
+
+    async def __call__(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.started":
+            self.new_connection = True
+            self._record()
+        elif event_name.endswith("send_request_headers.started"):
+            self._record()
+
+    def _record(self):
+        if self.recorded:
+            return
+        self.recorded = True
+        kb_pool_wait.observe(time.perf_counter() - self.started)
+        kb_requests.inc(connection="new" if self.new_connection else "reused")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+async def query_document(query: str, user_id: str = "cheatsheat5", folder_id: str = "langchainCllm",
+                         deadline: float | None = None, on_chunk=None) -> dict:
+    """
+    deadline is a time.monotonic() value the call must finish by (None for the
+    client's own timeouts); on_chunk(text), if given, streams the answer.
+    A cached answer is returned without calling on_chunk.
+
+    Concurrent misses for one query share a single request, sent under the
+    first caller's deadline; every caller still waits no longer than its own.
+    Streamed calls read and fill the cache but never share a request, since a
+    shared one would stream to its first caller only.
+    """
+    if not config.KB_CACHE_ENABLED:
+        return await _post_query(query, user_id, folder_id, deadline, on_chunk)
+    kb_invalidations.poll()
+    load = kb_cache.get_or_load(
+        (normalize_query(query), user_id, folder_id),
+        lambda: _post_query(query, user_id, folder_id, deadline, on_chunk),
+        cacheable=_cacheable,
+        coalesce=on_chunk is None,
+    )
+    if deadline is None:
+        return await load
+    budget = deadline - time.monotonic() - config.KB_DEADLINE_MARGIN
+    if budget <= 0:
+        load.close()
+        kb_deadline_exceeded.inc()
+        return _deadline_error("no time left before the deadline")
+    try:
+        response = await asyncio.wait_for(load, budget)
+    except asyncio.TimeoutError:
+        # The shared request carries on for the callers that can still wait
+        kb_deadline_exceeded.inc()
+        return _deadline_error(f"deadline exceeded after {budget:.2f}s")
+    if isinstance(response, dict) and response.get("error_type") == DEADLINE_EXCEEDED \
+            and deadline - time.monotonic() - config.KB_DEADLINE_MARGIN > 0:
+        # The shared request ran out under a shorter deadline than ours
+        return await _post_query(query, user_id, folder_id, deadline, on_chunk)
+    return response
+
+
+def _cacheable(response) -> bool:
+    return not (isinstance(response, dict) and response.get("status") == "error")
+
+
+def _deadline_error(reason: str) -> dict:
+    return {"status": "error", "message": f"Request failed: {reason}", "error_type": DEADLINE_EXCEEDED}
+
+
+def invalidate_folder(folder_id: str) -> int:
+    """
+    Forget cached answers for one folder, e.g. after its documents are
+    re-indexed. Returns the entries removed in this process; the other
+    processes on the host drop theirs when they next poll the log.
+    """
+    kb_invalidations.publish(folder_id)
+    return kb_cache.invalidate(lambda key: key[2] == folder_id)
+
+
+def _hedge_delay() -> float | None:
+    if not config.KB_HEDGE_ENABLED:
+        return None
+    p95 = kb_latency.p95()
+    return config.KB_HEDGE_DELAY if p95 is None else p95
+
+
+def answer_text(response) -> str:
+    if isinstance(response, dict):
+        return str(response.get("answer", response.get("result", "")))
+    return str(response)
+
+
+async def _read_stream(response: httpx.Response, on_chunk) -> dict:
+    if not response.headers.get("content-type", "").startswith("application/x-ndjson"):
+        # The endpoint ignored the stream request; hand over the whole answer at once
+        await response.aread()
+        result = response.json()
+        on_chunk(answer_text(result))
+        return result
+    parts, result = [], None
+    async for line in response.aiter_lines():
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if "delta" in message:
+            parts.append(message["delta"])
+            on_chunk(message["delta"])
+        elif "result" in message:
+            result = message["result"]
+    return result if result is not None else {"status": "success", "answer": "".join(parts)}
+
+
+async def _send(payload: dict, budget: float | None, on_chunk=None) -> dict:
+    """One HTTP request; raises on transport errors and non-2xx responses."""
+    client = get_client()
+    trace = _PoolTrace()
+    timeout = httpx.USE_CLIENT_DEFAULT
+    if budget is not None:
+        timeout = httpx.Timeout(
+            connect=min(config.KB_CONNECT_TIMEOUT, budget),
+            read=min(config.KB_READ_TIMEOUT, budget),
+            write=min(config.KB_WRITE_TIMEOUT, budget),
+            pool=min(config.KB_POOL_TIMEOUT, budget),
+        )
+    kb_in_flight.inc()
+    kb_pool_saturation.set(kb_in_flight.value() / config.KB_MAX_CONNECTIONS)
+    try:
+        if on_chunk is None:
+            response = await client.post(config.KB_QUERY_PATH, json=payload, timeout=timeout, extensions={"trace": trace})
+            response.raise_for_status()
+            return response.json()
+        async with client.stream("POST", config.KB_QUERY_PATH, json={**payload, "stream": True},
+                                 headers={"accept": "application/x-ndjson"}, timeout=timeout,
+                                 extensions={"trace": trace}) as response:
+            response.raise_for_status()
+            return await _read_stream(response, on_chunk)
+    finally:
+        kb_in_flight.dec()
+        kb_pool_saturation.set(kb_in_flight.value() / config.KB_MAX_CONNECTIONS)
+
+
+async def _hedged(payload: dict, budget: float | None) -> dict:
+    delay = _hedge_delay()
+    if delay is None or (budget is not None and budget <= delay):
+        return await _send(payload, budget)
+    first = asyncio.ensure_future(_send(payload, budget))
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(_send(payload, None if budget is None else budget - delay))
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    kb_hedges.inc(winner="hedge" if task is second else "primary")
+                    return task.result()
+        # Both failed: report the first request's error
+        return first.result()
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def _post_query(query: str, user_id: str, folder_id: str, deadline: float | None = None,
+                      on_chunk=None) -> dict:
     payload = {
         "query": query,
         "user_id": user_id,
         "folder_id": folder_id
     }
+    budget = None if deadline is None else deadline - time.monotonic() - config.KB_DEADLINE_MARGIN
+    if budget is not None and budget <= 0:
+        kb_deadline_exceeded.inc()
+        return _deadline_error("no time left before the deadline")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()  # Return parsed JSON
+        kb_breaker.before_call()
+    except CircuitOpenError as e:
+        return {"status": "error", "message": f"Request failed: {e}", "error_type": CIRCUIT_OPEN,
+                "retry_after": round(e.retry_after, 3)}
+    started = time.monotonic()
+    try:
+        call = _hedged(payload, budget) if on_chunk is None else _send(payload, budget, on_chunk)
+        response = await asyncio.wait_for(call, budget)
+    except asyncio.TimeoutError:
+        # Only a budget the endpoint should comfortably meet says anything about its health;
+        # callers with tight Request-Timeouts must not open the breaker for everyone
+        if budget >= config.KB_READ_TIMEOUT:
+            kb_breaker.record_failure()
+        else:
+            kb_breaker.release()
+        kb_deadline_exceeded.inc()
+        return _deadline_error(f"deadline exceeded after {budget:.2f}s")
+    except httpx.PoolTimeout as e:
+        # Our own pool is exhausted; says nothing about the endpoint's health
+        kb_breaker.release()
+        kb_pool_timeouts.inc()
+        return {"status": "error", "message": f"Request failed: connection pool exhausted ({e})"}
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            kb_breaker.record_failure()
+            return {"status": "error", "message": f"Error: {e}"}
+        kb_breaker.record_success()
+        return {"status": "error", "message": f"Error: {e}", "error_type": KB_REJECTED}
     except httpx.RequestError as e:
+        kb_breaker.record_failure()
         return {"status": "error", "message": f"Request failed: {e}"}
+    except asyncio.CancelledError:
+        kb_breaker.release()
+        raise
     except Exception as e:
+        kb_breaker.record_failure()
         return {"status": "error", "message": f"Error: {e}"}
+    kb_breaker.record_success()
+    kb_latency.observe(time.monotonic() - started)
+    return response  # Parsed JSON
+
+
+def backend_stats() -> dict:
+    """Breaker state and hedging settings of this process's knowledge-base client."""
+    p95 = kb_latency.p95()
+    return {
+        "breaker": kb_breaker.stats(),
+        "latency_p95": None if p95 is None else round(p95, 4),
+        "hedging": {"enabled": config.KB_HEDGE_ENABLED, "delay": _hedge_delay(),
+                    "primary_wins": kb_hedges.value(winner="primary"), "hedge_wins": kb_hedges.value(winner="hedge")},
+        "deadline_exceeded": kb_deadline_exceeded.value(),
+    }
+
+
+async def on_startup():
+    """Create the shared knowledge-base client; called when the worker starts."""
+    get_client()
+    logger.info(f"Knowledge-base client ready for {config.KB_BASE_URL}")
 
-# Optionally, preload the AsyncClient at startup if you want to reuse it (for advanced optimization)
-async_client = httpx.AsyncClient()
 
-def on_startup():
-    # This can be called at FastAPI startup to warm up or preload resources
-    pass
+async def on_shutdown():
+    """Close the shared knowledge-base client and its pooled connections."""
+    global async_client
+    if async_client is not None:
+        await async_client.aclose()
+        async_client = None
@@ -0,0 +1,98 @@
+"""
+Retry and timeout policy per node type. Defaults come from DEFAULT_POLICY,
+then the per-type table, then NODE_POLICIES from the environment, then the
+node's own config["policy"]. All durations are in seconds.
+
+Pure data so workflow code can resolve a node's policy deterministically.
+"""
+from dataclasses import dataclass, fields, replace
+from datetime import timedelta
+from temporalio.common import RetryPolicy
+
+import config
+from task_queues import runs_as_local_activity
+
+# Raised by activities for inputs that can never succeed; never retried
+VALIDATION_ERROR = "ValidationError"
+
+
+@dataclass(frozen=True)
+class NodePolicy:
+    max_attempts: int = 3
+    initial_interval: float = 2.0
+    backoff: float = 2.0
+    max_interval: float = 10.0
+    schedule_to_close: float = 10.0
+    start_to_close: float | None = None
+    heartbeat: float | None = None
+
+    def retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            initial_interval=timedelta(seconds=self.initial_interval),
+            backoff_coefficient=self.backoff,
+            maximum_interval=timedelta(seconds=self.max_interval),
+            maximum_attempts=self.max_attempts,
+            non_retryable_error_types=[VALIDATION_ERROR],
+        )
+
+    def timeouts(self, budget: float | None = None, local: bool = False) -> dict:
+        """
+        Keyword arguments for execute_activity, or execute_local_activity with
+        local set (local activities take no heartbeat timeout). budget is what
+        is left of the caller's deadline; no timeout may run past it.
+        """
+        schedule_to_close = self.schedule_to_close if budget is None else min(self.schedule_to_close, budget)
+        options = {"schedule_to_close_timeout": timedelta(seconds=schedule_to_close)}
+        if self.start_to_close:
+            options["start_to_close_timeout"] = timedelta(seconds=min(self.start_to_close, schedule_to_close))
+        if self.heartbeat and not local:
+            options["heartbeat_timeout"] = timedelta(seconds=self.heartbeat)
+        return options
+
+
+DEFAULT_POLICY = NodePolicy()
+
+NODE_TYPE_POLICIES = {
+    # Echo nodes run as local activities; fail fast instead of holding the workflow task
+    "apiConnectivity": NodePolicy(schedule_to_close=config.LOCAL_ACTIVITY_TIMEOUT, initial_interval=0.5),
+    "http": NodePolicy(schedule_to_close=config.LOCAL_ACTIVITY_TIMEOUT, initial_interval=0.5),
+    "webhook": NodePolicy(schedule_to_close=config.LOCAL_ACTIVITY_TIMEOUT, initial_interval=0.5),
+    # The KB call can legitimately take as long as its read timeout; a dead worker is
+    # noticed through missed heartbeats instead of waiting for the whole budget
+    "knowledgeBaseCall": NodePolicy(schedule_to_close=config.KB_READ_TIMEOUT * 3, start_to_close=config.KB_READ_TIMEOUT + 5,
+                                    heartbeat=10),
+    "waitingforResponse": NodePolicy(max_attempts=1, schedule_to_close=3600, heartbeat=10),
+}
+
+_FIELDS = {f.name for f in fields(NodePolicy)}
+
+
+def _apply(policy: NodePolicy, overrides: dict, source: str) -> NodePolicy:
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{source} must be an object.")
+    unknown = set(overrides) - _FIELDS
+    if unknown:
+        raise ValueError(f"{source} has unknown keys: {', '.join(sorted(unknown))}.")
+    values = {}
+    for name, value in overrides.items():
+        if value is None and name in ("start_to_close", "heartbeat"):
+            values[name] = None
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{source}.{name} must be a positive number.")
+        else:
+            values[name] = int(value) if name == "max_attempts" else float(value)
+    return replace(policy, **values)
+
+
+def policy_for(node: dict) -> NodePolicy:
+    """Resolve a node's policy; raises ValueError for malformed overrides."""
+    node_type = node.get("type")
+    policy = NODE_TYPE_POLICIES.get(node_type, DEFAULT_POLICY)
+    if node_type in config.NODE_POLICIES:
+        policy = _apply(policy, config.NODE_POLICIES[node_type], f"NODE_POLICIES[{node_type}]")
+    overrides = (node.get("config") or {}).get("policy")
+    if overrides is not None:
+        policy = _apply(policy, overrides, "config.policy")
+    if policy.heartbeat and runs_as_local_activity(node_type):
+        raise ValueError(f"Node type '{node_type}' runs as a local activity, which cannot heartbeat; remove 'heartbeat'.")
+    return policy
@@ -0,0 +1,171 @@
+"""
+Input schemas per node type, used to compile uploaded flows and to reject bad
+run requests in the API before any workflow is started.
+
+Plain data and pure functions so the same checks can run anywhere; the
+activities keep their own checks for runs started outside the API.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+_NO_DEFAULT = object()
+
+
+@dataclass(frozen=True)
+class InputField:
+    """
+    kind is one of "string", "phone" (string or number, passed on as a
+    string), "integer" (int or digit string, passed on as an int), "boolean"
+    or "any". Required fields must be present and not blank.
+    """
+    name: str
+    kind: str = "string"
+    required: bool = False
+    default: Any = _NO_DEFAULT
+
+
+@dataclass(frozen=True)
+class NodeSchema:
+    node_type: str
+    activity: str
+    fields: tuple = ()
+    aliases: tuple = ()
+
+    @property
+    def required(self) -> list[str]:
+        return [f.name for f in self.fields if f.required]
+
+
+# Accepted by every node type: display fields and the retry-test switch
+_COMMON = (
+    InputField("title"),
+    InputField("description"),
+    InputField("force_fail", "boolean"),
+)
+
+SCHEMAS = {s.node_type: s for s in (
+    NodeSchema("startCall", "start_call", (InputField("caller", "phone", required=True),)),
+    NodeSchema("endCall", "end_call"),
+    NodeSchema("emailSent", "email_sent", (
+        InputField("recipient", default="unknown@example.com"),
+        InputField("title", default="No Subject"),
+        InputField("description", default="No Description"),
+    )),
+    NodeSchema("smsSent", "sms_sent", (
+        InputField("phone_number", "phone", required=True),
+        InputField("message", required=True),
+    )),
+    NodeSchema("knowledgeBaseCall", "knowledge_base_call", (
+        InputField("query", required=True),
+        InputField("stream", "boolean"),
+    ), aliases=("knowledge_base_call",)),
+    NodeSchema("scheduleMeeting", "schedule_meeting", (
+        InputField("email", required=True),
+        InputField("date", required=True),
+        InputField("time", required=True),
+        InputField("summary", required=True),
+    )),
+    NodeSchema("waitingforResponse", "waiting_for_response", (
+        InputField("key", "phone", required=True),
+        InputField("wait_seconds", "integer", default=5),
+    )),
+    NodeSchema("apiConnectivity", "api_connectivity", (InputField("api_response", "any", required=True),)),
+    NodeSchema("http", "http_connectivity", (InputField("http_response", "any", required=True),)),
+    NodeSchema("webhook", "webhook_connectivity", (InputField("webhook_response", "any", required=True),)),
+)}
+
+_BY_ALIAS = {alias: s for s in SCHEMAS.values() for alias in s.aliases}
+
+
+def resolve(node_type: str) -> NodeSchema | None:
+    return SCHEMAS.get(node_type) or _BY_ALIAS.get(node_type)
+
+
+def _fields(schema: NodeSchema) -> dict:
+    # Node-specific fields override the common ones of the same name
+    return {f.name: f for f in _COMMON + schema.fields}
+
+
+def _check(f: InputField, value) -> tuple[Any, str | None]:
+    """Return the value to pass on, or an error message."""
+    if f.kind == "any":
+        return value, None
+    if f.kind == "boolean":
+        return (value, None) if isinstance(value, bool) else (value, f"'{f.name}' must be a boolean")
+    if f.kind == "integer":
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value, None
+        if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            return int(value), None
+        return value, f"'{f.name}' must be an integer"
+    if f.kind == "phone" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value), None
+    if isinstance(value, str):
+        return value, None
+    return value, f"'{f.name}' must be a string"
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def check_types(schema: NodeSchema, inputs: dict) -> list[str]:
+    """Type errors of the inputs that are present; used when compiling a flow at upload."""
+    fields = _fields(schema)
+    errors = []
+    for name, value in inputs.items():
+        if name in fields and not _blank(value):
+            _, error = _check(fields[name], value)
+            if error:
+                errors.append(error)
+    return errors
+
+
+def validate_inputs(schema: NodeSchema, inputs: dict) -> tuple[dict, list[str]]:
+    """
+    Check merged run inputs against the schema. Returns the inputs with
+    defaults filled in and values normalized, and the list of errors.
+    Unknown inputs are passed through untouched.
+    """
+    fields = _fields(schema)
+    # A node with no input at all keeps its "no input" response from the workflow
+    fill_defaults = any(str(v).strip() for v in inputs.values())
+    result, errors = dict(inputs), []
+    for name, f in fields.items():
+        value = inputs.get(name)
+        if _blank(value):
+            if f.required:
+                errors.append(f"'{name}' is required")
+            elif f.default is not _NO_DEFAULT and fill_defaults and name not in inputs:
+                result[name] = f.default
+            continue
+        result[name], error = _check(f, value)
+        if error:
+            errors.append(error)
+    return result, errors
+
+
+@dataclass(frozen=True)
+class CompiledNode:
+    """A node of an uploaded flow with its type resolved and its stored inputs type-checked."""
+    node_id: str
+    node_type: str
+    activity: str
+    schema: NodeSchema = field(repr=False)
+    missing: tuple = ()  # required inputs the stored config lacks; must come with each run
+
+
+def compile_node(node: dict) -> CompiledNode:
+    """Resolve and check one uploaded node; raises ValueError if it can never run."""
+    node_id = node["uniqueId"]
+    schema = resolve(node.get("type"))
+    if schema is None:
+        raise ValueError(f"Node '{node_id}' has unknown type '{node.get('type')}'.")
+    properties = (node.get("config") or {}).get("properties", {})
+    if not isinstance(properties, dict):
+        raise ValueError(f"Node '{node_id}' config.properties must be an object.")
+    errors = check_types(schema, properties)
+    if errors:
+        raise ValueError(f"Node '{node_id}' ({schema.node_type}): {'; '.join(errors)}.")
+    missing = tuple(name for name in schema.required if _blank(properties.get(name)))
+    return CompiledNode(node_id, schema.node_type, schema.activity, schema, missing)
@@ -0,0 +1,157 @@
+"""
+Micro-batching dispatcher for outbound email and SMS sends.
+
+Activities submit one message each; the dispatcher collects messages per
+channel for a short window (or until a batch fills) and hands them to the
+provider backend in one bulk call, then resolves each caller with its own
+result.
+"""
+import abc
+import asyncio
+import logging
+
+import config
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+batch_sizes = registry.histogram(
+    "notification_batch_size", "Messages per bulk provider call.", ("channel",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500))
+messages_sent = registry.counter(
+    "notification_messages_total", "Messages handed to the provider by outcome.", ("channel", "outcome"))
+
+
+class NotificationBackend(abc.ABC):
+    """
+    Provider interface. send_batch returns one entry per message, in order:
+    a result dict on success or an Exception for that message's failure.
+    """
+
+    @abc.abstractmethod
+    async def send_batch(self, channel: str, messages: list[dict]) -> list:
+        ...
+
+
+class SimulatedProviderBackend(NotificationBackend):
+    """
+    Stand-in for the real provider: one fixed-latency round trip per bulk call,
+    with at most max_concurrent_calls calls in flight like a provider's
+    connection or rate limit.
+    """
+
+    def __init__(self, latency: float = config.NOTIFY_PROVIDER_LATENCY,
+                 max_concurrent_calls: int = config.NOTIFY_PROVIDER_MAX_CONCURRENCY):
+        self.latency = latency
+        self.calls = 0
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_calls))
+
+    async def send_batch(self, channel: str, messages: list[dict]) -> list:
+        async with self._slots:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+        return [{"status": "accepted", "channel": channel} for _ in messages]
+
+
+class InMemoryBackend(NotificationBackend):
+    """Records every batch instead of sending; fail_when(message) marks messages as failed."""
+
+    def __init__(self, fail_when=None):
+        self.batches: list[tuple[str, list[dict]]] = []
+        self.fail_when = fail_when
+
+    async def send_batch(self, channel: str, messages: list[dict]) -> list:
+        self.batches.append((channel, list(messages)))
+        return [
+            Exception(f"{channel} provider rejected message") if self.fail_when and self.fail_when(m)
+            else {"status": "accepted", "channel": channel}
+            for m in messages
+        ]
+
+
+BACKENDS = {
+    "simulated": SimulatedProviderBackend,
+    "memory": InMemoryBackend,
+}
+
+
+class BatchDispatcher:
+    def __init__(self, backend: NotificationBackend,
+                 max_batch_size: int = config.NOTIFY_BATCH_SIZE,
+                 max_wait: float = config.NOTIFY_BATCH_WINDOW):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._pending: dict[str, list[tuple[dict, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._sending: set[asyncio.Task] = set()
+
+    async def submit(self, channel: str, message: dict) -> dict:
+        """Queue one message and wait for its own result; raises if it failed."""
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(channel, [])
+        pending.append((message, future))
+        if len(pending) >= self.max_batch_size:
+            self._flush(channel)
+        elif channel not in self._timers:
+            self._timers[channel] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, channel)
+        return await future
+
+    def _flush(self, channel: str):
+        timer = self._timers.pop(channel, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(channel, [])
+        if batch:
+            task = asyncio.ensure_future(self._send(channel, batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, channel: str, batch: list[tuple[dict, asyncio.Future]]):
+        batch_sizes.observe(len(batch), channel=channel)
+        try:
+            results = await self.backend.send_batch(channel, [message for message, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{channel} provider returned {len(results)} results for {len(batch)} messages")
+        except Exception as e:
+            logger.warning(f"Bulk {channel} send of {len(batch)} messages failed: {e}")
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                messages_sent.inc(channel=channel, outcome="failed")
+                future.set_exception(result)
+            else:
+                messages_sent.inc(channel=channel, outcome="sent")
+                future.set_result(result)
+
+    async def close(self):
+        """Send whatever is still queued and wait for in-flight batches."""
+        for channel in list(self._pending):
+            self._flush(channel)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+
+# Worker-wide dispatcher, created by on_startup() and closed by on_shutdown()
+dispatcher: BatchDispatcher | None = None
+
+
+def get_dispatcher() -> BatchDispatcher:
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = BatchDispatcher(BACKENDS[config.NOTIFY_BACKEND]())
+    return dispatcher
+
+
+async def on_startup():
+    get_dispatcher()
+    logger.info(f"Notification dispatcher ready with '{config.NOTIFY_BACKEND}' backend")
+
+
+async def on_shutdown():
+    global dispatcher
+    if dispatcher is not None:
+        await dispatcher.close()
+        dispatcher = None
@@ -0,0 +1,73 @@
+"""
+Payload codec shared by the API's Temporal clients and the workers.
+
+Payloads above PAYLOAD_COMPRESS_THRESHOLD are zlib-compressed. Anything still
+above PAYLOAD_CLAIM_CHECK_THRESHOLD afterwards is written to the blob store and
+replaced by its content key, so workflow history and gRPC messages only carry
+a small reference however large node inputs, context or KB results grow.
+"""
+import asyncio
+import dataclasses
+import zlib
+from typing import Sequence
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+
+import config
+from blob_store import FileBlobStore, blob_store
+from metrics import registry
+
+ENCODING_ZLIB = b"binary/zlib"
+ENCODING_CLAIM_CHECK = b"binary/claim-check"
+
+payload_bytes = registry.histogram(
+    "payload_encoded_bytes", "Payload size sent to Temporal after encoding.", ("encoding",),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+
+
+class CompressionClaimCheckCodec(PayloadCodec):
+    def __init__(self, store: FileBlobStore = blob_store,
+                 compress_threshold: int = config.PAYLOAD_COMPRESS_THRESHOLD,
+                 claim_check_threshold: int = config.PAYLOAD_CLAIM_CHECK_THRESHOLD,
+                 level: int = config.PAYLOAD_COMPRESS_LEVEL):
+        self.store = store
+        self.compress_threshold = compress_threshold
+        self.claim_check_threshold = claim_check_threshold
+        self.level = level
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [await self._encode_one(p) for p in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [await self._decode_one(p) for p in payloads]
+
+    async def _encode_one(self, payload: Payload) -> Payload:
+        if payload.ByteSize() < self.compress_threshold:
+            payload_bytes.observe(payload.ByteSize(), encoding="plain")
+            return payload
+        encoded = payload
+        compressed = zlib.compress(payload.SerializeToString(), self.level)
+        if len(compressed) < payload.ByteSize():
+            encoded = Payload(metadata={"encoding": ENCODING_ZLIB}, data=compressed)
+        if encoded.ByteSize() >= self.claim_check_threshold:
+            data = encoded.SerializeToString()
+            digest = await asyncio.to_thread(self.store.put, data)
+            encoded = Payload(metadata={"encoding": ENCODING_CLAIM_CHECK}, data=digest.encode())
+        payload_bytes.observe(encoded.ByteSize(), encoding=encoded.metadata.get("encoding", b"plain").decode())
+        return encoded
+
+    async def _decode_one(self, payload: Payload) -> Payload:
+        encoding = payload.metadata.get("encoding")
+        if encoding == ENCODING_CLAIM_CHECK:
+            data = await asyncio.to_thread(self.store.get, payload.data.decode())
+            return await self._decode_one(Payload.FromString(data))
+        if encoding == ENCODING_ZLIB:
+            return Payload.FromString(zlib.decompress(payload.data))
+        return payload
+
+
+def data_converter() -> DataConverter:
+    """Default JSON converter, with the codec applied when PAYLOAD_CODEC_ENABLED."""
+    if not config.PAYLOAD_CODEC_ENABLED:
+        return DataConverter.default
+    return dataclasses.replace(DataConverter.default, payload_codec=CompressionClaimCheckCodec())
@@ -0,0 +1,76 @@
+"""
+Readiness checks behind GET /ready. Each component that has to be up before
+the API can serve runs registers an async check returning (ready, detail).
+"""
+import asyncio
+from datetime import timedelta
+from temporalio.api.enums.v1 import TaskQueueType
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
+
+import config
+from client_pool import temporal_pool
+
+_checks: dict = {}
+
+
+def register(name: str, check):
+    _checks[name] = check
+
+
+def unregister(name: str):
+    _checks.pop(name, None)
+
+
+async def temporal_check() -> tuple[bool, str]:
+    """The Temporal frontend answers a health check through the API's client pool."""
+    client = None
+    try:
+        client = await asyncio.wait_for(temporal_pool.get(), timeout=config.READINESS_PROBE_TIMEOUT)
+        healthy = await client.service_client.check_health(
+            timeout=timedelta(seconds=config.READINESS_PROBE_TIMEOUT))
+        return healthy, config.TEMPORAL_ADDRESS if healthy else f"{config.TEMPORAL_ADDRESS}: not serving"
+    except Exception as e:
+        if client is not None:
+            temporal_pool.discard(client, e)
+        return False, f"{config.TEMPORAL_ADDRESS}: {type(e).__name__}: {e}"
+
+
+_QUEUE_TYPES = {"workflow": TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW,
+                "activity": TaskQueueType.TASK_QUEUE_TYPE_ACTIVITY}
+
+
+async def pollers_check(queues: dict) -> tuple[bool, str]:
+    """Every task queue in queues (name -> "workflow" or "activity") has at least one poller."""
+    client = None
+    try:
+        client = await asyncio.wait_for(temporal_pool.get(), timeout=config.READINESS_PROBE_TIMEOUT)
+        responses = await asyncio.gather(*(
+            client.workflow_service.describe_task_queue(
+                DescribeTaskQueueRequest(namespace=config.TEMPORAL_NAMESPACE, task_queue=TaskQueue(name=name),
+                                         task_queue_type=_QUEUE_TYPES[kind]),
+                timeout=timedelta(seconds=config.READINESS_PROBE_TIMEOUT))
+            for name, kind in queues.items()))
+    except Exception as e:
+        if client is not None:
+            temporal_pool.discard(client, e)
+        return False, f"{type(e).__name__}: {e}"
+    idle = [name for name, response in zip(queues, responses) if not response.pollers]
+    if idle:
+        return False, f"no pollers on {', '.join(idle)}"
+    return True, f"polling {', '.join(queues)}"
+
+
+async def report() -> tuple[bool, dict]:
+    """Run every registered check concurrently."""
+    names = list(_checks)
+    results = await asyncio.gather(*(_checks[name]() for name in names), return_exceptions=True)
+    checks = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            result = (False, f"{type(result).__name__}: {result}")
+        checks[name] = {"ready": result[0], "detail": result[1]}
+    return all(c["ready"] for c in checks.values()), checks
+
+
+register("temporal", temporal_check)
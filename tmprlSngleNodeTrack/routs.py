@@ -1,20 +1,35 @@
 """
 API for running a single node workflow via Temporal and FastAPI.
 """
-from fastapi import APIRouter, File, UploadFile, Form, Request
-import json
+from fastapi import APIRouter, Request, Header, Query
+import asyncio
 from pydantic import BaseModel
-from temporalio.client import Client
-from workflow import SingleNodeWorkflow
-from activities import (
-    start_call,
-    end_call,
-    email_sent,
-)
-from fastapi.responses import JSONResponse, FileResponse
+from typing import Any, Literal
+from workflow import SingleNodeWorkflow, FlowWorkflow, CallSessionWorkflow
+from flow_graph import plan_flow
+from client_pool import temporal_pool
+from flow_registry import flow_registry, DEFAULT_FLOW_ID
+from node_policies import VALIDATION_ERROR
+import llm
+import idempotency
+import execution_store
+from execution_store import RunInfo
+import readiness
+from admission import admission, queue_for_node_type
+import run_status
+import campaigns
+import telemetry
+import time
+import math
+import config
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
+from temporalio.client import WithStartWorkflowOperation, WorkflowUpdateFailedError
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import ApplicationError, WorkflowAlreadyStartedError
+from temporalio.service import RPCError, RPCStatusCode
 from fastapi import status
-import httpx
 import os
+import uuid
 
 router = APIRouter()
 
@@ -22,12 +37,12 @@ router = APIRouter()
 class NodeRequest(BaseModel):
     node_id: str
     inputs: dict = {}
-
-NODE_FLOW_DATA = None
+    flow_id: str = DEFAULT_FLOW_ID
+    version: int | None = None
+    mode: Literal["sync", "async", "stream"] = "sync"
 
 @router.post("/upload_node_flow")
-async def upload_node_flow(request: Request):
-    global NODE_FLOW_DATA
+async def upload_node_flow(request: Request, flow_id: str = DEFAULT_FLOW_ID, version: int | None = None):
     # Only accept raw JSON
     if not request.headers.get("content-type", "").startswith("application/json"):
         return JSONResponse(
@@ -35,59 +50,728 @@ async def upload_node_flow(request: Request):
             content={"message": "Only raw JSON body with Content-Type: application/json is supported."}
         )
     try:
-        NODE_FLOW_DATA = await request.json()
+        data = await request.json()
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"message": f"Invalid JSON body: {str(e)}"}
         )
-    return {"message": "Node flow uploaded successfully from raw JSON"}
+    try:
+        flow = flow_registry.publish(flow_id, data, version)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Invalid node flow: {str(e)}"}
+        )
+    return {
+        "message": "Node flow uploaded successfully from raw JSON",
+        "flow_id": flow.flow_id,
+        "version": flow.version,
+        # Required inputs missing from the stored config; runs of these nodes must supply them
+        "missing_inputs": flow.missing_inputs(),
+    }
+
+@router.get("/flows")
+async def list_flows():
+    return {"flows": flow_registry.list_flows()}
+
+# Response key -> ID of the workflow currently waiting for it
+pending_responses: dict[str, str] = {}
+
+def _response_keys(nodes: list[dict]) -> list[str]:
+    return [
+        str(n["config"]["properties"]["key"]) for n in nodes
+        if n.get("type") == "waitingforResponse" and n.get("config", {}).get("properties", {}).get("key")
+    ]
+
+def _register_waits(keys: list[str], workflow_id: str):
+    for key in keys:
+        pending_responses[key] = workflow_id
+
+def _release_waits(keys: list[str], workflow_id: str):
+    for key in keys:
+        if pending_responses.get(key) == workflow_id:
+            del pending_responses[key]
+
+def _admit(run: RunInfo) -> tuple[str, JSONResponse | None]:
+    """Take an admission slot for the run; returns its task queue and, if rejected, the 429 to send."""
+    task_queue = config.TASK_QUEUE if run.label == "flow" else queue_for_node_type(run.label)
+    decision = admission.admit(run.label, run.caller, task_queue)
+    if decision.admitted:
+        return task_queue, None
+    return task_queue, JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={
+            "message": f"Too many requests ({decision.reason}); retry after {decision.retry_after:.2f}s.",
+            "reason": decision.reason,
+            "retry_after": round(decision.retry_after, 3),
+        },
+        headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+    )
+
+def _result_response(result: dict, error_code: str, failure_message: str):
+    if result.get("status") == "success":
+        return result
+    # Inputs the activity rejected as permanently invalid are the caller's to fix
+    invalid = result.get("error_type") == VALIDATION_ERROR
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY if invalid else status.HTTP_400_BAD_REQUEST,
+        content={
+            "message": result.get("message", failure_message),
+            "result": result,
+            "error_code": "INVALID_INPUT" if invalid else error_code
+        }
+    )
+
+async def _run_workflow(workflow, arg, workflow_id: str, wait_keys: list[str], mode: str,
+                        error_code: str, failure_message: str, run: RunInfo, memoize: bool = False,
+                        timeout: float | None = None, replay_closed: bool = False):
+    """
+    Start a workflow and either wait for its result (sync), return its IDs
+    right away (async) so the caller can poll /runs/{workflow_id}, or answer
+    with its event stream (stream), which relays streamed KB text as it comes.
+    A run with the same workflow ID that is still open is attached to instead
+    of failing; with memoize set, a successful result is kept for replay.
+    Every run is recorded in the execution store, and sync runs are timed end
+    to end under the run's node type.
+    Runs over an admission limit are rejected with 429 before anything starts.
+    A sync run that outlives timeout (the Request-Timeout header) gets a 504;
+    the workflow itself already stops at the same deadline.
+    With replay_closed (a client-supplied Idempotency-Key), a closed run is
+    never started again under the same ID: the retry gets that run's outcome.
+    """
+    task_queue, rejected = _admit(run)
+    if rejected:
+        return rejected
+    _register_waits(wait_keys, workflow_id)
+    temporal_client = None
+    started = time.perf_counter()
+    outcome = "error"
+    leased = False
+    reuse_policy = WorkflowIDReusePolicy.REJECT_DUPLICATE if replay_closed else WorkflowIDReusePolicy.ALLOW_DUPLICATE
+    run_id = None
+    try:
+        temporal_client = await temporal_pool.get()
+        start = temporal_client.start_workflow(
+            workflow,
+            arg,
+            id=workflow_id,
+            task_queue=config.TASK_QUEUE,
+            id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+            id_reuse_policy=reuse_policy,
+        )
+        if mode in ("async", "stream"):
+            handle = await start
+            # The run this request started or attached to; its store rows are keyed by it
+            run_id = handle.result_run_id
+            execution_store.record_started(run, handle.id, mode, run_id)
+            admission.lease(handle.id, task_queue)
+            leased = True
+            if mode == "stream":
+                return _event_stream(handle, None, temporal_client)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={
+                    "message": "Workflow started.",
+                    "workflow_id": handle.id,
+                    "run_id": handle.result_run_id,
+                    "status_url": f"/runs/{handle.id}",
+                    "events_url": f"/runs/{handle.id}/events",
+                }
+            )
+        try:
+            handle = await asyncio.wait_for(start, timeout)
+            run_id = handle.result_run_id
+            remaining = None if timeout is None else timeout - (time.perf_counter() - started)
+            result = await asyncio.wait_for(handle.result(), remaining)
+        except asyncio.TimeoutError:
+            _release_waits(wait_keys, workflow_id)
+            outcome = "deadline_exceeded"
+            execution_store.record_error(run, workflow_id, TimeoutError(f"No result within {timeout}s"),
+                                         time.perf_counter() - started, mode, run_id)
+            return JSONResponse(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                content={
+                    "message": f"No result within the {timeout}s request timeout.",
+                    "workflow_id": workflow_id,
+                    "status_url": f"/runs/{workflow_id}",
+                }
+            )
+        _release_waits(wait_keys, workflow_id)
+        outcome = result.get("status", "unknown")
+        execution_store.record_result(run, workflow_id, result, time.perf_counter() - started, run_id=run_id)
+        if memoize and idempotency.worth_replaying(result):
+            idempotency.node_results.set(workflow_id, result)
+        return _result_response(result, error_code, failure_message)
+    except WorkflowAlreadyStartedError:
+        _release_waits(wait_keys, workflow_id)
+        outcome = "replayed"
+        try:
+            return await _replay_closed_run(temporal_client, workflow_id, mode, error_code, failure_message)
+        except Exception as e:
+            temporal_pool.discard(temporal_client, e)
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"message": f"Could not get the earlier run {workflow_id}: {str(e)}"}
+            )
+    except Exception as e:
+        _release_waits(wait_keys, workflow_id)
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        execution_store.record_error(run, workflow_id, e, time.perf_counter() - started, mode, run_id)
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error_message": f"Workflow failed: {str(e)}",
+                "message": "Try Again"
+            }
+        )
+    finally:
+        if not leased:
+            admission.release(task_queue)
+        if mode == "sync":
+            telemetry.workflow_duration.observe(time.perf_counter() - started, node_type=run.label, outcome=outcome)
+            telemetry.workflow_runs.inc(node_type=run.label, outcome=outcome)
+
+async def _replay_closed_run(temporal_client, workflow_id: str, mode: str, error_code: str, failure_message: str):
+    """Answer a retried Idempotency-Key whose run already closed with that run's outcome, in the caller's mode."""
+    handle = temporal_client.get_workflow_handle(workflow_id)
+    if mode == "stream":
+        return _event_stream(handle, None, temporal_client)
+    snapshot = await run_status.describe_run(handle, temporal_client.data_converter)
+    if mode == "async" or "result" not in snapshot:
+        return JSONResponse(content=snapshot, headers={"Idempotent-Replayed": "true"})
+    response = _result_response(snapshot["result"], error_code, failure_message)
+    if isinstance(response, JSONResponse):
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+    return JSONResponse(content=response, headers={"Idempotent-Replayed": "true"})
+
+def _enable_streaming(nodes: list[dict]):
+    """Have KB nodes stream their answer; the final result is the same either way."""
+    for node in nodes:
+        if node.get("type") == "knowledgeBaseCall":
+            node["config"]["properties"]["stream"] = True
+
+def _invalid_timeout(request_timeout: float | None) -> JSONResponse | None:
+    if request_timeout is not None and not 0 < request_timeout <= config.REQUEST_TIMEOUT_MAX:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Request-Timeout must be between 0 and {config.REQUEST_TIMEOUT_MAX} seconds."}
+        )
+    return None
 
 @router.post("/run_single_node")
-async def run_single_node(request: NodeRequest):
-    global NODE_FLOW_DATA
-    if NODE_FLOW_DATA is None:
+async def run_single_node(request: NodeRequest, idempotency_key: str | None = Header(default=None),
+                          x_caller_id: str | None = Header(default=None),
+                          request_timeout: float | None = Header(default=None)):
+    # Request-Timeout (seconds) becomes a deadline every activity timeout is capped by
+    invalid = _invalid_timeout(request_timeout)
+    if invalid:
+        return invalid
+    flow = flow_registry.get(request.flow_id, request.version)
+    if flow is None:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"message": "Node flow data not uploaded. Please upload using /upload_node_flow first."}
         )
-    node = next((n for n in NODE_FLOW_DATA["nodes"] if n["uniqueId"] == request.node_id), None)
+    # Inject user inputs into a per-request copy of the node config and check
+    # them against the node type's schema before anything reaches Temporal
+    node, errors = flow.validated_node(request.node_id, request.inputs)
     if not node:
         return {"message": "Node not found", "result": None}
+    if errors:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"message": f"Invalid inputs for node {request.node_id}", "errors": errors}
+        )
 
-    # Inject user inputs into node config
-    if "config" in node and "properties" in node["config"]:
-        node["config"]["properties"].update(request.inputs)
+    # Duplicate submissions share one workflow ID, so they attach to the same run
+    replay_closed = idempotency_key is not None
+    if idempotency_key is not None:
+        error = idempotency.validate_key(idempotency_key)
+        if error:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": error})
     else:
-        node["config"] = {"properties": request.inputs}
+        idempotency_key = idempotency.derive_key(
+            flow.flow_id, flow.version, request.node_id, node["config"]["properties"])
+    workflow_id = f"single-node-workflow-{request.node_id}-{idempotency_key}"
+    memoize = idempotency.is_memoizable(node.get("type"))
+    if memoize:
+        cached = idempotency.node_results.get(workflow_id)
+        if cached is not None:
+            return JSONResponse(content=cached, headers={"Idempotent-Replayed": "true"})
+    if request_timeout is not None:
+        node["deadline"] = time.time() + request_timeout
+    if request.mode == "stream":
+        _enable_streaming([node])
+
+    return await _run_workflow(
+        SingleNodeWorkflow,
+        node,
+        workflow_id,
+        _response_keys([node]),
+        request.mode,
+        "ACTIVITY_FAILED",
+        "Activity did not complete successfully.",
+        RunInfo(flow.flow_id, flow.version, x_caller_id or node["config"]["properties"].get("caller"),
+                {request.node_id: node.get("type", "unknown")}),
+        memoize,
+        timeout=request_timeout,
+        replay_closed=replay_closed,
+    )
+
+class FlowRequest(BaseModel):
+    flow_id: str = DEFAULT_FLOW_ID
+    version: int | None = None
+    inputs: dict[str, dict] = {}  # node uniqueId -> inputs for that node
+    edges: list[dict] | None = None  # overrides the uploaded flow's edges
+    start_node: str | None = None
+    end_node: str | None = None
+    context: dict = {}
+    mode: Literal["sync", "async", "stream"] = "sync"
+
+@router.post("/run_flow")
+async def run_flow(request: FlowRequest, idempotency_key: str | None = Header(default=None),
+                   x_caller_id: str | None = Header(default=None),
+                   request_timeout: float | None = Header(default=None)):
+    invalid = _invalid_timeout(request_timeout)
+    if invalid:
+        return invalid
+    flow = flow_registry.get(request.flow_id, request.version)
+    if flow is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": "Node flow data not uploaded. Please upload using /upload_node_flow first."}
+        )
+    unknown = [node_id for node_id in request.inputs if flow.get_node(node_id) is None]
+    if unknown:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Inputs given for unknown node(s): {', '.join(unknown)}"}
+        )
+    validated = {node_id: flow.validated_node(node_id, request.inputs.get(node_id, {})) for node_id in flow.nodes_by_id}
+    nodes = [node for node, _ in validated.values()]
+    edges = flow.edges if request.edges is None else request.edges
+    try:
+        plan = plan_flow(nodes, edges, request.start_node, request.end_node)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Invalid flow graph: {str(e)}"}
+        )
+    # Only the nodes the plan will run need valid inputs
+    errors = {node_id: validated[node_id][1] for node_id in plan["order"] if validated[node_id][1]}
+    if errors:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"message": "Invalid inputs for one or more nodes", "errors": errors}
+        )
+
+    if idempotency_key is not None:
+        error = idempotency.validate_key(idempotency_key)
+        if error:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": error})
+    run_key = idempotency_key or uuid.uuid4().hex
+    if request.mode == "stream":
+        _enable_streaming(nodes)
 
+    return await _run_workflow(
+        FlowWorkflow,
+        {
+            "nodes": nodes,
+            "edges": edges,
+            "start": request.start_node,
+            "end": request.end_node,
+            "context": request.context,
+            "deadline": None if request_timeout is None else time.time() + request_timeout,
+        },
+        f"flow-workflow-{flow.flow_id}-v{flow.version}-{run_key}",
+        _response_keys(nodes),
+        request.mode,
+        "FLOW_FAILED",
+        "One or more nodes did not complete successfully.",
+        RunInfo(flow.flow_id, flow.version, x_caller_id or request.context.get("caller_id"),
+                {node_id: flow.compiled[node_id].node_type for node_id in plan["order"]}),
+        timeout=request_timeout,
+        replay_closed=idempotency_key is not None,
+    )
+
+class CallStepRequest(BaseModel):
+    flow_id: str = DEFAULT_FLOW_ID
+    version: int | None = None
+    node_id: str
+    inputs: dict = {}
+
+def _session_workflow_id(session_id: str) -> str:
+    return f"call-session-{session_id}"
+
+@router.post("/calls/{session_id}/nodes")
+async def run_call_step(session_id: str, request: CallStepRequest, idempotency_key: str | None = Header(default=None),
+                        x_caller_id: str | None = Header(default=None),
+                        request_timeout: float | None = Header(default=None)):
+    """
+    Run one node as a step of a live call. The call's CallSessionWorkflow is
+    started by the first step and reused by the rest, and each step is an
+    update answered with the node's result; context carries over between steps.
+    Once the session has ended its ID cannot start a new one: steps get a 409.
+    """
+    invalid = _invalid_timeout(request_timeout)
+    if invalid:
+        return invalid
+    flow = flow_registry.get(request.flow_id, request.version)
+    if flow is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": "Node flow data not uploaded. Please upload using /upload_node_flow first."}
+        )
+    node, errors = flow.validated_node(request.node_id, request.inputs)
+    if not node:
+        return {"message": "Node not found", "result": None}
+    if errors:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"message": f"Invalid inputs for node {request.node_id}", "errors": errors}
+        )
+    # A repeated Idempotency-Key reuses the update ID, so Temporal runs the step only once
+    if idempotency_key is not None:
+        error = idempotency.validate_key(idempotency_key)
+        if error:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": error})
+    update_id = f"{request.node_id}-{idempotency_key or uuid.uuid4().hex}"
+    if request_timeout is not None:
+        node["deadline"] = time.time() + request_timeout
+
+    workflow_id = _session_workflow_id(session_id)
+    run = RunInfo(flow.flow_id, flow.version, x_caller_id or session_id, {request.node_id: node.get("type", "unknown")})
+    task_queue, rejected = _admit(run)
+    if rejected:
+        return rejected
+    wait_keys = _response_keys([node])
+    _register_waits(wait_keys, workflow_id)
+    temporal_client = None
+    started = time.perf_counter()
+    outcome = "error"
+    # Steps share the session's workflow ID; the step ID tells their store rows apart
+    step_id = f"{workflow_id}/{update_id}"
     try:
-        temporal_client = await Client.connect("localhost:7233")
-        result = await temporal_client.execute_workflow(
-            SingleNodeWorkflow,
+        temporal_client = await temporal_pool.get()
+        start = WithStartWorkflowOperation(
+            CallSessionWorkflow.run,
+            {"max_steps": config.CALL_SESSION_MAX_STEPS, "idle_timeout": config.CALL_SESSION_IDLE_TIMEOUT},
+            id=workflow_id,
+            task_queue=config.TASK_QUEUE,
+            id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+            # A closed session is never restarted under the same ID with an empty context
+            id_reuse_policy=WorkflowIDReusePolicy.REJECT_DUPLICATE,
+        )
+        result = await asyncio.wait_for(temporal_client.execute_update_with_start_workflow(
+            CallSessionWorkflow.run_node,
             node,
-            id=f"single-node-workflow-{request.node_id}",
-            task_queue="call-flow-queue",
+            start_workflow_operation=start,
+            id=update_id,
+        ), request_timeout)
+        outcome = result.get("status", "unknown")
+        execution_store.record_result(run, workflow_id, result, time.perf_counter() - started, "session", step_id)
+        return _result_response(result, "ACTIVITY_FAILED", "Activity did not complete successfully.")
+    except asyncio.TimeoutError:
+        outcome = "deadline_exceeded"
+        execution_store.record_error(run, workflow_id, TimeoutError(f"No result within {request_timeout}s"),
+                                     time.perf_counter() - started, "session", step_id)
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={"message": f"No result within the {request_timeout}s request timeout.", "session_id": session_id}
+        )
+    except WorkflowAlreadyStartedError as e:
+        execution_store.record_error(run, workflow_id, e, time.perf_counter() - started, "session", step_id)
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"message": "Call session has ended.", "session_id": session_id}
+        )
+    except WorkflowUpdateFailedError as e:
+        # The session refused the step (e.g. the call already ended); the session itself is fine
+        cause = e.cause
+        ended = isinstance(cause, ApplicationError) and cause.type == "SessionEnded"
+        execution_store.record_error(run, workflow_id, cause or e, time.perf_counter() - started, "session", step_id)
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT if ended else status.HTTP_400_BAD_REQUEST,
+            content={"message": getattr(cause, "message", None) or str(e), "session_id": session_id}
         )
-        if result.get("status") == "success":
-            return result
-        else:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "message": result.get("message", "Activity did not complete successfully."),
-                    "result": result,
-                    "error_code": "ACTIVITY_FAILED"
-                }
-            )
     except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        execution_store.record_error(run, workflow_id, e, time.perf_counter() - started, "session", step_id)
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
-                "error_message": f"Workflow failed: {str(e)}",
+                "error_message": f"Call step failed: {str(e)}",
                 "message": "Try Again"
             }
         )
+    finally:
+        _release_waits(wait_keys, workflow_id)
+        admission.release(task_queue)
+        telemetry.workflow_duration.observe(time.perf_counter() - started, node_type=run.label, outcome=outcome)
+        telemetry.workflow_runs.inc(node_type=run.label, outcome=outcome)
+
+@router.get("/calls/{session_id}")
+async def get_call_session(session_id: str):
+    """The session's step count, context and last step, or its final result once it has ended."""
+    workflow_id = _session_workflow_id(session_id)
+    temporal_client = None
+    try:
+        temporal_client = await temporal_pool.get()
+        handle = temporal_client.get_workflow_handle(workflow_id)
+        snapshot = await run_status.wait_for_run(handle, 0)
+        if snapshot["status"] == "running":
+            snapshot["session"] = await handle.query(CallSessionWorkflow.session_state)
+    except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        not_found = isinstance(e, RPCError) and e.status == RPCStatusCode.NOT_FOUND
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND if not_found else status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Could not get call session {session_id}: {str(e)}"}
+        )
+    return snapshot
+
+@router.post("/calls/{session_id}/end")
+async def end_call_session(session_id: str):
+    temporal_client = None
+    try:
+        temporal_client = await temporal_pool.get()
+        await temporal_client.get_workflow_handle(_session_workflow_id(session_id)).signal(CallSessionWorkflow.end_session)
+    except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        not_found = isinstance(e, RPCError) and e.status == RPCStatusCode.NOT_FOUND
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND if not_found else status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Could not end call session {session_id}: {str(e)}"}
+        )
+    return {"message": f"Call session {session_id} is ending.", "workflow_id": _session_workflow_id(session_id)}
+
+class ResponseDelivery(BaseModel):
+    response: Any = None
+    workflow_id: str | None = None  # only needed when the wait was not started through this API
+
+@router.post("/responses/{key}")
+async def deliver_response(key: str, delivery: ResponseDelivery):
+    workflow_id = delivery.workflow_id or pending_responses.get(key)
+    if not workflow_id:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"message": f"No run is waiting for a response with key: {key}"}
+        )
+    temporal_client = None
+    try:
+        temporal_client = await temporal_pool.get()
+        handle = temporal_client.get_workflow_handle(workflow_id)
+        await handle.signal("deliver_response", {"key": key, "response": delivery.response})
+        _release_waits([key], workflow_id)
+    except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Could not deliver response: {str(e)}"}
+        )
+    return {"message": f"Response delivered for key: {key}", "workflow_id": workflow_id}
+
+def _event_stream(handle, is_disconnected, temporal_client) -> StreamingResponse:
+    return StreamingResponse(
+        run_status.run_events(handle, is_disconnected,
+                              on_close=lambda snapshot: _run_closed(handle.id, snapshot),
+                              data_converter=temporal_client.data_converter),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _run_closed(workflow_id: str, snapshot: dict):
+    """An async run was seen finished: close its store rows, free its admission slot and its response keys."""
+    execution_store.record_completion(workflow_id, snapshot)
+    if snapshot.get("status") != "running":
+        admission.release_lease(workflow_id)
+        _release_waits([key for key, waiting in pending_responses.items() if waiting == workflow_id], workflow_id)
+
+@router.get("/runs/{workflow_id}")
+async def get_run(workflow_id: str, wait: float = 0):
+    """Status of a run; with wait > 0, long-poll up to that many seconds for its result."""
+    temporal_client = None
+    try:
+        temporal_client = await temporal_pool.get()
+        handle = temporal_client.get_workflow_handle(workflow_id)
+        snapshot = await run_status.wait_for_run(handle, min(max(wait, 0), config.RUN_LONG_POLL_MAX),
+                                                 temporal_client.data_converter)
+    except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        not_found = isinstance(e, RPCError) and e.status == RPCStatusCode.NOT_FOUND
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND if not_found else status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Could not get run {workflow_id}: {str(e)}"}
+        )
+    if snapshot["status"] == "running":
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=snapshot)
+    _run_closed(workflow_id, snapshot)
+    return snapshot
+
+@router.get("/runs/{workflow_id}/events")
+async def stream_run_events(workflow_id: str, request: Request):
+    """Server-sent events for each status transition of a run, and streamed text, until it closes."""
+    temporal_client = None
+    try:
+        temporal_client = await temporal_pool.get()
+        handle = temporal_client.get_workflow_handle(workflow_id)
+        # Fail here with a status code rather than inside an already started stream
+        await handle.describe()
+    except Exception as e:
+        if temporal_client is not None:
+            temporal_pool.discard(temporal_client, e)
+        not_found = isinstance(e, RPCError) and e.status == RPCStatusCode.NOT_FOUND
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND if not_found else status.HTTP_400_BAD_REQUEST,
+            content={"message": f"Could not get run {workflow_id}: {str(e)}"}
+        )
+    return _event_stream(handle, request.is_disconnected, temporal_client)
+
+@router.get("/executions")
+async def list_executions(node_id: str | None = None, caller: str | None = None, flow_id: str | None = None,
+                          node_type: str | None = None, status_filter: str | None = Query(default=None, alias="status"),
+                          workflow_id: str | None = None, run_id: str | None = None, since: float | None = None,
+                          until: float | None = None, limit: int = 100, cursor: str | None = None):
+    """
+    Recorded node runs, newest first. since/until are epoch seconds; pass
+    next_cursor back as cursor for the following page.
+    """
+    try:
+        return await execution_store.execution_store.query(
+            limit=limit, cursor=cursor, node_id=node_id, caller=caller, flow_id=flow_id, node_type=node_type,
+            status=status_filter, workflow_id=workflow_id, run_id=run_id, since=since, until=until,
+        )
+    except ValueError:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": f"Invalid cursor: {cursor}"})
+
+@router.post("/campaigns")
+async def create_campaign(request: Request, flow_id: str = DEFAULT_FLOW_ID, version: int | None = None,
+                          concurrency: int = config.CAMPAIGN_CONCURRENCY, start_node: str | None = None,
+                          end_node: str | None = None, start: bool = True):
+    """
+    Run the flow once per contact of the uploaded list (CSV or NDJSON body,
+    read as a stream). Contacts whose inputs fail validation are kept as
+    "invalid"; the rest run with at most `concurrency` workflows in flight.
+    """
+    fmt = campaigns.upload_format(request.headers.get("content-type"))
+    if fmt is None:
+        return JSONResponse(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            content={"message": "Upload contacts as text/csv or application/x-ndjson."}
+        )
+    if not 1 <= concurrency <= config.CAMPAIGN_MAX_CONCURRENCY:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"concurrency must be between 1 and {config.CAMPAIGN_MAX_CONCURRENCY}."}
+        )
+    flow = flow_registry.get(flow_id, version)
+    if flow is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": "Node flow data not uploaded. Please upload using /upload_node_flow first."}
+        )
+    try:
+        campaign = await campaigns.campaigns.create(flow, request.stream(), fmt, concurrency,
+                                                    start_node, end_node, start)
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": str(e)})
+    return JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={"message": f"Campaign created with {campaign['total']} contacts.",
+                 "status_url": f"/campaigns/{campaign['id']}", **campaign},
+    )
+
+@router.get("/campaigns")
+async def list_campaigns():
+    return {"campaigns": await campaigns.campaigns.list_campaigns()}
+
+def _campaign_not_found(campaign_id: str) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"message": f"No campaign {campaign_id}"})
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    campaign = await campaigns.campaigns.progress(campaign_id)
+    return campaign if campaign is not None else _campaign_not_found(campaign_id)
+
+@router.get("/campaigns/{campaign_id}/contacts")
+async def list_campaign_contacts(campaign_id: str, status_filter: str | None = Query(default=None, alias="status"),
+                                 after: int = 0, limit: int = 100):
+    """Contacts in upload order; pass the last seq as `after` for the next page."""
+    if status_filter is not None and status_filter not in campaigns.CONTACT_STATES:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"status must be one of {', '.join(campaigns.CONTACT_STATES)}"}
+        )
+    contacts = await campaigns.campaigns.contacts(campaign_id, status_filter, after, limit)
+    return {"contacts": contacts, "next_after": contacts[-1]["seq"] if contacts else None}
+
+async def _campaign_action(action, campaign_id: str):
+    try:
+        campaign = await action(campaign_id)
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"message": str(e)})
+    return campaign if campaign is not None else _campaign_not_found(campaign_id)
+
+@router.post("/campaigns/{campaign_id}/pause")
+async def pause_campaign(campaign_id: str):
+    return await _campaign_action(campaigns.campaigns.pause, campaign_id)
+
+@router.post("/campaigns/{campaign_id}/resume")
+async def resume_campaign(campaign_id: str):
+    return await _campaign_action(campaigns.campaigns.resume, campaign_id)
+
+@router.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    return await _campaign_action(campaigns.campaigns.cancel, campaign_id)
+
+@router.post("/admin/executions/prune")
+async def prune_executions(retention_days: float = config.EXECUTION_RETENTION_DAYS):
+    removed = await execution_store.execution_store.prune(retention_days * 86400)
+    return {"message": f"Removed {removed} runs older than {retention_days:g} days", "removed": removed}
+
+class KBCacheInvalidateRequest(BaseModel):
+    folder_id: str
+
+# The cache lives in each worker process; with worker processes of their own, this process's is not theirs
+_KB_CACHE_SCOPE_WARNING = ("Workers run in separate processes: these are the API process's figures. "
+                           "Each worker reports cache_events_total on its own metrics port.")
+
+@router.get("/admin/kb_cache")
+async def kb_cache_stats():
+    stats = llm.kb_cache.stats()
+    if config.SUPERVISOR_WORKER_PROCESSES > 0:
+        stats["warning"] = _KB_CACHE_SCOPE_WARNING
+    return stats
+
+@router.post("/admin/kb_cache/invalidate")
+async def kb_cache_invalidate(request: KBCacheInvalidateRequest):
+    removed = llm.invalidate_folder(request.folder_id)
+    return {
+        "message": f"Invalidated cached answers for folder {request.folder_id}; worker processes on this host "
+                   f"drop theirs within {config.KB_CACHE_INVALIDATION_POLL:g}s",
+        "removed": removed,
+    }
+
+@router.get("/admin/kb_backend")
+async def kb_backend_stats():
+    return llm.backend_stats()
+
+@router.get("/admin/admission")
+async def admission_stats():
+    return admission.stats()
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: API, workflow, cache, KB pool and Temporal SDK metrics."""
+    return PlainTextResponse(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
 
 @router.get("/status")
 async def health_check():
@@ -98,6 +782,19 @@ async def health_check():
     """
     return {"status": "success", "message": "API is running"}
 
+@router.get("/ready")
+async def ready_check():
+    """
+    Readiness: 200 once Temporal answers health checks and the workers are
+    polling, 503 with the failing checks otherwise. /status only says the
+    process is up.
+    """
+    ready, checks = await readiness.report()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+    )
+
 @router.get("/node_flow.json")
 async def get_node_flow():
     file_path = os.path.join(os.path.dirname(__file__), "node_flow.json")
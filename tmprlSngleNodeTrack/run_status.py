@@ -0,0 +1,145 @@
+"""
+Status snapshots and server-sent-event streams for node runs started in async mode.
+
+Activities that stream (knowledge_base_call with "stream") put the text so far
+in their heartbeat details; snapshots show it as "partial" and event streams
+send only what is new as "chunk" events.
+"""
+import asyncio
+import json
+import time
+from temporalio.api.enums.v1 import PendingActivityState
+from temporalio.client import WorkflowExecutionStatus, WorkflowFailureError, WorkflowHandle
+from temporalio.converter import DataConverter
+
+import config
+
+
+def _activity_phase(pending) -> dict:
+    if pending.state == PendingActivityState.PENDING_ACTIVITY_STATE_SCHEDULED:
+        phase = "retrying" if pending.attempt > 1 else "scheduled"
+    elif pending.state == PendingActivityState.PENDING_ACTIVITY_STATE_STARTED:
+        phase = "running"
+    else:
+        phase = PendingActivityState.Name(pending.state).removeprefix("PENDING_ACTIVITY_STATE_").lower()
+    info = {"activity": pending.activity_type.name, "activity_id": pending.activity_id, "phase": phase,
+            "attempt": pending.attempt}
+    if pending.HasField("last_failure"):
+        info["last_failure"] = pending.last_failure.message
+    if phase == "retrying" and pending.HasField("next_attempt_schedule_time"):
+        info["next_attempt_at"] = pending.next_attempt_schedule_time.ToDatetime().isoformat() + "Z"
+    return info
+
+
+async def _partial(data_converter: DataConverter, pending) -> str | None:
+    if not pending.heartbeat_details.payloads:
+        return None
+    try:
+        details = await data_converter.decode(pending.heartbeat_details.payloads)
+    except Exception:
+        return None  # progress is best effort; never fail a status read over it
+    if details and isinstance(details[0], dict) and isinstance(details[0].get("partial"), str):
+        return details[0]["partial"]
+    return None
+
+
+async def _closed_result(handle: WorkflowHandle, snapshot: dict) -> dict:
+    try:
+        snapshot["result"] = await handle.result()
+    except WorkflowFailureError as e:
+        snapshot["error"] = str(e.cause or e)
+    return snapshot
+
+
+async def describe_run(handle: WorkflowHandle, data_converter: DataConverter | None = None) -> dict:
+    """
+    Current status of a run, with its pending activities or its final result.
+    With data_converter, streamed text in heartbeat details is decoded too.
+    """
+    description = await handle.describe()
+    snapshot = {
+        "workflow_id": description.id,
+        "run_id": description.run_id,
+        "status": description.status.name.lower() if description.status else "unknown",
+    }
+    if description.status == WorkflowExecutionStatus.RUNNING:
+        snapshot["activities"] = []
+        for pending in description.raw_description.pending_activities:
+            info = _activity_phase(pending)
+            partial = None if data_converter is None else await _partial(data_converter, pending)
+            if partial is not None:
+                info["partial"] = partial
+            snapshot["activities"].append(info)
+        return snapshot
+    return await _closed_result(handle, snapshot)
+
+
+async def wait_for_run(handle: WorkflowHandle, wait: float, data_converter: DataConverter | None = None) -> dict:
+    """Long-poll: return as soon as the run closes, or its status after wait seconds."""
+    if wait > 0:
+        try:
+            result = await asyncio.wait_for(handle.result(), timeout=wait)
+            return {"workflow_id": handle.id, "status": "completed", "result": result}
+        except asyncio.TimeoutError:
+            pass
+        except WorkflowFailureError:
+            pass  # describe_run reports the failure with its final status
+    return await describe_run(handle, data_converter)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def run_events(handle: WorkflowHandle, is_disconnected=None,
+                     poll_interval: float = config.RUN_EVENTS_POLL_INTERVAL,
+                     max_seconds: float = config.RUN_EVENTS_MAX_SECONDS,
+                     on_close=None, data_converter: DataConverter | None = None):
+    """
+    Yield server-sent events for each status transition of a run (scheduled,
+    running attempt N, retrying, then the final status with its result).
+    With data_converter, streamed text is sent as "chunk" events carrying the
+    new text and its offset; a chunk with "reset" starts the text over (a new
+    attempt). If the run cannot be described the stream ends with an "error"
+    event. on_close, if given, is called with the final snapshot.
+    """
+    deadline = time.monotonic() + max_seconds
+    last_change = time.monotonic()
+    previous = None
+    streamed: dict[str, str] = {}  # activity ID -> text sent so far
+    while time.monotonic() < deadline:
+        if is_disconnected is not None and await is_disconnected():
+            return
+        try:
+            snapshot = await describe_run(handle, data_converter)
+        except Exception as e:
+            yield _sse("error", {"workflow_id": handle.id, "message": f"Could not get run status: {e}"})
+            return
+        partials = {a["activity_id"]: (a, a.pop("partial")) for a in snapshot.get("activities", []) if "partial" in a}
+        state = (snapshot["status"], json.dumps(snapshot.get("activities", []), sort_keys=True))
+        if state != previous:
+            previous = state
+            last_change = time.monotonic()
+            yield _sse("status" if snapshot["status"] == "running" else snapshot["status"], snapshot)
+        for activity_id, (info, partial) in partials.items():
+            sent = streamed.get(activity_id, "")
+            if partial == sent:
+                continue
+            reset = not partial.startswith(sent)
+            offset = 0 if reset else len(sent)
+            streamed[activity_id] = partial
+            last_change = time.monotonic()
+            chunk = {"workflow_id": handle.id, "activity": info["activity"], "activity_id": activity_id,
+                     "attempt": info["attempt"], "offset": offset, "text": partial[offset:]}
+            if reset:
+                chunk["reset"] = True
+            yield _sse("chunk", chunk)
+        if snapshot["status"] != "running":
+            if on_close is not None:
+                on_close(snapshot)
+            return
+        if time.monotonic() - last_change >= config.RUN_EVENTS_KEEPALIVE:
+            last_change = time.monotonic()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(poll_interval)
+    yield _sse("timeout", {"workflow_id": handle.id, "message": "Stopped streaming before the run finished."})
@@ -27,44 +27,54 @@
 # with fastapi and worker-----------------------------------------------------------
 
 import time
-import json
 import asyncio
-import threading
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from pydantic import BaseModel
-from temporalio import client
 from workflow import SingleNodeWorkflow
-from utils import start_temporal_server, print_temporal_logs
-from worker import main as worker_main
 from routs import router
-import socket
+from client_pool import temporal_pool
+import config
+import telemetry
+from execution_store import execution_store
+from blob_store import blob_store
+from campaigns import campaigns
 
 app = FastAPI()
 app.include_router(router)
 
-def start_temporal_server_async():
-    proc = start_temporal_server()
-    print_temporal_logs(proc)
-
-def run_worker():
-    # Wait for Temporal server to be available
-    while True:
-        try:
-            with socket.create_connection(("localhost", 7233), timeout=2):
-                break
-        except OSError:
-            print("Waiting for Temporal server to be ready on port 7233...")
-            time.sleep(1)
-    asyncio.run(worker_main())
-
-def start_worker_async():
-    thread = threading.Thread(target=run_worker, daemon=True)
-    thread.start()
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so path parameters do not explode the series count
+    route = request.scope.get("route")
+    telemetry.http_request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
 
+# The Temporal server and workers are owned by supervisor.py; serving this app
+# on its own (e.g. `uvicorn run_temporal_client:app`) expects both to be running.
 @app.on_event("startup")
-def startup_event():
-    start_temporal_server_async()
-    start_worker_async()
+async def startup_event():
+    await temporal_pool.start()
+    app.state.metrics_drain = asyncio.ensure_future(telemetry.drain_periodically())
+    app.state.execution_retention = asyncio.ensure_future(execution_store.retention_loop())
+    app.state.blob_retention = asyncio.ensure_future(blob_store.retention_loop())
+    # Campaigns left running by the previous process pick up where they stopped
+    await campaigns.resume_all()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.metrics_drain.cancel()
+    app.state.execution_retention.cancel()
+    app.state.blob_retention.cancel()
+    await campaigns.close()
+    await execution_store.close()
+    await temporal_pool.close()
 
 class WorkflowResponse(BaseModel):
     message: str
@@ -72,15 +82,15 @@ class WorkflowResponse(BaseModel):
 
 @app.post("/run-workflow", response_model=WorkflowResponse)
 async def run_workflow():
-    # Connect to Temporal server
-    temporal_client = await client.Client.connect("localhost:7233")
+    # Reuse the shared Temporal client
+    temporal_client = await temporal_pool.get()
 
     # Run workflow
     workflow_id = f"single-node-workflow-{int(time.time())}"
     result = await temporal_client.execute_workflow(
         SingleNodeWorkflow,
         id=workflow_id,
-        task_queue="call-flow-queue",
+        task_queue=config.TASK_QUEUE,
     )
 
     return {
@@ -1,32 +1,8 @@
-import threading
-import asyncio
-import uvicorn
-import subprocess
-import time
-import sys
-from worker import main as worker_main
-from run_temporal_client import app
-from utils import start_temporal_server
-
-
-def start_worker():
-    asyncio.run(worker_main())
+"""
+Starts the whole stack (Temporal dev server if needed, worker and API) under
+one supervisor. See supervisor.py.
+"""
+from supervisor import main
 
 if __name__ == "__main__":
-    # Start the Temporal server
-    temporal_proc = start_temporal_server()
-    print("Started Temporal server (dev mode) at http://localhost:8233 ... waiting for it to be ready...")
-    time.sleep(5)  # Wait a few seconds for the server to be ready
-
-    try:
-        # Start the worker in a background thread
-        worker_thread = threading.Thread(target=start_worker, daemon=True)
-        worker_thread.start()
-
-        # Start the FastAPI server (blocking call)
-        uvicorn.run(app, host="0.0.0.0", port=8000)
-    finally:
-        # Clean up: terminate the Temporal server process when done
-        print("Shutting down Temporal server...")
-        temporal_proc.terminate()
-        temporal_proc.wait() 
\ No newline at end of file
+    main()
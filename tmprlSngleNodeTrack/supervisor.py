@@ -0,0 +1,188 @@
+"""
+Single owner of the Temporal dev server, the worker(s) and the API.
+
+The API starts listening right away while Temporal comes up; the dev server
+is only started when TEMPORAL_ADDRESS is not already reachable, and readiness
+is probed instead of waited out with fixed sleeps. /ready turns 200 once
+Temporal answers health checks and the workers are polling. SIGINT/SIGTERM
+stop the API, then the workers (letting in-flight tasks finish), then the dev
+server if this process started it.
+
+    python supervisor.py
+"""
+import asyncio
+import logging
+import signal
+import subprocess
+import time
+
+import uvicorn
+
+import config
+import readiness
+import task_queues
+import worker_pool
+from utils import start_temporal_server, print_temporal_logs
+
+logger = logging.getLogger(__name__)
+
+
+def _dev_server_args() -> list[str]:
+    host, _, port = config.TEMPORAL_ADDRESS.rpartition(":")
+    args = ["--ip", host or "localhost", "--port", port or "7233"]
+    if config.TEMPORAL_NAMESPACE != "default":
+        args += ["--namespace", config.TEMPORAL_NAMESPACE]
+    return args
+
+
+class Supervisor:
+    def __init__(self, host: str = config.API_HOST, port: int = config.API_PORT,
+                 worker_processes: int = config.SUPERVISOR_WORKER_PROCESSES,
+                 start_server: str = config.START_TEMPORAL_SERVER):
+        self.host = host
+        self.port = port
+        self.worker_processes = worker_processes
+        self.start_server = start_server
+        self.temporal_proc: subprocess.Popen | None = None
+        self.worker_task: asyncio.Task | None = None
+        self.pollers_task: asyncio.Task | None = None
+        self.worker_procs = []
+        self.workers_ready = asyncio.Event()
+        self.stopping = asyncio.Event()
+        self.api: uvicorn.Server | None = None
+
+    async def _wait_for_temporal(self) -> bool:
+        """Probe with a short backoff until the frontend is healthy or the dev server exits."""
+        deadline = time.monotonic() + config.TEMPORAL_STARTUP_TIMEOUT
+        delay = 0.05
+        while time.monotonic() < deadline and not self.stopping.is_set():
+            ready, _ = await readiness.temporal_check()
+            if ready:
+                return True
+            if self.temporal_proc is not None and self.temporal_proc.poll() is not None:
+                logger.error(f"Temporal dev server exited with code {self.temporal_proc.returncode}")
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        return False
+
+    async def start_temporal(self) -> bool:
+        if self.start_server != "always":
+            ready, _ = await readiness.temporal_check()
+            if ready:
+                logger.info(f"Using the Temporal server already running at {config.TEMPORAL_ADDRESS}")
+                return True
+            if self.start_server == "never":
+                logger.info(f"Waiting for Temporal at {config.TEMPORAL_ADDRESS}")
+                return await self._wait_for_temporal()
+        self.temporal_proc = start_temporal_server(_dev_server_args())
+        print_temporal_logs(self.temporal_proc)
+        logger.info(f"Started Temporal dev server (pid {self.temporal_proc.pid}) for {config.TEMPORAL_ADDRESS}")
+        return await self._wait_for_temporal()
+
+    def start_workers(self):
+        if self.worker_processes > 0:
+            self.worker_procs = worker_pool.start_pool(self.worker_processes, task_queues.WORKER_CLASSES)
+        else:
+            from worker import main as worker_main
+            # The API's own /metrics already covers this process, so no separate worker port
+            self.worker_task = asyncio.ensure_future(worker_main(metrics_port=0))
+        self.pollers_task = asyncio.ensure_future(self._wait_for_pollers())
+
+    async def _wait_for_pollers(self):
+        """Probe with a short backoff until Temporal sees a poller on every task queue the workers serve."""
+        queues = task_queues.polled_queues(task_queues.WORKER_CLASSES)
+        delay = 0.05
+        while not self.stopping.is_set():
+            if self.worker_task is not None and self.worker_task.done():
+                return
+            ready, detail = await readiness.pollers_check(queues)
+            if ready:
+                self.workers_ready.set()
+                return
+            logger.debug(f"Workers not polling yet: {detail}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    async def workers_check(self) -> tuple[bool, str]:
+        if self.worker_procs:
+            alive = sum(1 for proc in self.worker_procs if proc.is_alive())
+            detail = f"{alive}/{len(self.worker_procs)} worker processes alive"
+            if not self.workers_ready.is_set():
+                return False, f"{detail}, not polling yet"
+            return alive == len(self.worker_procs), detail
+        if self.worker_task is not None and self.worker_task.done():
+            return False, "worker stopped"
+        return self.workers_ready.is_set(), "polling" if self.workers_ready.is_set() else "starting"
+
+    async def api_check(self) -> tuple[bool, str]:
+        return bool(self.api and self.api.started), f"{self.host}:{self.port}"
+
+    async def run(self):
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.stopping.set))
+
+        from run_temporal_client import app
+        readiness.register("workers", self.workers_check)
+        readiness.register("api", self.api_check)
+        self.api = uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.port, log_level="info"))
+        api_task = asyncio.ensure_future(self.api.serve())
+        stop_task = asyncio.ensure_future(self.stopping.wait())
+        try:
+            # Temporal and the API come up in parallel; workers need Temporal
+            temporal_task = asyncio.ensure_future(self.start_temporal())
+            await asyncio.wait({temporal_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not temporal_task.done():
+                temporal_task.cancel()
+                return
+            if not temporal_task.result():
+                logger.error(f"Temporal at {config.TEMPORAL_ADDRESS} did not become ready, shutting down")
+                return
+            self.start_workers()
+            ready_task = asyncio.ensure_future(self.workers_ready.wait())
+            await asyncio.wait({ready_task, stop_task, api_task} | ({self.worker_task} if self.worker_task else set()),
+                               return_when=asyncio.FIRST_COMPLETED)
+            ready_task.cancel()
+            if self.workers_ready.is_set():
+                logger.info(f"Ready in {time.monotonic() - started:.2f}s")
+            # Run until a signal arrives or the API or worker stops on its own
+            watched = {stop_task, api_task} | ({self.worker_task} if self.worker_task else set())
+            await asyncio.wait(watched, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            await self.shutdown(api_task)
+
+    async def shutdown(self, api_task: asyncio.Task):
+        logger.info("Shutting down: API, then workers, then Temporal")
+        if self.api is not None:
+            self.api.should_exit = True
+        await asyncio.wait({api_task}, timeout=config.SHUTDOWN_TIMEOUT)
+        if self.pollers_task is not None:
+            self.pollers_task.cancel()
+
+        if self.worker_task is not None and not self.worker_task.done():
+            # Cancelling Worker.run() stops polling and waits for in-flight tasks
+            self.worker_task.cancel()
+            await asyncio.wait({self.worker_task}, timeout=config.SHUTDOWN_TIMEOUT)
+        if self.worker_procs:
+            await asyncio.to_thread(worker_pool.stop_pool, self.worker_procs, config.SHUTDOWN_TIMEOUT)
+
+        if self.temporal_proc is not None and self.temporal_proc.poll() is None:
+            self.temporal_proc.terminate()
+            try:
+                await asyncio.to_thread(self.temporal_proc.wait, config.SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.temporal_proc.kill()
+        readiness.unregister("workers")
+        readiness.unregister("api")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(Supervisor().run())
+
+
+if __name__ == "__main__":
+    main()
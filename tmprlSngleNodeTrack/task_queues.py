@@ -0,0 +1,59 @@
+"""
+Routing of activities to task queues by latency class, so slow nodes cannot
+take the worker slots of fast ones.
+"""
+import config
+
+WORKFLOW = "workflow"
+FAST = "fast"
+NOTIFY = "notify"
+SLOW = "slow"
+
+WORKER_CLASSES = (WORKFLOW, FAST, NOTIFY, SLOW)
+
+# Activity name -> latency class
+ACTIVITY_CLASSES = {
+    "start_call": FAST,
+    "end_call": FAST,
+    "api_connectivity": FAST,
+    "http_connectivity": FAST,
+    "webhook_connectivity": FAST,
+    "email_sent": NOTIFY,
+    "sms_sent": NOTIFY,
+    "schedule_meeting": NOTIFY,
+    "knowledge_base_call": SLOW,
+    "waiting_for_response": SLOW,
+}
+
+TASK_QUEUES = {
+    WORKFLOW: config.TASK_QUEUE,
+    FAST: config.FAST_TASK_QUEUE,
+    NOTIFY: config.NOTIFY_TASK_QUEUE,
+    SLOW: config.SLOW_TASK_QUEUE,
+}
+
+MAX_CONCURRENT_ACTIVITIES = {
+    FAST: config.WORKER_MAX_ACTIVITIES_FAST,
+    NOTIFY: config.WORKER_MAX_ACTIVITIES_NOTIFY,
+    SLOW: config.WORKER_MAX_ACTIVITIES_SLOW,
+}
+
+
+def polled_queues(classes=WORKER_CLASSES) -> dict:
+    """Task queue -> "workflow" or "activity" for every queue the workers of these classes poll."""
+    queues = {}
+    for worker_class in classes:
+        if worker_class == WORKFLOW:
+            queues[TASK_QUEUES[WORKFLOW]] = "workflow"
+        elif worker_class in ACTIVITY_CLASSES.values():
+            queues[TASK_QUEUES[worker_class]] = "activity"
+    return queues
+
+
+def queue_for_activity(activity_name: str) -> str:
+    return TASK_QUEUES[ACTIVITY_CLASSES.get(activity_name, SLOW)]
+
+
+def runs_as_local_activity(node_type: str) -> bool:
+    """Lightweight node types run inside the workflow task instead of on a task queue."""
+    return node_type in config.LOCAL_ACTIVITY_NODE_TYPES
@@ -0,0 +1,159 @@
+"""
+Prometheus metrics for the API and the worker: HTTP request latency, workflow
+end-to-end latency by node type, activity queue wait/execution/attempts, and
+the Temporal SDK runtime's own metrics folded into the same registry.
+"""
+import asyncio
+import logging
+import time
+from temporalio import activity
+from temporalio.runtime import (
+    MetricBuffer,
+    MetricBufferDurationFormat,
+    Runtime,
+    TelemetryConfig,
+)
+from temporalio.worker import ActivityInboundInterceptor, ExecuteActivityInput, Interceptor
+
+import config
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route template.", ("method", "route", "status"))
+workflow_duration = registry.histogram(
+    "workflow_run_duration_seconds", "End-to-end latency of synchronous runs as seen by the API.",
+    ("node_type", "outcome"))
+workflow_runs = registry.counter(
+    "workflow_runs_total", "Synchronous runs by node type and outcome.", ("node_type", "outcome"))
+activity_schedule_to_start = registry.histogram(
+    "activity_schedule_to_start_seconds", "Time an activity attempt waited on its task queue.",
+    ("activity", "task_queue"))
+activity_execution = registry.histogram(
+    "activity_execution_seconds", "Activity attempt execution time.", ("activity", "outcome"))
+activity_attempts = registry.histogram(
+    "activity_attempt", "Attempt number of each activity execution (1 = first try).", ("activity",),
+    buckets=(1, 2, 3, 5, 10))
+activity_executions = registry.counter(
+    "activity_executions_total", "Activity attempts by outcome.", ("activity", "outcome"))
+
+# Temporal SDK metrics are buffered in the core runtime and drained into the registry
+_buffer: MetricBuffer | None = None
+_runtime_metrics: dict[str, tuple] = {}
+
+
+def install_runtime():
+    """
+    Make the default Temporal runtime buffer its metrics so they can be exported
+    here. Must run before the first client connects in this process.
+    """
+    global _buffer
+    if _buffer is not None:
+        return
+    _buffer = MetricBuffer(config.TEMPORAL_METRIC_BUFFER_SIZE, duration_format=MetricBufferDurationFormat.SECONDS)
+    Runtime.set_default(Runtime(telemetry=TelemetryConfig(metrics=_buffer)), error_if_already_set=False)
+
+
+def _runtime_metric(update):
+    name = update.metric.name if update.metric.name.startswith("temporal_") else f"temporal_{update.metric.name}"
+    entry = _runtime_metrics.get(name)
+    if entry is None:
+        labelnames = tuple(sorted(update.attributes))
+        help = update.metric.description or "Temporal SDK metric."
+        if update.metric.kind == 0:
+            metric = registry.counter(name, help, labelnames)
+        elif update.metric.kind == 1:
+            metric = registry.gauge(name, help, labelnames)
+        else:
+            metric = registry.histogram(name, help, labelnames)
+        entry = _runtime_metrics[name] = (update.metric.kind, metric)
+    return entry
+
+
+def drain_runtime_metrics():
+    """Fold buffered SDK metric updates into the registry."""
+    if _buffer is None:
+        return
+    for update in _buffer.retrieve_updates():
+        kind, metric = _runtime_metric(update)
+        if kind == 0:
+            metric.inc(update.value, **update.attributes)
+        elif kind == 1:
+            metric.set(update.value, **update.attributes)
+        else:
+            metric.observe(update.value, **update.attributes)
+
+
+def render() -> str:
+    drain_runtime_metrics()
+    return registry.render()
+
+
+async def drain_periodically(interval: float = config.TEMPORAL_METRIC_DRAIN_INTERVAL):
+    """Keep the SDK's metric buffer from filling up between scrapes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            drain_runtime_metrics()
+        except Exception as e:
+            logger.warning(f"Could not drain Temporal runtime metrics: {e}")
+
+
+class _ActivityMetricsInbound(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput):
+        info = activity.info()
+        name = info.activity_type
+        if info.started_time and info.current_attempt_scheduled_time:
+            activity_schedule_to_start.observe(
+                max(0.0, (info.started_time - info.current_attempt_scheduled_time).total_seconds()),
+                activity=name, task_queue=info.task_queue)
+        activity_attempts.observe(info.attempt, activity=name)
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            result = await self.next.execute_activity(input)
+            outcome = "success"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            activity_execution.observe(time.perf_counter() - started, activity=name, outcome=outcome)
+            activity_executions.inc(activity=name, outcome=outcome)
+
+
+class ActivityMetricsInterceptor(Interceptor):
+    """Worker interceptor recording queue wait, execution time and attempts per activity."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _ActivityMetricsInbound(next)
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body, content_type = "200 OK", render().encode(), CONTENT_TYPE
+        else:
+            status, body, content_type = "404 Not Found", b"Not Found\n", "text/plain"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except Exception as e:
+        logger.warning(f"Metrics scrape failed: {e}")
+    finally:
+        writer.close()
+
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+    """Serve GET /metrics for processes without the API (worker processes)."""
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logger.info(f"Serving Prometheus metrics on {host}:{port}/metrics")
+    return server
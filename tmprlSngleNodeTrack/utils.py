@@ -1,10 +1,10 @@
 import subprocess
 import threading
 
-def start_temporal_server():
+def start_temporal_server(extra_args=()):
     # Start Temporal server in dev mode as a subprocess
     proc = subprocess.Popen([
-        "temporal", "server", "start-dev"
+        "temporal", "server", "start-dev", *extra_args
     ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     return proc
 
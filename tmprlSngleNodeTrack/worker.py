@@ -3,38 +3,88 @@ Temporal worker for single node workflow.
 """
 import logging
 import asyncio
+from datetime import timedelta
 from temporalio.client import Client
 from temporalio.worker import Worker
-from workflow import SingleNodeWorkflow
+from workflow import SingleNodeWorkflow, FlowWorkflow, CallSessionWorkflow, activity_map
 import activities
+import config
+import llm
+import notifications
+import payload_codec
+import task_queues
+import telemetry
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(name)s %(message)s"
 )
 
-async def main():
-    client = await Client.connect("localhost:7233")
+ALL_ACTIVITIES = [
+    activities.start_call,
+    activities.end_call,
+    activities.email_sent,
+    activities.sms_sent,
+    activities.knowledge_base_call,
+    activities.schedule_meeting,
+    activities.waiting_for_response,
+    activities.api_connectivity,
+    activities.http_connectivity,
+    activities.webhook_connectivity,
+]
 
-    worker = Worker(
-        client,
-        task_queue="call-flow-queue",
-        workflows=[SingleNodeWorkflow],
-        activities=[
-            activities.start_call,
-            activities.end_call,
-            activities.email_sent,
-            activities.sms_sent,
-            activities.knowledge_base_call,
-            activities.schedule_meeting,
-            activities.waiting_for_response,
-            activities.api_connectivity,
-            activities.http_connectivity,
-            activities.webhook_connectivity,
-        ],
+def build_workers(client: Client, classes=task_queues.WORKER_CLASSES) -> list[Worker]:
+    """One Worker per requested class: workflows, or the activities of one latency class."""
+    workers = []
+    for worker_class in classes:
+        task_queue = task_queues.TASK_QUEUES[worker_class]
+        if worker_class == task_queues.WORKFLOW:
+            # Local activities run on the worker that runs the workflow task
+            local_activities = [
+                activity_map[t] for t in sorted(config.LOCAL_ACTIVITY_NODE_TYPES) if t in activity_map
+            ]
+            workers.append(Worker(
+                client,
+                task_queue=task_queue,
+                workflows=[SingleNodeWorkflow, FlowWorkflow, CallSessionWorkflow],
+                activities=local_activities,
+                interceptors=[telemetry.ActivityMetricsInterceptor()],
+                max_concurrent_workflow_tasks=config.WORKER_MAX_WORKFLOW_TASKS,
+            ))
+            continue
+        class_activities = [a for a in ALL_ACTIVITIES if task_queues.queue_for_activity(a.__name__) == task_queue]
+        if class_activities:
+            workers.append(Worker(
+                client,
+                task_queue=task_queue,
+                activities=class_activities,
+                interceptors=[telemetry.ActivityMetricsInterceptor()],
+                max_concurrent_activities=task_queues.MAX_CONCURRENT_ACTIVITIES[worker_class],
+                max_heartbeat_throttle_interval=timedelta(seconds=config.HEARTBEAT_THROTTLE_INTERVAL),
+            ))
+    return workers
+
+async def main(classes=task_queues.WORKER_CLASSES, metrics_port: int = config.WORKER_METRICS_PORT):
+    telemetry.install_runtime()
+    client = await Client.connect(
+        config.TEMPORAL_ADDRESS,
+        namespace=config.TEMPORAL_NAMESPACE,
+        data_converter=payload_codec.data_converter(),
     )
+    workers = build_workers(client, classes)
 
-    await worker.run()
+    await llm.on_startup()
+    await notifications.on_startup()
+    metrics_server = await telemetry.serve_metrics(metrics_port) if metrics_port else None
+    drain_task = asyncio.ensure_future(telemetry.drain_periodically())
+    try:
+        await asyncio.gather(*(worker.run() for worker in workers))
+    finally:
+        drain_task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await notifications.on_shutdown()
+        await llm.on_shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
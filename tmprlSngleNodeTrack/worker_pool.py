@@ -0,0 +1,85 @@
+"""
+Launcher for N worker processes, each polling the task queues of the given
+worker classes (workflow, fast, notify, slow).
+
+    python worker_pool.py --processes 4
+    python worker_pool.py --processes 2 --classes slow
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+import config
+import task_queues
+
+logger = logging.getLogger(__name__)
+
+
+async def _serve(classes: list[str], metrics_port: int):
+    from worker import main as worker_main
+    task = asyncio.ensure_future(worker_main(classes, metrics_port))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def run_worker_process(classes: list[str], metrics_port: int = config.WORKER_METRICS_PORT):
+    asyncio.run(_serve(classes, metrics_port))
+
+
+def start_pool(processes: int, classes: list[str]) -> list[multiprocessing.Process]:
+    ctx = multiprocessing.get_context("spawn")
+    procs = []
+    for i in range(processes):
+        # Each process scrapes on its own port: WORKER_METRICS_PORT + process index
+        metrics_port = config.WORKER_METRICS_PORT + i if config.WORKER_METRICS_PORT else 0
+        proc = ctx.Process(target=run_worker_process, args=(classes, metrics_port), name=f"worker-{i}", daemon=True)
+        proc.start()
+        procs.append(proc)
+    logger.info(f"Started {processes} worker processes for classes: {', '.join(classes)}")
+    return procs
+
+
+def stop_pool(procs: list[multiprocessing.Process], timeout: float = 30):
+    """Ask workers to finish in-flight tasks, then kill any that do not exit in time."""
+    for proc in procs:
+        if proc.is_alive():
+            proc.terminate()
+    for proc in procs:
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=config.WORKER_PROCESSES)
+    parser.add_argument("--classes", default=",".join(task_queues.WORKER_CLASSES),
+                        help="comma-separated worker classes each process serves")
+    args = parser.parse_args()
+    classes = [c.strip() for c in args.classes.split(",") if c.strip()]
+    unknown = [c for c in classes if c not in task_queues.WORKER_CLASSES]
+    if unknown:
+        parser.error(f"unknown worker classes: {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    procs = start_pool(args.processes, classes)
+    # SIGTERM is turned into SIGINT handling so both stop the pool the same way
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping worker processes...")
+    finally:
+        stop_pool(procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 """
-Workflow definition for single node execution with Temporal.
+Workflow definitions for single node and whole flow execution with Temporal.
 """
+import asyncio
 from datetime import timedelta
 from temporalio import workflow
-from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError, ApplicationError, RetryState, TimeoutError
+from flow_graph import plan_flow
+from node_policies import VALIDATION_ERROR, policy_for
+from task_queues import queue_for_activity, runs_as_local_activity
 from activities import (
     start_call,
     end_call,
@@ -30,50 +34,295 @@ activity_map = {
     "webhook": webhook_connectivity,
 }
 
-# Define a retry policy for all activities
-retry_policy = RetryPolicy(
-    initial_interval=timedelta(seconds=2),      # use timedelta
-    backoff_coefficient=2.0,                   # exponential backoff
-    maximum_interval=timedelta(seconds=10),    # use timedelta
-    maximum_attempts=3                         # total attempts (including the first)
-)
+def summarize_result(node_type: str, result) -> dict:
+    """Turn an activity's raw result into the response shape returned to callers."""
+    if isinstance(result, dict) and result.get("status") in ["success", "started", "ended"]:
+        # A KB call's answer is its result; other activities report a message
+        activity_result = result.get("result") if node_type == "knowledgeBaseCall" else result.get("message", "Success")
+        return {
+            "status": "success",
+            "message": "Activity completed successfully.",
+            "activity_result": activity_result,
+            "attempts": result.get("attempt"),
+        }
+    # Special handling for apiConnectivity, http, and webhook: treat as success if 'response' key exists
+    if node_type in ["apiConnectivity", "http", "webhook"] and isinstance(result, dict) and "response" in result:
+        return {
+            "status": "success",
+            "message": f"{node_type} response.",
+            "activity_result": result["response"],
+            "attempts": result.get("attempt"),
+        }
+    else:
+        return {
+            "status": "failed",
+            "message": "The operation could not be completed after several attempts. Please try again later.",
+            "result": None
+        }
+
+def describe_failure(error: ActivityError) -> dict:
+    """Caller-facing response for an activity that failed for good."""
+    cause = error.cause
+    failure = {"status": "failed", "message": getattr(cause, "message", None) or str(cause or error), "result": None}
+    if isinstance(cause, ApplicationError):
+        failure["error_type"] = cause.type or "ApplicationError"
+        failure["retryable"] = not cause.non_retryable
+    elif isinstance(cause, TimeoutError):
+        failure["error_type"] = f"Timeout{cause.type.name.title().replace('_', '') if cause.type else ''}"
+    if error.retry_state is not None:
+        failure["retry_state"] = error.retry_state.name
+    return failure
+
+async def wait_for_response(inputs: dict, context: dict, responses: dict,
+                            deadline: float | None = None) -> tuple[dict, dict]:
+    """
+    Durable wait for a response delivered by signal under the node's key.
+    Runs as a workflow timer, so a pending wait holds no worker slot; the
+    timer never runs past the caller's deadline (epoch seconds).
+    """
+    key = inputs.get("key")
+    if not key:
+        return {"status": "failed", "message": "A 'key' input is required for waiting_for_response activity!"}, context
+    # Bad input must fail the node: an exception here would fail the workflow task over and over
+    try:
+        wait_seconds = float(inputs.get("wait_seconds", 5))
+    except (TypeError, ValueError):
+        wait_seconds = None
+    if wait_seconds is None or not 0 <= wait_seconds < float("inf"):
+        return {"status": "failed", "message": "'wait_seconds' must be a non-negative number of seconds.",
+                "error_type": VALIDATION_ERROR, "result": None}, context
+    if deadline is not None:
+        budget = deadline - workflow.now().timestamp()
+        if budget <= 0:
+            return deadline_exceeded(), context
+        wait_seconds = min(wait_seconds, budget)
+    try:
+        await workflow.wait_condition(lambda: key in responses, timeout=timedelta(seconds=wait_seconds))
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "message": f"No response with key: {key} within {wait_seconds:g} seconds."}, context
+    response = responses[key]
+    context = {**context, "responses": {**context.get("responses", {}), key: response}}
+    return {
+        "status": "success",
+        "message": f"Received response with key: {key}.",
+        "activity_result": response
+    }, context
+
+def deadline_exceeded() -> dict:
+    return {"status": "failed", "message": "The request deadline passed before the node could run.",
+            "error_type": "DeadlineExceeded", "result": None}
+
+async def execute_node(node: dict, context: dict, upstream: dict | None = None,
+                       responses: dict | None = None, deadline: float | None = None) -> tuple[dict, dict]:
+    """
+    Run one node's activity from workflow code. upstream holds the responses of
+    the nodes that ran before it in a flow; responses holds the payloads
+    signalled to the workflow for waitingforResponse nodes; deadline is the
+    caller's deadline (epoch seconds), which caps the activity's timeouts.
+    Returns the caller-facing response and the context to hand to later nodes.
+    """
+    if not node:
+        return {"status": "error", "message": "Node not found"}, context
+    inputs = node.get("config", {}).get("properties", {})
+    if not any(str(v).strip() for v in inputs.values()):
+        return {"status": "no_input", "message": "No user input value for this node."}, context
+    node_type = node["type"]
+    if node_type == "waitingforResponse" and responses is not None:
+        return await wait_for_response(inputs, context, responses, deadline)
+    activity_func = activity_map.get(node_type)
+    if not activity_func:
+        return {"status": "error", "message": f"No activity for node type {node_type}"}, context
+    try:
+        policy = policy_for(node)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid policy for node type {node_type}: {e}"}, context
+    budget = None if deadline is None else deadline - workflow.now().timestamp()
+    if budget is not None and budget <= 0:
+        return deadline_exceeded(), context
+    args = {"context": context, "inputs": inputs}
+    if upstream:
+        args["upstream"] = upstream
+    try:
+        if runs_as_local_activity(node_type):
+            result = await workflow.execute_local_activity(
+                activity_func,
+                args,
+                retry_policy=policy.retry_policy(),
+                **policy.timeouts(budget, local=True),
+            )
+        else:
+            result = await workflow.execute_activity(
+                activity_func,
+                args,
+                task_queue=queue_for_activity(activity_func.__name__),
+                retry_policy=policy.retry_policy(),
+                **policy.timeouts(budget),
+            )
+    except ActivityError as e:
+        # Non-retryable errors land here on the first attempt, with their own message
+        failure = describe_failure(e)
+        if e.retry_state == RetryState.MAXIMUM_ATTEMPTS_REACHED:
+            failure["attempts"] = policy.max_attempts
+        return failure, context
+    if isinstance(result, dict) and isinstance(result.get("context"), dict):
+        context = result["context"]
+    return summarize_result(node_type, result), context
+
+class ResponseSignals:
+    """Signal handler shared by workflows that can run waitingforResponse nodes."""
+
+    def __init__(self, responses: dict | None = None):
+        self.responses: dict = dict(responses or {})
+
+    @workflow.signal
+    def deliver_response(self, delivery: dict):
+        self.responses[delivery["key"]] = delivery.get("response")
 
 @workflow.defn
-class SingleNodeWorkflow:
+class SingleNodeWorkflow(ResponseSignals):
     @workflow.run
     async def run(self, node: dict) -> dict:
-        if not node:
-            return {"status": "error", "message": "Node not found"}
-        inputs = node.get("config", {}).get("properties", {})
-        if not any(str(v).strip() for v in inputs.values()):
-            return {"status": "no_input", "message": "No user input value for this node."}
-        node_type = node["type"]
-        activity_func = activity_map.get(node_type)
-        if not activity_func:
-            return {"status": "error", "message": f"No activity for node type {node_type}"}
-        context = {}
-        result = await workflow.execute_activity(
-            activity_func,
-            {"context": context, "inputs": inputs},
-            schedule_to_close_timeout=timedelta(seconds=10),
-            retry_policy=retry_policy,
-        )
-        if isinstance(result, dict) and result.get("status") in ["success", "started"]:
-            return {
-                "status": "success",
-                "message": "Activity completed successfully.",
-                "activity_result": result.get("message", "Success")
-            }
-        # Special handling for apiConnectivity, http, and webhook: treat as success if 'response' key exists
-        if node_type in ["apiConnectivity", "http", "webhook"] and isinstance(result, dict) and "response" in result:
-            return {
-                "status": "success",
-                "message": f"{node_type} response.",
-                "activity_result": result["response"]
-            }
-        else:
-            return {
-                "status": "failed",
-                "message": "The operation could not be completed after several attempts. Please try again later.",
-                "result": None
-            }
+        response, _ = await execute_node(node, {}, responses=self.responses, deadline=node.get("deadline"))
+        return response
+
+@workflow.defn
+class FlowWorkflow(ResponseSignals):
+    """
+    Runs a whole flow graph in one workflow. Each node starts as soon as all of
+    its upstream nodes succeeded, so independent branches run concurrently.
+    A node receives the merged contexts and the responses of its upstream
+    nodes; nodes below a failed node are skipped.
+    """
+
+    @workflow.run
+    async def run(self, flow: dict) -> dict:
+        nodes = {n["uniqueId"]: n for n in flow.get("nodes", [])}
+        try:
+            plan = plan_flow(list(nodes.values()), flow.get("edges", []), flow.get("start"), flow.get("end"))
+        except ValueError as e:
+            return {"status": "error", "message": str(e), "results": {}}
+
+        results: dict[str, dict] = {}
+        contexts: dict[str, dict] = {}
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def run_node(node_id: str, upstream: list[str]):
+            if upstream:
+                await asyncio.gather(*(tasks[u] for u in upstream))
+            failed = [u for u in upstream if results[u].get("status") != "success"]
+            if failed:
+                results[node_id] = {"status": "skipped", "message": f"Upstream node(s) {', '.join(failed)} did not succeed."}
+                return
+            context = dict(flow.get("context", {}))
+            for u in upstream:
+                context.update(contexts[u])
+            started = workflow.time()
+            results[node_id], contexts[node_id] = await execute_node(
+                nodes[node_id], context, {u: results[u] for u in upstream}, self.responses, flow.get("deadline"))
+            results[node_id]["latency_ms"] = round((workflow.time() - started) * 1000, 3)
+
+        # Tasks are created in topological order so every upstream task already exists
+        for node_id in plan["order"]:
+            tasks[node_id] = asyncio.create_task(run_node(node_id, plan["predecessors"][node_id]))
+        await asyncio.gather(*tasks.values())
+
+        last = plan["end"] or plan["order"][-1]
+        return {
+            "status": "success" if all(r.get("status") == "success" for r in results.values()) else "failed",
+            "start": plan["start"],
+            "end": plan["end"],
+            "order": plan["order"],
+            "results": results,
+            "context": contexts.get(last, {}),
+        }
+
+@workflow.defn
+class CallSessionWorkflow(ResponseSignals):
+    """
+    One workflow for the whole of a live call. Each node run arrives as the
+    run_node update and is answered with the node's response, so a step costs
+    one update round trip instead of a workflow start. Steps run one at a time
+    and share the call's context, so what startCall records reaches endCall.
+
+    The session ends after a successful endCall, an end_session signal, or
+    idle_timeout seconds without steps. It continues as new after max_steps
+    steps, or when Temporal suggests it, carrying its state over.
+    """
+
+    @workflow.init
+    def __init__(self, state: dict):
+        super().__init__(state.get("responses"))
+        self.context: dict = dict(state.get("context", {}))
+        self.steps: int = state.get("steps", 0)
+        self.steps_this_run = 0
+        self.max_steps: int = state.get("max_steps", 200)
+        self.idle_timeout: float = state.get("idle_timeout", 1800)
+        self.ended_reason: str | None = None
+        self.last_step: dict | None = None
+        self.busy = asyncio.Lock()
+
+    @workflow.run
+    async def run(self, state: dict) -> dict:
+        while True:
+            steps_before = self.steps
+            try:
+                await workflow.wait_condition(
+                    lambda: self.ended_reason is not None or self.steps != steps_before or self._should_continue(),
+                    timeout=timedelta(seconds=self.idle_timeout),
+                )
+            except asyncio.TimeoutError:
+                if not self.busy.locked():
+                    self.ended_reason = "idle"
+            if self.ended_reason is not None or self._should_continue():
+                # Let accepted steps finish and answer before the run closes
+                await workflow.wait_condition(workflow.all_handlers_finished)
+                if self.ended_reason is not None:
+                    return {"status": "ended", "reason": self.ended_reason, "steps": self.steps,
+                            "context": self.context}
+                workflow.continue_as_new({
+                    "context": self.context,
+                    "steps": self.steps,
+                    "responses": self.responses,
+                    "max_steps": self.max_steps,
+                    "idle_timeout": self.idle_timeout,
+                })
+
+    def _should_continue(self) -> bool:
+        return self.steps_this_run >= self.max_steps or workflow.info().is_continue_as_new_suggested()
+
+    @workflow.update
+    async def run_node(self, node: dict) -> dict:
+        async with self.busy:
+            if self.ended_reason is not None:
+                # Accepted while an earlier step was still ending the call
+                raise ApplicationError(f"Call session has ended ({self.ended_reason}).", type="SessionEnded")
+            response, self.context = await execute_node(
+                node, self.context, responses=self.responses, deadline=node.get("deadline"))
+            if node.get("type") == "waitingforResponse" and response.get("status") == "success":
+                # Consumed: a later wait on the same key needs a new delivery, and only
+                # undelivered responses are carried across continue-as-new
+                self.responses.pop(node.get("config", {}).get("properties", {}).get("key"), None)
+            self.steps += 1
+            self.steps_this_run += 1
+            self.last_step = {"node_id": node.get("uniqueId"), "type": node.get("type"), "status": response.get("status")}
+            if node.get("type") == "endCall" and response.get("status") == "success":
+                self.ended_reason = "endCall"
+            return response
+
+    @run_node.validator
+    def validate_run_node(self, node: dict):
+        # Rejected updates never reach history
+        if self.ended_reason is not None:
+            raise ApplicationError(f"Call session has ended ({self.ended_reason}).", type="SessionEnded")
+        if not isinstance(node, dict) or not node.get("type"):
+            raise ApplicationError("A node with a type is required.", type="InvalidNode")
+
+    @workflow.signal
+    def end_session(self):
+        if self.ended_reason is None:
+            self.ended_reason = "ended"
+
+    @workflow.query
+    def session_state(self) -> dict:
+        return {"steps": self.steps, "context": self.context, "last_step": self.last_step,
+                "ended": self.ended_reason}